@@ -0,0 +1,128 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src'))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from expression_parser import ExpressionParser
+from main import solve_problem
+from model.bar_model import BarModel
+from visualization.bar_renderer import BarRenderer
+from workloads import deep_chain, question_bank, wide_sum
+
+# Workload sizes: (chain length, sum terms, bank questions, rendered questions)
+SIZES = {
+    'full': (10000, 300, 20000, 20),
+    'quick': (1000, 100, 1000, 3),
+}
+DEFAULT_TOLERANCE = 0.25
+
+
+def measure(function, repeat):
+    """Run function repeat times; return the median and minimum wall time in seconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return {'seconds': statistics.median(timings), 'min': min(timings), 'repeat': repeat}
+
+
+def run_benchmarks(size='full', repeat=5):
+    """Time the parser, solver, model and renderer separately on synthetic workloads."""
+    chain_length, sum_terms, bank_size, render_count = SIZES[size]
+    parser = ExpressionParser()
+    chain = deep_chain(chain_length)
+    wide = wide_sum(sum_terms)
+    bank = list(question_bank(bank_size))
+    wide_values = solve_problem(wide)
+    bank_values = [solve_problem(question) for question in bank]
+
+    def evaluate_wide_sum():
+        for _ in range(1000):
+            parser.evaluate(wide['variables']['total'], wide_values)
+
+    def evaluate_bank():
+        for question, values in zip(bank, bank_values):
+            for expression in question['variables'].values():
+                parser.evaluate(expression, values)
+
+    def build_models():
+        for values in bank_values:
+            BarModel(values).get_relative_sizes()
+
+    results = {
+        'evaluate.wide_sum_x1000': measure(evaluate_wide_sum, repeat),
+        'evaluate.bank': measure(evaluate_bank, repeat),
+        'solve.deep_chain_reversed': measure(lambda: solve_problem(chain), repeat),
+        'solve.wide_sum': measure(lambda: solve_problem(wide), repeat),
+        'solve.bank': measure(lambda: [solve_problem(question) for question in bank], repeat),
+        'model.bank': measure(build_models, repeat),
+        'model.wide_sum': measure(lambda: BarModel(wide_values).get_relative_sizes(), repeat),
+    }
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        renderer = BarRenderer(output_dir=output_dir)
+
+        def render_bank():
+            for index in range(render_count):
+                renderer.render(BarModel(bank_values[index]), bank[index], index=index)
+
+        results['render.bank'] = measure(render_bank, max(1, repeat // 2))
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Return (name, baseline seconds, current seconds, ratio) for each benchmark slower than allowed."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get(name)
+        if previous is None or previous['seconds'] <= 0:
+            continue
+        ratio = current['seconds'] / previous['seconds']
+        if ratio > 1 + tolerance:
+            regressions.append((name, previous['seconds'], current['seconds'], ratio))
+    return regressions
+
+
+def main(argv=None):
+    """Run the benchmark suite, optionally saving results and checking them against a baseline."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--size', choices=sorted(SIZES), default='full')
+    parser.add_argument('--repeat', type=int, default=5, help="runs per benchmark; the median is reported")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--baseline', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"allowed slowdown versus the baseline (default: {DEFAULT_TOLERANCE} = 25%%)")
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.size, args.repeat)
+    report = {'python': platform.python_version(), 'size': args.size, 'benchmarks': results}
+    for name, result in results.items():
+        print(f"{name:32s} {result['seconds'] * 1000:10.2f} ms (min {result['min'] * 1000:.2f} ms)")
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if baseline.get('size') != args.size:
+            print(f"Warning: baseline was recorded with --size {baseline.get('size')}")
+        regressions = compare(results, baseline['benchmarks'], args.tolerance)
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: {before * 1000:.2f} ms -> {after * 1000:.2f} ms ({ratio:.2f}x)")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
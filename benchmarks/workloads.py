@@ -0,0 +1,112 @@
+import argparse
+import json
+import random
+
+
+def deep_chain(length, reverse=True):
+    """A question whose variables form one chain v0 <- v1 <- ... <- v<length>.
+
+    Listed in reverse order (each variable before the one it depends on) by
+    default, which is the worst case for a sweep-until-no-progress solver.
+    """
+    variables = {f"v{i}": f"v{i + 1}+1" for i in range(length)}
+    variables[f"v{length}"] = "1"
+    if not reverse:
+        variables = dict(reversed(list(variables.items())))
+    return {
+        "question": f"A chain of {length} quantities, each one more than the next.",
+        "variables": variables,
+        "unknowns": ["v0"],
+    }
+
+
+def wide_sum(terms, seed=0):
+    """A question with one composite total like 2*a+3*b+... over many inputs."""
+    rng = random.Random(seed)
+    variables = {f"item{i}": str(rng.randint(1, 500)) for i in range(terms)}
+    variables["total"] = "+".join(f"{rng.randint(1, 9)}*item{i}" for i in range(terms))
+    return {
+        "question": f"A basket holds {terms} kinds of fruit. How much does it weigh?",
+        "variables": variables,
+        "unknowns": ["total"],
+    }
+
+
+def _fruit_question(rng):
+    mango = rng.randint(100, 400)
+    heavier = rng.randint(10, 200)
+    lighter = rng.randint(1, mango + heavier)
+    return {
+        "question": f"A mango is {mango} grams. A papaya is {heavier} grams heavier than the mango while "
+                    f"the grapefruit is {lighter} grams lighter than the papaya. How much does the "
+                    f"papaya weigh? How much does the grapefruit weigh?",
+        "variables": {"mango": str(mango), "papaya": f"mango+{heavier}", "grapefruit": f"papaya-{lighter}"},
+        "unknowns": ["papaya", "grapefruit"],
+    }
+
+
+def _basket_question(rng):
+    watermelon = rng.randint(1000, 2000)
+    orange = rng.randrange(100, 300, 2)
+    counts = [rng.randint(1, 6) for _ in range(3)]
+    return {
+        "question": f"A watermelon weighs {watermelon} grams. An orange weighs {orange} grams. A banana "
+                    f"weighs half the weight of an orange. A fruit basket contains {counts[0]} watermelons, "
+                    f"{counts[1]} oranges, and {counts[2]} bananas. How much does the fruit basket weigh?",
+        "variables": {
+            "watermelon": str(watermelon),
+            "orange": str(orange),
+            "banana": "orange/2",
+            "basket": f"{counts[0]}*watermelon+{counts[1]}*orange+{counts[2]}*banana",
+        },
+        "unknowns": ["basket"],
+    }
+
+
+def _stamps_question(rng):
+    tom = rng.randint(30, 90)
+    gives = rng.randint(1, 10)
+    return {
+        "question": f"Tom has {tom} stamps and Jerry has 20 less stamps than Tom. If Tom gives {gives} "
+                    f"stamps to Jerry, who has more stamps now?",
+        "variables": {
+            "tom_initial": str(tom),
+            "jerry_initial": "tom_initial-20",
+            "tom_gives": str(gives),
+            "tom_final": "tom_initial-tom_gives",
+            "jerry_final": "jerry_initial+tom_gives",
+            "final_difference": "tom_final-jerry_final",
+        },
+        "unknowns": ["final_difference"],
+    }
+
+
+QUESTION_TEMPLATES = (_fruit_question, _basket_question, _stamps_question)
+
+
+def question_bank(count, seed=0):
+    """Yield count small questions shaped like those in data/questions.json."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield rng.choice(QUESTION_TEMPLATES)(rng)
+
+
+def main(argv=None):
+    """Write a synthetic question bank as JSON Lines (or wrapped JSON)."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('output', help="file to write; .jsonl for JSON Lines, anything else for {\"questions\": [...]}")
+    parser.add_argument('--questions', type=int, default=10000, help="number of questions (default: 10000)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    questions = question_bank(args.questions, args.seed)
+    with open(args.output, 'w') as file:
+        if args.output.endswith('.jsonl'):
+            for question in questions:
+                file.write(json.dumps(question) + "\n")
+        else:
+            json.dump({"questions": list(questions)}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from expression_parser import COMPILE_CACHE_SIZE, CompiledExpression, postorder
+from solver.dependency_graph import DependencyGraph, solve_variables
+
+COMPILED_EXTENSION = '.qbank'
+MAGIC = b'MMQBANK\0'
+# Bump whenever the layout below changes; older files must then be recompiled
+FORMAT_VERSION = 2
+
+# File layout (little-endian):
+#   header   magic, version, reserved, question count, offset of the index
+#   records  one per question, see _encode_question
+#   index    one u64 record offset per question
+_HEADER = struct.Struct('<8sIIQQ')
+_RECORD = struct.Struct('<BII')  # status, number of variables, number of unknowns
+_LENGTH = struct.Struct('<I')
+_OFFSET = struct.Struct('<Q')
+# Expressions are stored as postfix code: an opcode and an 8-byte operand each.
+# Integer literals keep every digit: those wider than 64 bits give the number
+# of following 9-byte slots that hold the value, little-endian and signed
+_NUMBER = struct.Struct('<Bd')
+_INTEGER = struct.Struct('<Bq')
+_NAME = struct.Struct('<BQ')
+_INSTRUCTION_SIZE = 9
+
+_SOLVABLE, _UNSOLVABLE = 0, 1
+_OP_NUMBER, _OP_NAME, _OP_NEG = 0, 1, 2
+_OPCODES = {'+': 3, '-': 4, '*': 5, '/': 6}
+_OP_INTEGER, _OP_LONG_INTEGER = 7, 8
+_OPERATORS = {code: op for op, code in _OPCODES.items()}
+
+
+class BankValidationError(ValueError):
+    """Raised when a question bank does not match the question schema."""
+
+    def __init__(self, errors):
+        self.errors = errors  # list of (question number, message)
+        super().__init__(f"{len(errors)} schema error(s) in the question bank")
+
+
+def _encode_tree(tree, positions, out):
+    """Append the postfix code of an expression tree to out."""
+    for node in postorder(tree):
+        kind = node[0]
+        if kind == 'number':
+            value = node[1]
+            if type(value) is float:
+                out.append(_NUMBER.pack(_OP_NUMBER, value))
+            elif -2 ** 63 <= value < 2 ** 63:
+                out.append(_INTEGER.pack(_OP_INTEGER, value))
+            else:
+                slots = value.bit_length() // (8 * _INSTRUCTION_SIZE) + 1
+                out.append(_NAME.pack(_OP_LONG_INTEGER, slots))
+                out.append(value.to_bytes(slots * _INSTRUCTION_SIZE, 'little', signed=True))
+        elif kind == 'name':
+            out.append(_NAME.pack(_OP_NAME, positions[node[1]]))
+        elif kind == 'neg':
+            out.append(_NAME.pack(_OP_NEG, 0))
+        else:
+            out.append(_NAME.pack(_OPCODES[kind], 0))
+
+
+def _decode_tree(buffer, offset, count, names):
+    """Rebuild an expression tree from count instructions of postfix code."""
+    stack = []
+    end = offset + count * _INSTRUCTION_SIZE
+    while offset < end:
+        opcode = buffer[offset]
+        if opcode == _OP_NUMBER:
+            stack.append(('number', _NUMBER.unpack_from(buffer, offset)[1]))
+        elif opcode == _OP_INTEGER:
+            stack.append(('number', _INTEGER.unpack_from(buffer, offset)[1]))
+        elif opcode == _OP_LONG_INTEGER:
+            size = _NAME.unpack_from(buffer, offset)[1] * _INSTRUCTION_SIZE
+            offset += _INSTRUCTION_SIZE
+            stack.append(('number', int.from_bytes(buffer[offset:offset + size], 'little', signed=True)))
+            offset += size
+            continue
+        elif opcode == _OP_NAME:
+            stack.append(('name', names[_NAME.unpack_from(buffer, offset)[1]]))
+        elif opcode == _OP_NEG:
+            stack.append(('neg', stack.pop()))
+        else:
+            right = stack.pop()
+            stack.append((_OPERATORS[opcode], stack.pop(), right))
+        offset += _INSTRUCTION_SIZE
+    return stack[0]
+
+
+def _pack_string(text, out):
+    data = text.encode('utf-8')
+    out.append(_LENGTH.pack(len(data)))
+    out.append(data)
+
+
+def _encode_question(question):
+    """Lower a question to its dependency order and compiled expressions.
+
+    A question that cannot be ordered (bad syntax, undefined names, cycles)
+    is stored with its error, which solving it later reports.
+    """
+    definitions = question["variables"]
+    names = list(definitions)
+    unknowns = list(question["unknowns"])
+    try:
+        graph = DependencyGraph(definitions)
+        order = graph.topological_order(unknowns + names)
+        error = None
+    except ValueError as e:
+        error = str(e)
+
+    out = [_RECORD.pack(_SOLVABLE if error is None else _UNSOLVABLE, len(names), len(unknowns))]
+    for text in [question["question"]] + names + [definitions[name] for name in names] + unknowns:
+        _pack_string(text, out)
+    if error is not None:
+        _pack_string(error, out)
+        return b''.join(out)
+
+    positions = {name: i for i, name in enumerate(names)}
+    out.append(_LENGTH.pack(len(order)))
+    out.append(array('I', [positions[name] for name in order]).tobytes())
+    for name in names:
+        code = []
+        _encode_tree(graph.expressions[name].tree, positions, code)
+        out.append(_LENGTH.pack(sum(map(len, code)) // _INSTRUCTION_SIZE))
+        out.extend(code)
+    return b''.join(out)
+
+
+def compile_bank(source_path, output_path):
+    """Validate a JSON or JSON Lines bank and write it as a compiled bank.
+
+    Raises BankValidationError, listing every schema violation, before
+    anything is written. Returns the number of questions compiled.
+    """
+    from question_loader import iter_questions
+    from question_schema import schema_errors
+
+    errors = []
+    for number, question in enumerate(iter_questions(source_path), 1):
+        errors.extend((number, message) for message in schema_errors(question))
+    if errors:
+        raise BankValidationError(errors)
+
+    offsets = array('Q')
+    temporary_path = output_path + '.tmp'
+    with open(temporary_path, 'wb') as file:
+        file.write(b'\0' * _HEADER.size)
+        position = _HEADER.size
+        for question in iter_questions(source_path):
+            record = _encode_question(question)
+            offsets.append(position)
+            file.write(record)
+            position += len(record)
+        file.write(offsets.tobytes())
+        file.seek(0)
+        file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(offsets), position))
+    os.replace(temporary_path, output_path)
+    return len(offsets)
+
+
+class _PrecompiledParser:
+    """Parser stand-in that hands DependencyGraph already compiled expressions."""
+
+    def __init__(self, expressions):
+        self.expressions = expressions
+
+    def compile(self, expression):
+        return self.expressions[expression]
+
+
+class BankQuestion(dict):
+    """A question loaded from a compiled bank.
+
+    It reads like the question dict it was compiled from and solves from the
+    stored order and expression code, without parsing. When pickled (e.g.
+    for worker processes) it travels as a plain question dict.
+    """
+
+    def __init__(self, question, order, expressions, error):
+        super().__init__(question)
+        self.order = order
+        self.expressions = expressions
+        self.error = error
+
+    def solve(self, required_only=False, memo=None, linear=False, exact=False):
+        """Solve the question; same results as solve_variables on its dict."""
+        if self.error is not None:
+            if linear:
+                # Cycles were stored as errors; solve them as simultaneous relations
+                return solve_variables(self["variables"], self["unknowns"], required_only, linear=True, exact=exact)
+            raise ValueError(self.error)
+        graph = DependencyGraph(self["variables"], _PrecompiledParser(self.expressions))
+        order = graph.topological_order(self["unknowns"]) if required_only else self.order
+        return graph.evaluate(order, memo, exact)
+
+    def __reduce__(self):
+        return (dict, (dict(self),))
+
+
+class CompiledBank:
+    """A compiled question bank, memory-mapped and randomly accessible by index.
+
+    Only the records of the questions actually read are decoded, so opening
+    a bank of millions of questions and jumping to question k is immediate.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            raise ValueError(f"{path} is not a compiled question bank")
+        magic, version, _, self.count, self._index_offset = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a compiled question bank")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path} uses compiled bank format {version}, expected {FORMAT_VERSION}; recompile it")
+        # Decoded expressions by source text, shared by the questions of a templated bank
+        self._expressions = {}
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(f"question index {index} out of range")
+        offset = _OFFSET.unpack_from(self._map, self._index_offset + index * _OFFSET.size)[0]
+        return self._decode(offset)
+
+    def __iter__(self):
+        return self.iter_from(0)
+
+    def iter_from(self, start):
+        """Yield the questions from (0-based) index start onwards."""
+        for index in range(start, self.count):
+            yield self[index]
+
+    def close(self):
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+    def _string(self, offset):
+        length = _LENGTH.unpack_from(self._map, offset)[0]
+        start = offset + _LENGTH.size
+        return self._map[start:start + length].decode('utf-8'), start + length
+
+    def _decode(self, offset):
+        status, variable_count, unknown_count = _RECORD.unpack_from(self._map, offset)
+        offset += _RECORD.size
+        strings = []
+        for _ in range(1 + 2 * variable_count + unknown_count + (status == _UNSOLVABLE)):
+            text, offset = self._string(offset)
+            strings.append(text)
+        names = strings[1:1 + variable_count]
+        sources = strings[1 + variable_count:1 + 2 * variable_count]
+        question = {
+            "question": strings[0],
+            "variables": dict(zip(names, sources)),
+            "unknowns": strings[1 + 2 * variable_count:1 + 2 * variable_count + unknown_count],
+        }
+        if status == _UNSOLVABLE:
+            return BankQuestion(question, None, None, strings[-1])
+
+        order_length = _LENGTH.unpack_from(self._map, offset)[0]
+        offset += _LENGTH.size
+        positions = array('I')
+        positions.frombytes(self._map[offset:offset + 4 * order_length])
+        offset += 4 * order_length
+        expressions = {}
+        for source in sources:
+            count = _LENGTH.unpack_from(self._map, offset)[0]
+            offset += _LENGTH.size
+            expression = self._expressions.get(source)
+            if expression is None:
+                if len(self._expressions) >= COMPILE_CACHE_SIZE:
+                    self._expressions.clear()
+                expression = CompiledExpression(source.strip(), _decode_tree(self._map, offset, count, names))
+                self._expressions[source] = expression
+            expressions[source] = expression
+            offset += count * _INSTRUCTION_SIZE
+        return BankQuestion(question, [names[i] for i in positions], expressions, None)
+
+
+def main(argv=None):
+    """Compile a JSON or JSON Lines question bank into a memory-mappable binary bank."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('source', help="question bank to compile (.json or .jsonl)")
+    parser.add_argument('output', nargs='?', default=None,
+                        help=f"compiled bank to write (default: source with a {COMPILED_EXTENSION} extension)")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.source)[0] + COMPILED_EXTENSION
+    try:
+        count = compile_bank(args.source, output)
+    except BankValidationError as e:
+        for number, message in e.errors:
+            print(f"Question {number}: {message}", file=sys.stderr)
+        print(f"Not compiled: {e}", file=sys.stderr)
+        return 1
+    print(f"Compiled {count} questions to {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,47 +1,441 @@
-import re
+import ast
+import operator
+from fractions import Fraction
+from functools import lru_cache
+
+# Maximum number of distinct expression strings kept in compiled form
+COMPILE_CACHE_SIZE = 8192
+# Deeper expressions (e.g. sums of thousands of terms) are evaluated by a
+# stack machine instead of nested closures, which would exhaust the stack
+MAX_CLOSURE_DEPTH = 100
+
+_BINARY_OPERATORS = {
+    ast.Add: '+',
+    ast.Sub: '-',
+    ast.Mult: '*',
+    ast.Div: '/',
+}
+
+_OPERATOR_FUNCTIONS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+}
+
+
+def _to_tree(node, source):
+    """Convert a Python AST node into the restricted expression tree.
+
+    The tree is made of tuples: ('number', value), ('name', id),
+    ('neg', operand) and (op, left, right) with op one of '+', '-', '*', '/'.
+    Integer literals stay ints, so exact evaluation sees every digit; other
+    literals are floats. Built with an explicit stack, so sums of thousands
+    of terms convert fine.
+    """
+    built = []
+    pending = [(node, False)]
+    while pending:
+        node, expanded = pending.pop()
+        if isinstance(node, ast.Expression):
+            pending.append((node.body, False))
+        elif isinstance(node, ast.Constant) and type(node.value) in (int, float):
+            built.append(('number', node.value))
+        elif isinstance(node, ast.Name):
+            built.append(('name', node.id))
+        elif isinstance(node, ast.BinOp) and type(node.op) in _BINARY_OPERATORS:
+            if expanded:
+                right = built.pop()
+                built.append((_BINARY_OPERATORS[type(node.op)], built.pop(), right))
+            else:
+                pending.extend(((node, True), (node.right, False), (node.left, False)))
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            if expanded:
+                operand = built.pop()
+                built.append(('number', -operand[1]) if operand[0] == 'number' else ('neg', operand))
+            else:
+                pending.extend(((node, True), (node.operand, False)))
+        elif isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.UAdd):
+            pending.append((node.operand, False))
+        else:
+            raise ValueError(f"Unsupported syntax in expression: {source}")
+    return built[0]
+
+
+def postorder(tree):
+    """Yield the nodes of an expression tree, children before their parent.
+
+    Iterative, so it is safe on trees of any depth; for a binary node the
+    left operand's nodes come first.
+    """
+    pending = [(tree, False)]
+    while pending:
+        node, expanded = pending.pop()
+        kind = node[0]
+        if expanded or kind == 'number' or kind == 'name':
+            yield node
+        elif kind == 'neg':
+            pending.append((node, True))
+            pending.append((node[1], False))
+        else:
+            pending.append((node, True))
+            pending.append((node[2], False))
+            pending.append((node[1], False))
+
+
+def _collect_names(tree, names):
+    """Add every variable name referenced in the tree to names."""
+    for node in postorder(tree):
+        if node[0] == 'name':
+            names.add(node[1])
+    return names
+
+
+def _depth(tree):
+    """Number of levels of the tree."""
+    depths = []
+    for node in postorder(tree):
+        kind = node[0]
+        if kind == 'number' or kind == 'name':
+            depths.append(1)
+        elif kind == 'neg':
+            depths.append(depths.pop() + 1)
+        else:
+            right = depths.pop()
+            depths.append(max(depths.pop(), right) + 1)
+    return depths[0]
+
+
+def _build_stack_function(tree, operators, number):
+    """Turn the tree into a function that runs it as postfix code on a value stack.
+
+    Used for trees too deep for nested closures; operators maps each binary
+    operator to its function and number converts literals.
+    """
+    code = []
+    for node in postorder(tree):
+        kind = node[0]
+        if kind == 'number':
+            code.append((0, number(node[1])))
+        elif kind == 'name':
+            code.append((1, node[1]))
+        elif kind == 'neg':
+            code.append((2, None))
+        else:
+            code.append((3, operators[kind]))
+
+    def evaluate(variables):
+        stack = []
+        push, pop = stack.append, stack.pop
+        for opcode, operand in code:
+            if opcode == 0:
+                push(operand)
+            elif opcode == 1:
+                push(variables[operand])
+            elif opcode == 2:
+                push(-pop())
+            else:
+                right = pop()
+                push(operand(pop(), right))
+        return stack[0]
+    return evaluate
+
+
+def _build_function(tree):
+    """Turn the tree into a closure that evaluates it against a variables dict."""
+    kind = tree[0]
+    if kind == 'number':
+        value = float(tree[1])
+        return lambda variables: value
+    if kind == 'name':
+        name = tree[1]
+        return lambda variables: variables[name]
+    if kind == 'neg':
+        operand = _build_function(tree[1])
+        return lambda variables: -operand(variables)
+    op = _OPERATOR_FUNCTIONS[kind]
+    left = _build_function(tree[1])
+    right = _build_function(tree[2])
+    return lambda variables: op(left(variables), right(variables))
+
+
+def _exact(value):
+    """Normalize a Fraction with denominator 1 back to an int."""
+    if type(value) is Fraction and value.denominator == 1:
+        return value.numerator
+    return value
+
+
+def _exact_add(left, right):
+    return _exact(left + right)
+
+
+def _exact_sub(left, right):
+    return _exact(left - right)
+
+
+def _exact_mul(left, right):
+    return _exact(left * right)
+
+
+def _exact_div(left, right):
+    """Divide, staying on ints when the division is whole and on Fractions otherwise."""
+    if not right:
+        raise ZeroDivisionError("division by zero")
+    if type(left) is int and type(right) is int:
+        quotient, remainder = divmod(left, right)
+        return quotient if remainder == 0 else Fraction(left, right)
+    if type(left) is float or type(right) is float:
+        return left / right
+    return _exact(Fraction(left) / right)
+
+
+_EXACT_OPERATOR_FUNCTIONS = {
+    '+': _exact_add,
+    '-': _exact_sub,
+    '*': _exact_mul,
+    '/': _exact_div,
+}
+
+
+def _exact_number(value):
+    """An integral literal as an int (e.g. 2.0 becomes 2); other literals stay floats."""
+    if type(value) is int or not value.is_integer():
+        return value
+    return int(value)
+
+
+def _build_exact_function(tree):
+    """Like _build_function, but integral literals are ints and division is exact.
+
+    Values stay ints while they can and become Fractions only when a
+    division is not whole; a literal that is not an integer makes the
+    operations that use it fall back to floats.
+    """
+    kind = tree[0]
+    if kind == 'number':
+        value = _exact_number(tree[1])
+        return lambda variables: value
+    if kind == 'name':
+        name = tree[1]
+        return lambda variables: variables[name]
+    if kind == 'neg':
+        operand = _build_exact_function(tree[1])
+        return lambda variables: -operand(variables)
+    left = _build_exact_function(tree[1])
+    right = _build_exact_function(tree[2])
+    if kind == '/':
+        return lambda variables: _exact_div(left(variables), right(variables))
+    op = _OPERATOR_FUNCTIONS[kind]
+    exact_op = _EXACT_OPERATOR_FUNCTIONS[kind]
+
+    def evaluate(variables):
+        a = left(variables)
+        b = right(variables)
+        # ints and floats need no normalizing
+        if type(a) is Fraction or type(b) is Fraction:
+            return exact_op(a, b)
+        return op(a, b)
+    return evaluate
+
+
+def _product_term(tree):
+    """Return (coefficient, name) for name, coeff*name, name*coeff or nested
+    constant products such as 2*(3*name); None for anything else."""
+    factors = []
+    while tree[0] == '*':
+        left, right = tree[1], tree[2]
+        if left[0] == 'number':
+            left, right = right, left
+        if right[0] != 'number':
+            return None
+        factors.append(right[1])
+        tree = left
+    if tree[0] != 'name':
+        return None
+    coefficient = 1.0
+    # Innermost factor first
+    for factor in reversed(factors):
+        coefficient *= factor
+    return (coefficient, tree[1])
+
+
+def _sum_terms(tree, terms):
+    """Append the (coefficient, name) terms of a sum of products to terms.
+
+    Returns False when some term is not a positive multiple of a variable.
+    """
+    pending = [tree]
+    while pending:
+        tree = pending.pop()
+        if tree[0] == '+':
+            pending.append(tree[2])
+            pending.append(tree[1])
+            continue
+        term = _product_term(tree)
+        if term is None or term[0] <= 0:
+            return False
+        terms.append(term)
+    return True
+
+
+def _template_text(tree, slots):
+    """Render the tree as text with each variable replaced by its slot number.
+
+    Slots are numbered by first appearance; slots maps names to numbers.
+    """
+    texts = []
+    for node in postorder(tree):
+        kind = node[0]
+        if kind == 'number':
+            texts.append(repr(node[1]))
+        elif kind == 'name':
+            texts.append(f"${slots.setdefault(node[1], len(slots))}")
+        elif kind == 'neg':
+            texts.append(f"(-{texts.pop()})")
+        else:
+            right = texts.pop()
+            texts.append(f"({texts.pop()}{kind}{right})")
+    return texts[0]
+
+
+def classify(tree):
+    """Classify an expression tree into the shape a bar model draws.
+
+    Shapes are tuples: ('number', value), ('reference', name),
+    ('add', name, amount), ('subtract', name, amount),
+    ('multiply', name, factor), ('divide', name, divisor),
+    ('sum', ((coefficient, name), ...)) for two or more positive
+    coeff*name terms, and ('other',) for everything else. Amounts,
+    factors and divisors are non-negative numbers.
+    """
+    kind = tree[0]
+    if kind == 'number':
+        return ('number', tree[1])
+    if kind == 'name':
+        return ('reference', tree[1])
+    if kind in ('+', '-', '/'):
+        left, right = tree[1], tree[2]
+        if kind == '+' and left[0] == 'number':
+            left, right = right, left
+        if left[0] == 'name' and right[0] == 'number' and right[1] >= 0:
+            return ({'+': 'add', '-': 'subtract', '/': 'divide'}[kind], left[1], right[1])
+    if kind == '*':
+        term = _product_term(tree)
+        if term is not None and term[0] >= 0:
+            return ('multiply', term[1], term[0])
+    if kind == '+':
+        terms = []
+        if _sum_terms(tree, terms):
+            return ('sum', tuple(terms))
+    return ('other',)
+
+
+class CompiledExpression:
+    """An expression parsed once, with its free variables extracted and its
+    shape classified for rendering."""
+
+    __slots__ = ('source', 'tree', 'names', 'shape', '_deep', '_function', '_exact_function', '_template')
+
+    def __init__(self, source, tree):
+        self.source = source
+        self.tree = tree
+        self.names = frozenset(_collect_names(tree, set()))
+        self.shape = classify(tree)
+        self._deep = _depth(tree) > MAX_CLOSURE_DEPTH
+        if self._deep:
+            self._function = _build_stack_function(tree, _OPERATOR_FUNCTIONS, float)
+        else:
+            self._function = _build_function(tree)
+        self._exact_function = None
+        self._template = None
+
+    @property
+    def template(self):
+        """(text, slot names): the expression with its variables abstracted away.
+
+        Expressions that differ only in variable names share the text, e.g.
+        'mango+185' and 'kiwi + 185' are both ('($0+185)', ('mango',)) and
+        ('($0+185)', ('kiwi',)). Built on first use.
+        """
+        if self._template is None:
+            slots = {}
+            self._template = (_template_text(self.tree, slots), tuple(slots))
+        return self._template
+
+    def evaluate(self, variables):
+        """Evaluate the expression, looking names up directly in variables."""
+        try:
+            return self._function(variables)
+        except KeyError:
+            missing = sorted(name for name in self.names if name not in variables)
+            raise ValueError(f"Cannot evaluate: {self.source} - missing variables {missing}")
+        except ArithmeticError as e:
+            raise ValueError(f"Error evaluating {self.source}: {str(e)}")
+        except RecursionError:
+            raise ValueError(f"Error evaluating {self.source}: expression too deeply nested")
+
+    def evaluate_exact(self, variables):
+        """Evaluate the expression in exact arithmetic (ints and Fractions).
+
+        Integral literals are ints and a division that is not whole gives a
+        Fraction, so e.g. 'orange/2' with orange = 151 is exactly 151/2.
+        Literals that are not integers, and values that are floats, fall
+        back to float arithmetic. The exact closure is built on first use.
+        """
+        function = self._exact_function
+        if function is None:
+            if self._deep:
+                function = _build_stack_function(self.tree, _EXACT_OPERATOR_FUNCTIONS, _exact_number)
+            else:
+                function = _build_exact_function(self.tree)
+            self._exact_function = function
+        try:
+            return function(variables)
+        except KeyError:
+            missing = sorted(name for name in self.names if name not in variables)
+            raise ValueError(f"Cannot evaluate: {self.source} - missing variables {missing}")
+        except ArithmeticError as e:
+            raise ValueError(f"Error evaluating {self.source}: {str(e)}")
+        except RecursionError:
+            raise ValueError(f"Error evaluating {self.source}: expression too deeply nested")
+
+    def __repr__(self):
+        return f"CompiledExpression({self.source!r})"
+
+
+@lru_cache(maxsize=COMPILE_CACHE_SIZE)
+def compile_expression(expression):
+    """Parse an expression string into a CompiledExpression (cached by text)."""
+    source = str(expression).strip()
+    try:
+        parsed = ast.parse(source, mode='eval')
+    except SyntaxError as e:
+        raise ValueError(f"Invalid expression {source!r}: {e.msg}")
+    except RecursionError:
+        # Python's own parser has a nesting limit
+        raise ValueError("expression too deeply nested")
+    try:
+        return CompiledExpression(source, _to_tree(parsed, source))
+    except OverflowError:
+        raise ValueError(f"Number too large for a float in expression {source!r}")
+
 
 class ExpressionParser:
     """A simple parser for basic mathematical expressions with variables."""
-    
+
     def __init__(self):
         pass
-    
+
+    def compile(self, expression):
+        """Return the compiled form of an expression."""
+        return compile_expression(str(expression))
+
     def evaluate(self, expression, variables):
         """Evaluate a string expression using the values of variables."""
-        # If the expression is just a number, return it
-        if re.match(r'^-?\d+(\.\d+)?$', str(expression)):
-            return float(expression)
-        
-        # For simple variable reference
-        if expression in variables:
-            return variables[expression]
-        
-        # For expressions with operations
-        # First, replace all variables with their values
-        result_expr = str(expression)
-        for var_name, var_value in sorted(variables.items(), key=lambda x: len(x[0]), reverse=True):
-            # Use word boundaries in regex to avoid partial matches
-            result_expr = re.sub(r'\b' + re.escape(var_name) + r'\b', str(var_value), result_expr)
-        
-        # Check if all variables have been replaced
-        if re.search(r'[a-zA-Z_]', result_expr):
-            # Still contains variables we don't have values for
-            raise ValueError(f"Cannot evaluate: {expression} - missing variables")
-        
-        # Evaluate the numeric expression
-        try:
-            return eval(result_expr)
-        except Exception as e:
-            raise ValueError(f"Error evaluating {result_expr}: {str(e)}")
-    
+        return compile_expression(str(expression)).evaluate(variables)
+
     def can_evaluate(self, expression, variables):
         """Check if all variables in an expression have values."""
-        # If it's a number or in variables, we can evaluate it
-        if re.match(r'^-?\d+(\.\d+)?$', str(expression)) or expression in variables:
-            return True
-        
-        # Find all variable names in the expression
-        var_names = set(re.findall(r'[a-zA-Z_]+', str(expression)))
-        
-        # Check if all variables are defined
-        return all(var_name in variables for var_name in var_names)
\ No newline at end of file
+        names = compile_expression(str(expression)).names
+        return all(name in variables for name in names)
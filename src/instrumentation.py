@@ -0,0 +1,149 @@
+import cProfile
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+# The active Instrumentation, or None; module-level helpers are no-ops without one
+_active = None
+
+
+def count(name, n=1):
+    """Add n to a counter of the active instrumentation, if any."""
+    if _active is not None:
+        _active.count(name, n)
+
+
+@contextmanager
+def stage(name):
+    """Time a block as a stage of the active instrumentation, if any."""
+    if _active is None:
+        yield
+    else:
+        with _active.stage(name):
+            yield
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list (None when empty)."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-q * len(sorted_values) // 100))
+    return sorted_values[rank - 1]
+
+
+class Instrumentation:
+    """Per-stage timers and counters, aggregated per question and per run.
+
+    Activate it with `with Instrumentation() as inst:`; code then reports
+    through the module-level count() and stage() helpers, which cost a
+    single None check when nothing is active.
+    """
+
+    def __init__(self, profile_index=None, profile_dir='.'):
+        self.profile_index = profile_index
+        self.profile_dir = profile_dir
+        self.samples = {} # stage -> list of milliseconds, one per timed block
+        self.counters = {}
+        self.questions = []
+        self.profile = None
+        self._question = None
+        self._previous = None
+
+    def __enter__(self):
+        global _active
+        self._previous = _active
+        _active = self
+        return self
+
+    def __exit__(self, *exc_info):
+        global _active
+        _active = self._previous
+        return False
+
+    def count(self, name, n=1):
+        self.counters[name] = self.counters.get(name, 0) + n
+        if self._question is not None:
+            counters = self._question['counters']
+            counters[name] = counters.get(name, 0) + n
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.samples.setdefault(name, []).append(elapsed)
+            if self._question is not None:
+                stages = self._question['stages']
+                stages[name] = stages.get(name, 0) + elapsed
+
+    def timed_iter(self, name, iterable):
+        """Yield from iterable, timing each step as the given stage."""
+        iterator = iter(iterable)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    @contextmanager
+    def question(self, index):
+        """Attribute stages and counters inside the block to question index.
+
+        When index is the one chosen for profiling, the block also runs
+        under cProfile and tracemalloc.
+        """
+        self._question = {'index': index, 'stages': {}, 'counters': {}}
+        profiler = None
+        if index == self.profile_index:
+            profiler = cProfile.Profile()
+            tracemalloc.start()
+            profiler.enable()
+        try:
+            yield
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self._save_profile(index, profiler)
+            self.questions.append(self._question)
+            self._question = None
+
+    def _save_profile(self, index, profiler):
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(self.profile_dir, f"question_{index + 1:05d}.prof")
+        profiler.dump_stats(path)
+        top = snapshot.statistics('lineno')[:10]
+        self.profile = {
+            'question': index + 1,
+            'cprofile_stats': path,
+            'peak_memory_bytes': peak,
+            'top_allocations': [{'location': str(stat.traceback[0]), 'bytes': stat.size, 'count': stat.count}
+                                for stat in top],
+        }
+
+    def report(self):
+        """Summarise the run: per-stage p50/p95/p99, counters and per-question detail."""
+        stages = {}
+        for name, samples in self.samples.items():
+            ordered = sorted(samples)
+            stages[name] = {
+                'count': len(ordered),
+                'total_ms': sum(ordered),
+                'p50_ms': percentile(ordered, 50),
+                'p95_ms': percentile(ordered, 95),
+                'p99_ms': percentile(ordered, 99),
+            }
+        return {'stages': stages, 'counters': dict(self.counters),
+                'questions': self.questions, 'profile': self.profile}
+
+    def write_report(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2)
@@ -0,0 +1,67 @@
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """LRU mapping bounded by entry count and, optionally, total size, with hit/miss counters.
+
+    Not thread-safe; see LockedLRUCache.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (value, size), least recently used first
+        self._bytes = 0
+
+    def get(self, key, default=None):
+        """Return the value of key, marking it most recently used, or default on a miss."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key, value, size=0):
+        """Store value under key, then evict least recently used entries over the bounds."""
+        entries = self._entries
+        if key in entries:
+            self._bytes -= entries.pop(key)[1]
+        entries[key] = (value, size)
+        self._bytes += size
+        while len(entries) > 1 and (
+                (self.max_entries is not None and len(entries) > self.max_entries) or
+                (self.max_bytes is not None and self._bytes > self.max_bytes)):
+            self._bytes -= entries.popitem(last=False)[1][1]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {'hits': self.hits, 'misses': self.misses, 'entries': len(self._entries),
+                'hit_rate': self.hits / lookups if lookups else 0.0}
+
+
+class LockedLRUCache(LRUCache):
+    """LRUCache that can be shared between threads."""
+
+    def __init__(self, max_entries=None, max_bytes=None):
+        super().__init__(max_entries, max_bytes)
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            return super().get(key, default)
+
+    def put(self, key, value, size=0):
+        with self._lock:
+            super().put(key, value, size)
+
+    def stats(self):
+        with self._lock:
+            return super().stats()
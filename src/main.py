@@ -1,105 +1,497 @@
-import os
+import argparse
+from contextlib import nullcontext
+from fractions import Fraction
+from itertools import islice
 import json
+import os
 import logging
 import re
-from expression_parser import ExpressionParser
-from model.bar_model import BarModel
-from visualization.bar_renderer import BarRenderer
+import sys
+import instrumentation
+from instrumentation import Instrumentation
+from solver.dependency_graph import solve_variables
+from solver.memo import SubgraphMemo
+from solver.result_cache import ResultCache
+from question_loader import iter_questions
+from compiled_bank import COMPILED_EXTENSION, BankQuestion, CompiledBank
 
-# Set up logging
-logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-def load_questions(file_path):
-    """Load questions from a JSON file."""
+def load_questions(file_path, start=0):
+    """Stream questions from (0-based) index start of a JSON, JSON Lines or compiled bank.
+
+    A compiled bank jumps straight to question start; other formats are
+    parsed up to it.
+    """
     try:
-        with open(file_path, 'r') as file:
-            return json.load(file)
+        if os.path.splitext(file_path)[1] == COMPILED_EXTENSION:
+            return CompiledBank(file_path).iter_from(start)
+        questions = iter_questions(file_path)
     except FileNotFoundError:
-        logger.error(f"Error: Could not find questions.json at {file_path}")
+        logger.error(f"Error: Could not find question bank at {file_path}")
         print("Please ensure the data folder exists with questions.json")
         return None
+    return islice(questions, start, None) if start else questions
 
-def solve_problem(question_data):
-    """Solve a math problem based on the given question data."""
-    variables = {}
-    unknown_variables = set(question_data["unknowns"])
-    parser = ExpressionParser()
-    
-    # Process each variable until all unknowns are resolved
-    while unknown_variables:
-        progress_made = False
-        
-        for var_name, expression in question_data["variables"].items():
-            # Skip if variable is already solved
-            if var_name in variables:
-                continue
-            
-            # Try to evaluate the expression
-            try:
-                if parser.can_evaluate(expression, variables):
-                    logger.debug(f"Evaluating {var_name} = {expression}")
-                    value = parser.evaluate(expression, variables)
-                    variables[var_name] = value
-                    logger.debug(f"Result: {var_name} = {value}")
-                    if var_name in unknown_variables:
-                        unknown_variables.remove(var_name)
-                    progress_made = True
-            except Exception as e:
-                logger.debug(f"Failed to evaluate {var_name}: {str(e)}")
-                continue
-        
-        # If no progress was made in this iteration, we can't solve further
-        if not progress_made and unknown_variables:
-            logger.error(f"Stuck variables: {unknown_variables}")
-            logger.error(f"Current known variables: {variables}")
-            raise ValueError(f"Could not solve for variables: {unknown_variables}")
-    
-    return variables
+def solve_problem(question_data, required_only=False, memo=None, linear=False, exact=False):
+    """Solve a math problem based on the given question data.
+
+    Variables are evaluated once each, in dependency order. With
+    required_only=True, variables the unknowns do not depend on are skipped.
+    A SubgraphMemo reuses values of subgraphs seen in earlier questions.
+    With linear=True, mutually dependent variables are solved as simultaneous
+    linear relations. With exact=True, values are ints or Fractions rather
+    than floats. Questions from a compiled bank are solved from their stored form.
+    """
+    if isinstance(question_data, BankQuestion):
+        return question_data.solve(required_only, memo, linear, exact)
+    return solve_variables(question_data["variables"], question_data["unknowns"],
+                           required_only=required_only, memo=memo, linear=linear, exact=exact)
+
+def new_solver(args):
+    """Return solve(question) for --memo-size, --linear and --exact, with its SubgraphMemo and ResultCache.
+
+    With --exact, solved questions are kept in a ResultCache, so a question
+    seen again is not evaluated again. The memo and cache are None when off.
+    """
+    memo = new_memo(args)
+    cache = ResultCache() if args.exact else None
+
+    def solve(question):
+        return solve_problem(question, memo=memo, linear=args.linear, exact=args.exact)
+
+    if cache is None:
+        return solve, memo, None
+    return lambda question: cache.solve(question, solve), memo, cache
+
+def create_renderer(render_options=None):
+    """Create a BarRenderer, importing matplotlib only now that rendering is needed."""
+    from visualization.bar_renderer import BarRenderer
+    return BarRenderer(**(render_options or {}))
+
+def create_text_renderer(color=False):
+    """Create a TextBarRenderer, which draws bars on stdout without matplotlib."""
+    from visualization.text_renderer import TextBarRenderer
+    return TextBarRenderer(color=color)
+
+def visualize_solution(question_data, results, renderer=None, index=None):
+    """Create and display (or, with a headless renderer, save) a bar model of the solution."""
+    from model.bar_model import BarModel
 
-def visualize_solution(question_data, results):
-    """Create and display a bar model visualization of the solution."""
     # Create a bar model with the results
     bar_model = BarModel(results)
     
     # Create a renderer and display the bar model
-    renderer = BarRenderer()
-    renderer.render(bar_model, question_data)
+    renderer = renderer or create_renderer()
+    return renderer.render(bar_model, question_data, index=index)
 
-def main():
-    """Main function to load and solve questions."""
-    # Get absolute path to the data directory
-    current_dir = os.path.dirname(os.path.abspath(__file__))
-    parent_dir = os.path.dirname(current_dir)
-    data_path = os.path.join(parent_dir, 'data', 'questions.json')
+def parse_args(argv=None):
+    """Parse command line options."""
+    parser = argparse.ArgumentParser(description="Solve math modeling questions and draw bar models.")
+    # Defaults of parallel, pipeline, watch and render_cache are written out so those modules
+    # (and multiprocessing, asyncio, hashlib) are only imported by the modes that use them
+    parser.add_argument('--questions', default=None,
+                        help="question bank to load, .json, .jsonl or compiled .qbank (default: data/questions.json)")
+    parser.add_argument('--start', type=int, default=1,
+                        help="number of the first question to process (default: 1)")
+    parser.add_argument('--count', type=int, default=None,
+                        help="number of questions to process (default: all)")
+    parser.add_argument('--check', action='store_true',
+                        help="only check the bank (schema, syntax, undefined names, cycles, undrawable "
+                             "expressions) and report every issue; exit status 1 on errors")
+    parser.add_argument('--precheck', action='store_true',
+                        help="check the whole bank first and do not start solving if it has errors")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="number of worker processes used to solve questions (default: 1)")
+    parser.add_argument('--chunk-size', type=int, default=64,
+                        help="questions sent to a worker per task (default: 64)")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="run load, solve, render and write as concurrent stages joined by bounded queues, "
+                             "rendering in --workers processes; needs --output-dir")
+    parser.add_argument('--queue-size', type=int, default=32,
+                        help="questions buffered between --pipeline stages (default: 32)")
+    parser.add_argument('--watch', action='store_true',
+                        help="keep running, re-solving and re-rendering only the questions changed by each save "
+                             "of the bank; needs --output-dir or --renderer text")
+    parser.add_argument('--debounce', type=float, default=0.3,
+                        help="seconds a --watch bank must stay unchanged before it is reprocessed (default: 0.3)")
+    parser.add_argument('--renderer', choices=('matplotlib', 'text'), default='matplotlib',
+                        help="draw bar models as matplotlib figures or as text bars on stdout (default: matplotlib)")
+    parser.add_argument('--color', action='store_true',
+                        help="use ANSI colours for --renderer text")
+    parser.add_argument('--memo-size', type=int, default=0,
+                        help="memoize values of subgraphs shared across questions, keeping up to this many "
+                             "(default: 0, off)")
+    parser.add_argument('--linear', action='store_true',
+                        help="solve variables that depend on each other as simultaneous linear relations")
+    parser.add_argument('--exact', action='store_true',
+                        help="solve in exact integer and fraction arithmetic (numbers that are not integers "
+                             "fall back to floats), caching each solved question")
+    parser.add_argument('--output-dir', default=None,
+                        help="render headless, writing one figure file per question to this directory")
+    parser.add_argument('--solve-only', action='store_true',
+                        help="print the answers without rendering (matplotlib is never imported)")
+    parser.add_argument('--json', action='store_true',
+                        help="print one JSON object of answers per question; implies --solve-only")
+    parser.add_argument('--format', dest='file_format', choices=('png', 'svg', 'pdf'), default='png',
+                        help="figure file format in headless mode (default: png)")
+    parser.add_argument('--dpi', type=int, default=100,
+                        help="figure resolution in headless mode (default: 100)")
+    parser.add_argument('--reuse-figure', action='store_true',
+                        help="in headless mode, draw every question on one reused figure instead of a new one")
+    parser.add_argument('--contact-sheet', default=None, metavar='PDF',
+                        help="tile the bar models of all questions onto the pages of this multi-page PDF")
+    parser.add_argument('--sheet-grid', default='3x2', metavar='COLSxROWS',
+                        help="questions per contact sheet page (default: 3x2)")
+    parser.add_argument('--cache-dir', default=None,
+                        help="reuse headless figures from this render cache directory")
+    parser.add_argument('--cache-size-mb', type=int, default=512,
+                        help="size cap of the render cache in MB (default: 512)")
+    parser.add_argument('--log-level', default='DEBUG', choices=['DEBUG', 'INFO', 'WARNING', 'ERROR'],
+                        help="logging level (default: DEBUG)")
+    parser.add_argument('--report', default=None,
+                        help="write per-stage timings and counters (p50/p95/p99) as JSON to this file")
+    parser.add_argument('--profile-question', type=int, default=None,
+                        help="run cProfile and tracemalloc while processing this question number")
+    parser.add_argument('--profile-dir', default='.',
+                        help="directory for the profile of --profile-question (default: current directory)")
+    args = parser.parse_args(argv)
+    if args.start < 1:
+        parser.error(f"--start numbers questions from 1, got {args.start}")
+    if args.count is not None and args.count < 0:
+        parser.error(f"--count cannot be negative, got {args.count}")
+    if args.workers < 1 or args.chunk_size < 1:
+        parser.error("--workers and --chunk-size must be at least 1")
+    if args.pipeline and (args.output_dir is None or args.renderer != 'matplotlib'):
+        parser.error("--pipeline writes figure files and needs --output-dir with the matplotlib renderer")
+    if args.pipeline and (args.solve_only or args.json):
+        parser.error("--pipeline renders figures; it cannot be combined with --solve-only or --json")
+    if args.renderer == 'text' and args.output_dir is not None:
+        parser.error("--renderer text draws on stdout; it cannot be combined with --output-dir")
+    if args.cache_dir is not None and args.output_dir is None:
+        parser.error("--cache-dir caches written figure files and needs --output-dir")
+    try:
+        args.sheet_columns, args.sheet_rows = (int(n) for n in args.sheet_grid.lower().split('x'))
+    except ValueError:
+        parser.error(f"--sheet-grid must look like 3x2, not {args.sheet_grid!r}")
+    if args.watch and args.output_dir is None and args.renderer != 'text':
+        parser.error("--watch needs --output-dir or --renderer text")
+    if args.watch and (args.solve_only or args.json or (args.questions or '').endswith(COMPILED_EXTENSION)):
+        parser.error("--watch renders a .json or .jsonl bank; it cannot be combined with --solve-only or --json")
+    if args.watch and (args.start != 1 or args.count is not None or args.pipeline or args.workers > 1
+                       or args.contact_sheet is not None):
+        parser.error("--watch processes the whole bank in this process; drop --start, --count, --pipeline, "
+                     "--workers and --contact-sheet")
+    if args.profile_question is not None and (args.workers > 1 or args.pipeline or args.solve_only or args.json
+                                              or args.watch or args.check or args.contact_sheet is not None):
+        parser.error("--profile-question profiles the sequential solve and render loop; it cannot be combined "
+                     "with --workers, --pipeline, --solve-only, --json, --watch, --check or --contact-sheet")
+    return args
 
-    logger.debug(f"Looking for questions.json at: {data_path}")
+def print_solution(question, results):
+    """Print the values of a question's unknowns; exact fractions are printed as such, e.g. 151/2."""
+    print("Solution:")
+    for var in question["unknowns"]:
+        print(f"{var} = {results[var]}")
 
-    questions = load_questions(data_path)
-    if not questions:
-        return
+def json_value(value):
+    """Convert an exact Fraction to a float for JSON; ints (exact whole answers) and floats are kept as they are."""
+    return float(value) if isinstance(value, Fraction) else value
+
+def process_question(i, question, renderer, solve=solve_problem):
+    """Solve, print and visualize one question, reporting any error."""
+    print(f"Question {i+1}: {question['question']}")
     
-    for i, question in enumerate(questions["questions"]):
-        print(f"Question {i+1}: {question['question']}")
+    try:
+        with instrumentation.stage('solve'):
+            results = solve(question)
         
-        try:
-            results = solve_problem(question)
-            
-            print("Solution:")
-            for var in question["unknowns"]:
-                print(f"{var} = {results[var]}")
-                
-            # Visualize the solution with a bar model
-            visualize_solution(question, results)
+        print_solution(question, results)
             
-        except Exception as e:
-            print(f"Error solving problem: {e}")
-        
-        print("-" * 50)
+        # Visualize the solution with a bar model
+        with instrumentation.stage('render'):
+            visualize_solution(question, results, renderer, i)
         
-        # Close any open plots before moving to the next question
+    except Exception as e:
+        print(f"Error solving problem: {e}")
+    
+    print("-" * 50)
+    
+    # Close any open plots before moving to the next question
+    if renderer.interactive:
         import matplotlib.pyplot as plt
         plt.close('all')
 
+def solve_each(questions, solve=solve_problem):
+    """Solve questions one at a time, yielding (question, results, error)."""
+    for question in questions:
+        try:
+            with instrumentation.stage('solve'):
+                results = solve(question)
+        except Exception as e:
+            yield question, None, str(e)
+        else:
+            yield question, results, None
+
+def run_solve_only(questions, args, memo_stats):
+    """Print the answers of every question, as text or JSON lines, without rendering."""
+    memo = None
+    if args.workers > 1:
+        from parallel import solve_questions_parallel
+        outcomes = solve_questions_parallel(questions, args.workers, args.chunk_size,
+                                            first_index=args.start - 1, memo_size=args.memo_size,
+                                            memo_stats=memo_stats, linear=args.linear, exact=args.exact)
+    else:
+        solve, memo, _ = new_solver(args)
+        outcomes = solve_each(questions, solve)
+
+    for i, (question, results, error) in enumerate(outcomes, args.start - 1):
+        if args.json:
+            record = {'question': i + 1}
+            if error is None:
+                record['answers'] = {var: json_value(results[var]) for var in question["unknowns"]}
+            else:
+                record['error'] = error
+            print(json.dumps(record))
+            continue
+
+        print(f"Question {i+1}: {question['question']}")
+        if error is None:
+            print_solution(question, results)
+        else:
+            print(f"Error solving problem: {error}")
+        print("-" * 50)
+
+    if memo is not None:
+        memo_stats.update(memo.stats())
+
+def run_pipeline(questions, args, render_options):
+    """Solve and render through a Pipeline, printing answers in question order and per-stage throughput."""
+    from pipeline import Pipeline, print_pipeline_report
+
+    solve, memo, cache = new_solver(args)
+
+    def emit(i, question, results, error, path):
+        print(f"Question {i+1}: {question['question']}")
+        if results is not None:
+            print_solution(question, results)
+        if error is not None:
+            print(f"Error solving problem: {error}")
+        print("-" * 50)
+
+    pipeline = Pipeline(solve, render_options, render_workers=args.workers, queue_size=args.queue_size, emit=emit,
+                        progress_stream=sys.stderr)
+    report = pipeline.run(questions, args.start - 1)
+    print_pipeline_report(report)
+    if 'render_cache' in report:
+        print_cache_stats('Render cache', report['render_cache'])
+    if memo is not None:
+        print_cache_stats('Subgraph memo', memo.stats())
+    if cache is not None:
+        print_cache_stats('Result cache', cache.stats())
+
+def run_watch(data_path, args, renderer):
+    """Process the bank, then after every save only the questions that were added or changed.
+
+    Figures of questions that merely moved are renamed, and those of deleted
+    questions removed. Runs until interrupted.
+    """
+    from watch import BankWatcher
+
+    solve, _, _ = new_solver(args)
+    output_dir = args.output_dir
+
+    def update(questions, changed, moved, removed):
+        if output_dir is not None:
+            # Two steps, so a figure can move into the place of another that is moving on
+            for source, _ in moved:
+                if os.path.exists(renderer.output_path(source)):
+                    os.replace(renderer.output_path(source), renderer.output_path(source) + '.moving')
+            for source, target in moved:
+                if os.path.exists(renderer.output_path(source) + '.moving'):
+                    os.replace(renderer.output_path(source) + '.moving', renderer.output_path(target))
+                else:
+                    changed.append(target)
+            for position in removed + changed:
+                if os.path.exists(renderer.output_path(position)):
+                    os.remove(renderer.output_path(position))
+        for i in sorted(changed):
+            process_question(i, questions[i], renderer, solve)
+        print(f"Watching {data_path}: {len(changed)} changed, {len(moved)} moved, {len(removed)} removed "
+              f"of {len(questions)} questions")
+
+    try:
+        BankWatcher(data_path, update, debounce=args.debounce).run()
+    except KeyboardInterrupt:
+        pass
+
+def run_contact_sheet(questions, args):
+    """Solve every question and tile the bar models onto the pages of a PDF contact sheet."""
+    from model.bar_model import BarModel
+
+    def entries():
+        outcomes = solve_each(questions, new_solver(args)[0])
+        for i, (question, results, error) in enumerate(outcomes, args.start - 1):
+            yield i, question, BarModel(results) if results is not None else None, error
+
+    with instrumentation.stage('render'):
+        pages = create_renderer().render_contact_sheet(entries(), args.contact_sheet, args.sheet_columns,
+                                                       args.sheet_rows)
+    print(f"Contact sheet written to {args.contact_sheet} ({pages} pages)")
+
+def new_memo(args):
+    """Create the subgraph memo requested by --memo-size, if any."""
+    return SubgraphMemo(args.memo_size) if args.memo_size > 0 else None
+
+def print_cache_stats(label, stats, file=None):
+    """Print the hit/miss counters and hit rate of the cache named label."""
+    hits, misses = stats.get('hits', 0), stats.get('misses', 0)
+    rate = hits / (hits + misses) if hits + misses else 0.0
+    print(f"{label}: {hits} hits, {misses} misses ({rate:.1%} hit rate)", file=file)
+
+def main(argv=None):
+    """Main function to load and solve questions."""
+    args = parse_args(argv)
+
+    # Set up logging
+    logging.basicConfig(level=getattr(logging, args.log_level))
+
+    if args.report is None and args.profile_question is None:
+        return run(args)
+
+    profile_index = args.profile_question - 1 if args.profile_question is not None else None
+    with Instrumentation(profile_index, args.profile_dir) as inst:
+        status = run(args, inst)
+    if inst.profile is not None:
+        print(f"Profile of question {args.profile_question} written to {inst.profile['cprofile_stats']}")
+    if args.report is not None:
+        inst.write_report(args.report)
+    return status
+
+def select_questions(data_path, args):
+    """Stream the questions chosen by --start and --count, or None if the bank is missing."""
+    questions = load_questions(data_path, args.start - 1)
+    if questions is not None and args.count is not None:
+        questions = islice(questions, args.count)
+    return questions
+
+def run(args, inst=None):
+    """Solve (and render) every question of the bank selected by args.
+
+    With an Instrumentation, loading, solving and rendering are timed per
+    question. In --workers mode only the main process is instrumented.
+    Returns the exit status: 1 when --check or --precheck found errors.
+    """
+    data_path = args.questions
+    if data_path is None:
+        # Get absolute path to the data directory
+        current_dir = os.path.dirname(os.path.abspath(__file__))
+        parent_dir = os.path.dirname(current_dir)
+        data_path = os.path.join(parent_dir, 'data', 'questions.json')
+
+    logger.debug(f"Looking for question bank at: {data_path}")
+
+    if args.check or args.precheck:
+        from precheck import check_bank, print_check_report
+
+        questions = select_questions(data_path, args)
+        if questions is None:
+            return 1
+        with instrumentation.stage('check'):
+            report = check_bank(questions, args.workers, allow_cycles=args.linear, first_index=args.start - 1)
+        # Keep stdout a pure JSON Lines stream
+        errors = print_check_report(report, sys.stderr if args.json else None)
+        if errors:
+            if args.precheck:
+                print("Not solving: fix the errors above first", file=sys.stderr)
+            return 1
+        if args.check:
+            return 0
+
+    questions = select_questions(data_path, args)
+    if questions is None:
+        return
+    if inst is not None:
+        questions = inst.timed_iter('load', questions)
+
+    if args.solve_only or args.json:
+        memo_stats = {}
+        run_solve_only(questions, args, memo_stats)
+        if args.memo_size > 0:
+            # Keep stdout a pure JSON Lines stream
+            print_cache_stats('Subgraph memo', memo_stats, sys.stderr if args.json else None)
+        return
+
+    if args.pipeline:
+        os.makedirs(args.output_dir, exist_ok=True)
+        run_pipeline(questions, args, {'output_dir': args.output_dir, 'file_format': args.file_format,
+                                       'dpi': args.dpi, 'cache_dir': args.cache_dir,
+                                       'cache_max_bytes': args.cache_size_mb * 1024 * 1024,
+                                       'reuse_figure': args.reuse_figure})
+        return
+
+    if args.contact_sheet is not None:
+        run_contact_sheet(questions, args)
+        return
+
+    render_options = None
+    if args.renderer == 'text':
+        renderer = create_text_renderer(args.color)
+    else:
+        if args.output_dir is not None:
+            os.makedirs(args.output_dir, exist_ok=True)
+            render_options = {'output_dir': args.output_dir, 'file_format': args.file_format, 'dpi': args.dpi,
+                              'cache_dir': args.cache_dir, 'cache_max_bytes': args.cache_size_mb * 1024 * 1024,
+                              'reuse_figure': args.reuse_figure}
+        renderer = create_renderer(render_options)
+    cache_stats = {}
+    memo_stats = {}
+
+    if args.watch:
+        run_watch(data_path, args, renderer)
+        return
+
+    if args.workers > 1:
+        # Headless figures are written by the workers; interactive and text ones are drawn here
+        from parallel import solve_questions_parallel
+        solved = solve_questions_parallel(questions, args.workers, args.chunk_size, render_options,
+                                          cache_stats, args.start - 1, args.memo_size, memo_stats, args.linear,
+                                          args.exact)
+        for i, (question, results, error) in enumerate(solved, args.start - 1):
+            print(f"Question {i+1}: {question['question']}")
+
+            if results is not None:
+                try:
+                    print_solution(question, results)
+                    if render_options is None:
+                        visualize_solution(question, results, renderer, i)
+                except Exception as e:
+                    error = str(e)
+            if error is not None:
+                print(f"Error solving problem: {error}")
+
+            print("-" * 50)
+
+            if renderer.interactive:
+                import matplotlib.pyplot as plt
+                plt.close('all')
+        if renderer.cache is not None:
+            print_cache_stats('Render cache', cache_stats)
+        if args.memo_size > 0:
+            print_cache_stats('Subgraph memo', memo_stats)
+        return
+
+    solve, memo, result_cache = new_solver(args)
+    for i, question in enumerate(questions, args.start - 1):
+        with inst.question(i) if inst is not None else nullcontext():
+            process_question(i, question, renderer, solve)
+
+    if renderer.cache is not None:
+        print_cache_stats('Render cache', renderer.cache.stats())
+    if memo is not None:
+        print_cache_stats('Subgraph memo', memo.stats())
+    if result_cache is not None:
+        print_cache_stats('Result cache', result_cache.stats())
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
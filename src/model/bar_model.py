@@ -1,23 +1,120 @@
+from collections.abc import Mapping
+from itertools import islice
+
+import numpy as np
+
+# Initial capacity of the value array; it doubles whenever it fills up
+INITIAL_CAPACITY = 8
+
+
+class _ArrayView(Mapping):
+    """Read-only name -> value mapping over the first len(values) bars of a model."""
+
+    __slots__ = ('_model', '_values')
+
+    def __init__(self, model, values):
+        self._model = model
+        self._values = values
+
+    def __getitem__(self, name):
+        position = self._model.index[name]
+        if position >= len(self._values):
+            raise KeyError(name)
+        return float(self._values[position])
+
+    def __iter__(self):
+        return islice(self._model.names, len(self._values))
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, name):
+        return self._model.index.get(name, len(self._values)) < len(self._values)
+
+    def items(self):
+        return zip(self, self._values.tolist())
+
+    def values(self):
+        return self._values.tolist()
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+
 class BarModel:
-    def __init__(self, weights: dict):
-        """Initialize bar model with weights"""
-        self.weights = weights
-        self.max_weight = max(weights.values())
-        self.min_weight = min(weights.values())
+    """Bar lengths by variable name.
+
+    Names are kept in insertion order with an index for lookups; values live
+    in one float array, so sizes, extremes and scaling are vectorized and a
+    model of a million variables holds no per-variable objects beyond its
+    names.
+    """
+
+    def __init__(self, weights=None):
+        """Initialize bar model with weights (a name -> value mapping)"""
+        weights = weights if weights is not None else {}
+        # Classified definitions attached by the solver, if any
+        self.shapes = getattr(weights, 'shapes', {})
+        self.names = list(weights)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self._size = len(self.names)
+        self._values = np.empty(max(self._size, INITIAL_CAPACITY))
+        self._values[:self._size] = np.fromiter(weights.values(), dtype=float, count=self._size)
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def values(self):
+        """The bar values, in name order, as a NumPy array (a view, not a copy)."""
+        return self._values[:self._size]
+
+    @property
+    def weights(self):
+        """The bar values as a read-only name -> value mapping."""
+        return _ArrayView(self, self.values)
+
+    @property
+    def max_weight(self):
+        return float(self.values.max())
+
+    @property
+    def min_weight(self):
+        return float(self.values.min())
+
+    def relative_sizes(self):
+        """Return the relative sizes of bars (0-1 scale) as an array in name order"""
+        return self.values / self.max_weight
 
     def get_relative_sizes(self):
-        """Return the relative sizes of bars (0-1 scale)"""
-        return {
-            name: value/self.max_weight 
-            for name, value in self.weights.items()
-        }
-    
+        """Return the relative sizes of bars (0-1 scale) by name"""
+        return _ArrayView(self, self.relative_sizes())
+
+    def scaled(self, length):
+        """Return the bar values scaled so that the longest bar measures length"""
+        return self.values * (length / self.max_weight)
+
+    def get_representation(self):
+        """Return the bar values as a plain dict"""
+        return dict(zip(self.names, self.values.tolist()))
+
     def add_variable(self, name, value):
-        self.variables[name] = value
-    
+        """Add a bar (or replace the value of an existing one) in amortized O(1)"""
+        position = self.index.get(name)
+        if position is not None:
+            self._values[position] = value
+            return
+        if self._size == len(self._values):
+            grown = np.empty(2 * len(self._values))
+            grown[:self._size] = self._values[:self._size]
+            self._values = grown
+        self._values[self._size] = value
+        self.index[name] = self._size
+        self.names.append(name)
+        self._size += 1
+
     def generate_bar_representation(self):
-        # This method would generate a bar representation based on the variables
-        bar_representation = ""
-        for name, value in self.variables.items():
-            bar_representation += f"{name}: {'|' * (value // 10)} ({value} grams)\n"
-        return bar_representation.strip()
\ No newline at end of file
+        """Return one text line per bar, with one '|' per 10 units"""
+        counts = np.maximum(self.values // 10, 0).astype(int).tolist()
+        return "\n".join(f"{name}: {'|' * count} ({value} grams)"
+                         for name, count, value in zip(self.names, counts, self.values.tolist()))
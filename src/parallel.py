@@ -0,0 +1,134 @@
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from solver.dependency_graph import solve_variables
+
+# Questions sent to a worker per task; large enough to amortize pickling/IPC
+DEFAULT_CHUNK_SIZE = 64
+
+# Renderer of the current worker process, reused across chunks (keeps its cache index warm)
+_worker_renderer = None
+# Subgraph memo of the current worker process, shared by all the chunks it solves
+_worker_memo = None
+
+
+def _chunks(questions, chunk_size, start=0):
+    """Split any iterable of questions into (start index, list of at most chunk_size) pairs."""
+    iterator = iter(questions)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def _get_worker_renderer(render_options):
+    """Return this process's headless BarRenderer, creating it on first use."""
+    global _worker_renderer
+    if _worker_renderer is None:
+        from visualization.bar_renderer import BarRenderer
+        _worker_renderer = BarRenderer(**render_options)
+    return _worker_renderer
+
+
+def _get_worker_memo(memo_size):
+    """Return this process's SubgraphMemo, creating it on first use."""
+    global _worker_memo
+    if _worker_memo is None:
+        from solver.memo import SubgraphMemo
+        _worker_memo = SubgraphMemo(memo_size)
+    return _worker_memo
+
+
+def _solve_chunk(start, questions, render_options, memo_size=None, linear=False, exact=False):
+    """Solve (and, when render_options is given, render) a chunk in a worker process.
+
+    render_options are the keyword arguments of a headless BarRenderer; with
+    a memo_size, values are memoized across all questions this worker
+    solves; linear and exact are passed on to solve_variables. Errors are
+    captured per question as their message, so one bad question does not
+    fail the rest of the chunk. Returns the outcomes and
+    the render cache and memo (hits, misses) of this chunk.
+    """
+    memo = _get_worker_memo(memo_size) if memo_size else None
+    memo_before = (memo.hits, memo.misses) if memo is not None else (0, 0)
+    renderer = None
+    cache_before = (0, 0)
+    if render_options is not None:
+        from model.bar_model import BarModel
+        renderer = _get_worker_renderer(render_options)
+        if renderer.cache is not None:
+            cache_before = (renderer.cache.hits, renderer.cache.misses)
+
+    outcomes = []
+    for index, question in enumerate(questions, start):
+        try:
+            results = solve_variables(question["variables"], question["unknowns"], memo=memo, linear=linear,
+                                      exact=exact)
+        except Exception as e:
+            outcomes.append((None, str(e)))
+            continue
+        error = None
+        if renderer is not None:
+            try:
+                renderer.render(BarModel(results), question, index=index)
+            except Exception as e:
+                error = str(e)
+        outcomes.append((results, error))
+
+    cache_counts = (0, 0)
+    if renderer is not None and renderer.cache is not None:
+        cache_counts = (renderer.cache.hits - cache_before[0], renderer.cache.misses - cache_before[1])
+    memo_counts = (0, 0)
+    if memo is not None:
+        memo_counts = (memo.hits - memo_before[0], memo.misses - memo_before[1])
+    return outcomes, cache_counts, memo_counts
+
+
+def solve_questions_parallel(questions, workers, chunk_size=DEFAULT_CHUNK_SIZE, render_options=None,
+                             cache_stats=None, first_index=0, memo_size=None, memo_stats=None, linear=False,
+                             exact=False):
+    """Solve questions in a process pool, yielding (question, results, error) in input order.
+
+    With render_options (keyword arguments for a headless BarRenderer) the
+    workers also write each question's figure, and render cache hits and
+    misses are added to the cache_stats dict when one is given. Figures are
+    numbered from first_index, the bank index of the first question. With a
+    memo_size each worker memoizes shared subgraphs, and its hits and misses
+    are added to the memo_stats dict when one is given. With linear=True
+    cycles are solved as simultaneous linear relations, and with exact=True
+    values are exact ints or Fractions. At most two chunks per worker are
+    in flight, so the input can be a generator and memory stays bounded
+    however long the bank is.
+    """
+    if cache_stats is None:
+        cache_stats = {}
+    if memo_stats is None:
+        memo_stats = {}
+    max_in_flight = workers * 2
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for start, chunk in _chunks(questions, chunk_size, first_index):
+            future = executor.submit(_solve_chunk, start, chunk, render_options, memo_size, linear, exact)
+            in_flight.append((chunk, future))
+            if len(in_flight) >= max_in_flight:
+                yield from _collect(*in_flight.popleft(), cache_stats, memo_stats)
+        while in_flight:
+            yield from _collect(*in_flight.popleft(), cache_stats, memo_stats)
+
+
+def _add_counts(stats, counts):
+    hits, misses = counts
+    stats['hits'] = stats.get('hits', 0) + hits
+    stats['misses'] = stats.get('misses', 0) + misses
+
+
+def _collect(chunk, future, cache_stats, memo_stats):
+    """Pair each question of a finished chunk with its outcome."""
+    outcomes, cache_counts, memo_counts = future.result()
+    _add_counts(cache_stats, cache_counts)
+    _add_counts(memo_stats, memo_counts)
+    for question, (results, error) in zip(chunk, outcomes):
+        yield question, results, error
@@ -0,0 +1,254 @@
+import asyncio
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from visualization.render_cache import DEFAULT_MAX_BYTES, RenderCache
+
+# Items buffered between two stages before the upstream stage has to wait
+DEFAULT_QUEUE_SIZE = 32
+DEFAULT_RENDER_WORKERS = 2
+# Seconds between progress lines
+DEFAULT_PROGRESS_INTERVAL = 5.0
+
+STAGES = ('load', 'solve', 'render', 'write')
+
+# Renderer of the current render worker process
+_worker_renderer = None
+
+_END = object()
+
+
+def _render_question(render_options, index, question, results):
+    """Render one question in a render worker process.
+
+    Returns (output path, image bytes, cache key). With a render cache, a
+    hit is copied to the output path straight away and comes back without
+    image bytes; a miss comes back with the key to store its figure under.
+    """
+    global _worker_renderer
+    if _worker_renderer is None:
+        from visualization.bar_renderer import BarRenderer
+        _worker_renderer = BarRenderer(**render_options)
+    from model.bar_model import BarModel
+    renderer = _worker_renderer
+    bar_model = BarModel(results)
+    path = renderer.output_path(index)
+    key = None
+    if renderer.cache is not None:
+        key = renderer.cache_key(bar_model, question)
+        if renderer.cache.get(key, renderer.file_format, path):
+            return path, None, None
+    return path, renderer.render_bytes(bar_model, question), key
+
+
+def _write_file(path, data, cache=None, key=None, file_format=None):
+    with open(path, 'wb') as file:
+        file.write(data)
+    if key is not None:
+        cache.put(key, file_format, path)
+
+
+class StageStats:
+    """Item count and time split of one pipeline stage.
+
+    work is time spent on its own items (including waiting for the render
+    executor), starved is time waiting for input, and blocked is time
+    waiting for room in the next queue, i.e. backpressure from downstream.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.work = 0.0
+        self.starved = 0.0
+        self.blocked = 0.0
+
+    def report(self, elapsed):
+        return {'items': self.items, 'per_second': self.items / elapsed if elapsed > 0 else 0.0,
+                'work_s': self.work, 'starved_s': self.starved, 'blocked_s': self.blocked}
+
+
+class Pipeline:
+    """Load, solve, render and write questions as concurrent stages.
+
+    Stages are asyncio tasks joined by bounded queues, so a slow stage
+    fills its input queue and holds back the stages before it. solve(question)
+    runs on the event loop; figures are drawn in a process pool
+    (render_workers processes, headless BarRenderer built from
+    render_options) and written to its output_dir by a thread, in question
+    order. With a cache_dir in render_options, figures are reused from
+    and stored in that RenderCache. emit(index, question, results, error,
+    path) is called by the write stage for every question.
+    """
+
+    def __init__(self, solve, render_options, render_workers=DEFAULT_RENDER_WORKERS, queue_size=DEFAULT_QUEUE_SIZE,
+                 emit=None, progress_stream=None, progress_interval=DEFAULT_PROGRESS_INTERVAL):
+        self.solve = solve
+        self.render_options = render_options
+        self.render_workers = render_workers
+        self.queue_size = queue_size
+        self.emit = emit
+        self.progress_stream = progress_stream
+        self.progress_interval = progress_interval
+        self.stats = {name: StageStats(name) for name in STAGES}
+        self.elapsed = 0.0
+        self.cache = None
+        self.cache_stats = {'hits': 0, 'misses': 0}
+        if render_options.get('cache_dir') is not None:
+            # Workers look figures up in their own RenderCache; this one stores them after writing
+            self.cache = RenderCache(render_options['cache_dir'],
+                                     render_options.get('cache_max_bytes', DEFAULT_MAX_BYTES))
+
+    def run(self, questions, first_index=0):
+        """Process every question; returns the per-stage report."""
+        asyncio.run(self._run(questions, first_index))
+        return self.report()
+
+    async def _run(self, questions, first_index):
+        solve_queue = asyncio.Queue(self.queue_size)
+        render_queue = asyncio.Queue(self.queue_size)
+        write_queue = asyncio.Queue(self.queue_size)
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=self.render_workers) as executor:
+            progress = asyncio.ensure_future(self._progress(started))
+            try:
+                await asyncio.gather(
+                    self._load(questions, first_index, solve_queue),
+                    self._solve(solve_queue, render_queue),
+                    self._render(render_queue, write_queue, executor),
+                    self._write(write_queue),
+                )
+            finally:
+                progress.cancel()
+        self.elapsed = time.perf_counter() - started
+
+    async def _put(self, queue, item, stats):
+        start = time.perf_counter()
+        await queue.put(item)
+        stats.blocked += time.perf_counter() - start
+
+    async def _get(self, queue, stats):
+        start = time.perf_counter()
+        item = await queue.get()
+        stats.starved += time.perf_counter() - start
+        return item
+
+    async def _load(self, questions, first_index, output):
+        stats = self.stats['load']
+        iterator = iter(questions)
+        index = first_index
+        while True:
+            start = time.perf_counter()
+            question = next(iterator, _END)
+            stats.work += time.perf_counter() - start
+            if question is _END:
+                break
+            stats.items += 1
+            await self._put(output, (index, question), stats)
+            index += 1
+        await output.put(_END)
+
+    async def _solve(self, input, output):
+        stats = self.stats['solve']
+        while True:
+            item = await self._get(input, stats)
+            if item is _END:
+                break
+            index, question = item
+            start = time.perf_counter()
+            try:
+                results, error = self.solve(question), None
+            except Exception as e:
+                results, error = None, str(e)
+            stats.work += time.perf_counter() - start
+            stats.items += 1
+            await self._put(output, (index, question, results, error), stats)
+        await output.put(_END)
+
+    async def _render(self, input, output, executor):
+        """Keep up to render_workers figures in flight, passing them on in order."""
+        stats = self.stats['render']
+        loop = asyncio.get_running_loop()
+        in_flight = deque()
+        finished = False
+        while not finished or in_flight:
+            head_done = in_flight and (in_flight[0][1] is None or in_flight[0][1].done())
+            if not finished and len(in_flight) < self.render_workers and not head_done:
+                item = await self._get(input, stats)
+                if item is _END:
+                    finished = True
+                    continue
+                index, question, results, error = item
+                future = None
+                if results is not None:
+                    future = loop.run_in_executor(executor, _render_question, self.render_options,
+                                                  index, question, results)
+                in_flight.append((item, future))
+                continue
+
+            (index, question, results, error), future = in_flight.popleft()
+            data = None
+            if future is not None:
+                start = time.perf_counter()
+                try:
+                    data = await future
+                except Exception as e:
+                    error = str(e)
+                stats.work += time.perf_counter() - start
+            stats.items += 1
+            await self._put(output, (index, question, results, error, data), stats)
+        await output.put(_END)
+
+    async def _write(self, input):
+        stats = self.stats['write']
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._get(input, stats)
+            if item is _END:
+                break
+            index, question, results, error, data = item
+            start = time.perf_counter()
+            path = None
+            if data is not None:
+                path, image, key = data
+                if image is None:
+                    self.cache_stats['hits'] += 1
+                else:
+                    self.cache_stats['misses'] += key is not None
+                    await loop.run_in_executor(None, _write_file, path, image, self.cache, key,
+                                               self.render_options.get('file_format', 'png'))
+            if self.emit is not None:
+                self.emit(index, question, results, error, path)
+            stats.work += time.perf_counter() - start
+            stats.items += 1
+
+    async def _progress(self, started):
+        if self.progress_stream is None:
+            return
+        while True:
+            await asyncio.sleep(self.progress_interval)
+            counts = ", ".join(f"{name} {self.stats[name].items}" for name in STAGES)
+            print(f"[{time.perf_counter() - started:.1f} s] {counts}", file=self.progress_stream)
+
+    def bottleneck(self):
+        """The stage that spent the most time working rather than waiting."""
+        return max(STAGES, key=lambda name: self.stats[name].work)
+
+    def report(self):
+        report = {'elapsed_s': self.elapsed, 'bottleneck': self.bottleneck(),
+                  'stages': {name: self.stats[name].report(self.elapsed) for name in STAGES}}
+        if self.cache is not None:
+            report['render_cache'] = dict(self.cache_stats)
+        return report
+
+
+def print_pipeline_report(report, file=None):
+    """Print per-stage throughput and where each stage spent its time."""
+    file = file or sys.stdout
+    print(f"Pipeline: {report['elapsed_s']:.2f} s", file=file)
+    for name, stage in report['stages'].items():
+        print(f"  {name:<7}{stage['items']:>8} items {stage['per_second']:>10.1f}/s   work {stage['work_s']:.2f} s"
+              f"   starved {stage['starved_s']:.2f} s   blocked {stage['blocked_s']:.2f} s", file=file)
+    print(f"Bottleneck: {report['bottleneck']}", file=file)
@@ -0,0 +1,114 @@
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+from expression_parser import compile_expression, postorder
+from question_schema import schema_errors
+from solver.linear_system import strongly_connected_components
+
+# Questions checked per worker task
+DEFAULT_CHECK_CHUNK_SIZE = 2000
+
+ERROR = 'error'
+WARNING = 'warning'
+
+
+def _divides_by_zero(tree):
+    return any(node[0] == '/' and node[2] == ('number', 0.0) for node in postorder(tree))
+
+
+def check_question(question, allow_cycles=False):
+    """Statically check one question without solving it.
+
+    Returns a list of (severity, message). Errors are schema violations,
+    syntax errors, undefined names, unknowns with no definition, division
+    by a literal zero and, unless allow_cycles (the --linear solver), cycles.
+    Warnings are sums whose terms the bar renderer cannot draw as segments,
+    so it draws them as one plain bar.
+    """
+    messages = schema_errors(question)
+    if messages:
+        return [(ERROR, message) for message in messages]
+
+    issues = []
+    definitions = question["variables"]
+    dependencies = {}
+    for name, definition in definitions.items():
+        try:
+            expression = compile_expression(definition)
+        except ValueError as e:
+            issues.append((ERROR, f"variables/{name}: {e}"))
+            dependencies[name] = ()
+            continue
+        for missing in sorted(expression.names - definitions.keys()):
+            issues.append((ERROR, f"variables/{name}: undefined variable '{missing}'"))
+        dependencies[name] = [dependency for dependency in expression.names if dependency in definitions]
+        if _divides_by_zero(expression.tree):
+            issues.append((ERROR, f"variables/{name}: division by zero in '{definition}'"))
+        elif expression.tree[0] == '+' and expression.shape == ('other',):
+            issues.append((WARNING, f"variables/{name}: the terms of '{definition}' cannot be drawn as bar "
+                                    "segments (only positive multiples of variables can); it is drawn as one bar"))
+
+    for unknown in question["unknowns"]:
+        if unknown not in definitions:
+            issues.append((ERROR, f"unknowns: '{unknown}' has no definition"))
+
+    if not allow_cycles:
+        for component in strongly_connected_components(list(definitions), dependencies):
+            if len(component) > 1 or component[0] in dependencies[component[0]]:
+                members = [name for name in definitions if name in component]
+                issues.append((ERROR, f"cyclic dependency among {', '.join(members)}"))
+    return issues
+
+
+def _check_chunk(start, questions, allow_cycles):
+    """Check a chunk in a worker process; returns (question number, severity, message) triples."""
+    return [(number, severity, message)
+            for number, question in enumerate(questions, start + 1)
+            for severity, message in check_question(question, allow_cycles)]
+
+
+def check_bank(questions, workers=1, chunk_size=DEFAULT_CHECK_CHUNK_SIZE, allow_cycles=False, first_index=0):
+    """Check every question of a bank, in worker processes when workers > 1.
+
+    Returns a report dict with the number of questions checked and the
+    issues as (question number, severity, message), in bank order. Questions
+    are numbered from first_index + 1; like solve_questions_parallel, only
+    a few chunks are in flight at a time.
+    """
+    iterator = iter(questions)
+    issues = []
+    count = 0
+    if workers <= 1:
+        for number, question in enumerate(iterator, first_index + 1):
+            issues.extend((number, severity, message) for severity, message in check_question(question, allow_cycles))
+            count += 1
+        return {'questions': count, 'issues': issues}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        start = first_index
+        while True:
+            chunk = list(islice(iterator, chunk_size))
+            if chunk:
+                in_flight.append(executor.submit(_check_chunk, start, chunk, allow_cycles))
+                start += len(chunk)
+                count += len(chunk)
+            if in_flight and (not chunk or len(in_flight) >= workers * 2):
+                issues.extend(in_flight.popleft().result())
+            if not chunk and not in_flight:
+                break
+    return {'questions': count, 'issues': issues}
+
+
+def print_check_report(report, file=None):
+    """Print every issue, then a summary line; returns the number of errors."""
+    file = file or sys.stdout
+    errors = 0
+    for number, severity, message in report['issues']:
+        print(f"Question {number}: {severity}: {message}", file=file)
+        errors += severity == ERROR
+    warnings = len(report['issues']) - errors
+    print(f"Checked {report['questions']} questions: {errors} errors, {warnings} warnings", file=file)
+    return errors
@@ -0,0 +1,120 @@
+import json
+import os
+
+# Characters read from the bank file per refill of the parse buffer
+READ_SIZE = 1 << 16
+
+JSON_LINES_EXTENSIONS = ('.jsonl', '.ndjson')
+
+_WHITESPACE = ' \t\n\r'
+
+
+class _IncrementalReader:
+    """Decodes JSON values one at a time from a file, keeping only a small buffer."""
+
+    def __init__(self, file):
+        self.file = file
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        """Read more text, dropping what has already been consumed."""
+        chunk = self.file.read(READ_SIZE)
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it ('' at EOF)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                return ''
+            self._fill()
+
+    def expect(self, char):
+        """Consume the next non-whitespace character, which must be char."""
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed question bank: expected {char!r}, found {found or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number at the end of the buffer may continue in the next read
+                if end < len(self.buffer) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise ValueError(f"Malformed question bank: {e}")
+            self._fill()
+
+    def array_items(self):
+        """Yield the elements of the JSON array starting at the current position."""
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect(']')
+            return
+
+
+def _iter_wrapped(file):
+    """Yield questions from a {"questions": [...]} document without loading it whole."""
+    with file:
+        reader = _IncrementalReader(file)
+        if reader.peek() == '[':
+            yield from reader.array_items()
+            return
+        reader.expect('{')
+        while reader.peek() != '}':
+            key = reader.value()
+            reader.expect(':')
+            if key == 'questions':
+                yield from reader.array_items()
+            else:
+                reader.value()
+            if reader.peek() == ',':
+                reader.pos += 1
+        reader.expect('}')
+
+
+def _iter_json_lines(file):
+    """Yield one question per non-blank line of a JSON Lines file."""
+    with file:
+        for line_number, line in enumerate(file, 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Malformed question on line {line_number}: {e}")
+
+
+def iter_questions(file_path):
+    """Stream question dicts from a question bank file, one at a time.
+
+    Files ending in .jsonl or .ndjson hold one question per line; any other
+    file is parsed incrementally as the {"questions": [...]} format (or a bare
+    array of questions). The file is opened immediately, so a missing bank
+    raises FileNotFoundError here rather than on first iteration.
+    """
+    file = open(file_path, 'r')
+    if os.path.splitext(file_path)[1].lower() in JSON_LINES_EXTENSIONS:
+        return _iter_json_lines(file)
+    return _iter_wrapped(file)
@@ -0,0 +1,118 @@
+import re
+from functools import lru_cache
+
+# JSON Schema of one question of a bank
+QUESTION_SCHEMA = {
+    "$schema": "http://json-schema.org/draft-07/schema#",
+    "type": "object",
+    "required": ["question", "variables", "unknowns"],
+    "properties": {
+        "question": {"type": "string"},
+        "variables": {
+            "type": "object",
+            "minProperties": 1,
+            "propertyNames": {"pattern": "^[A-Za-z_][A-Za-z0-9_]*$"},
+            "additionalProperties": {"type": "string", "minLength": 1},
+        },
+        "unknowns": {
+            "type": "array",
+            "minItems": 1,
+            "items": {"type": "string"},
+        },
+    },
+}
+
+
+@lru_cache(maxsize=None)
+def question_validator():
+    """Return the validator of QUESTION_SCHEMA, built once per process."""
+    from jsonschema import Draft7Validator
+    Draft7Validator.check_schema(QUESTION_SCHEMA)
+    return Draft7Validator(QUESTION_SCHEMA)
+
+
+_TYPES = {
+    'object': lambda value: isinstance(value, dict),
+    'array': lambda value: isinstance(value, list),
+    'string': lambda value: isinstance(value, str),
+    'number': lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    'integer': lambda value: isinstance(value, int) and not isinstance(value, bool),
+    'boolean': lambda value: isinstance(value, bool),
+    'null': lambda value: value is None,
+}
+
+
+def _compile(schema):
+    """Turn a schema into a predicate; raises KeyError for keywords it does not handle."""
+    for keyword in schema:
+        if keyword not in _KEYWORDS:
+            raise KeyError(keyword)
+    checks = []
+    if 'type' in schema:
+        checks.append(_TYPES[schema['type']])
+    if 'minLength' in schema:
+        min_length = schema['minLength']
+        checks.append(lambda value: not isinstance(value, str) or len(value) >= min_length)
+    if 'pattern' in schema:
+        search = re.compile(schema['pattern']).search
+        checks.append(lambda value: not isinstance(value, str) or search(value) is not None)
+    if 'minItems' in schema:
+        min_items = schema['minItems']
+        checks.append(lambda value: not isinstance(value, list) or len(value) >= min_items)
+    if 'items' in schema:
+        item = _compile(schema['items'])
+        checks.append(lambda value: not isinstance(value, list) or all(item(v) for v in value))
+    if 'required' in schema:
+        required = tuple(schema['required'])
+        checks.append(lambda value: not isinstance(value, dict) or all(key in value for key in required))
+    if 'minProperties' in schema:
+        min_properties = schema['minProperties']
+        checks.append(lambda value: not isinstance(value, dict) or len(value) >= min_properties)
+    if 'properties' in schema:
+        properties = {key: _compile(sub) for key, sub in schema['properties'].items()}
+        checks.append(lambda value: not isinstance(value, dict) or
+                      all(check(value[key]) for key, check in properties.items() if key in value))
+    if 'propertyNames' in schema:
+        name = _compile(schema['propertyNames'])
+        checks.append(lambda value: not isinstance(value, dict) or all(name(key) for key in value))
+    if 'additionalProperties' in schema:
+        known = frozenset(schema.get('properties', ()))
+        extra = _compile(schema['additionalProperties'])
+        checks.append(lambda value: not isinstance(value, dict) or
+                      all(extra(v) for key, v in value.items() if key not in known))
+    return lambda value: all(check(value) for check in checks)
+
+
+_KEYWORDS = {'$schema', 'type', 'minLength', 'pattern', 'minItems', 'items', 'required', 'minProperties',
+             'properties', 'propertyNames', 'additionalProperties'}
+
+
+@lru_cache(maxsize=None)
+def compiled_question_check():
+    """Return QUESTION_SCHEMA compiled to a plain Python predicate, or None.
+
+    The predicate only answers valid or not, about ten times faster than the
+    jsonschema validator; it is None if the schema uses keywords (or a list
+    of types) the compiler does not handle.
+    """
+    try:
+        return _compile(QUESTION_SCHEMA)
+    except (KeyError, TypeError):
+        return None
+
+
+def schema_errors(question):
+    """Return readable messages for every way question violates the schema.
+
+    Valid questions are passed by the compiled check; jsonschema only runs
+    to explain a question that fails it.
+    """
+    check = compiled_question_check()
+    if check is not None and check(question):
+        return []
+    errors = sorted(question_validator().iter_errors(question), key=lambda error: list(error.absolute_path))
+    messages = []
+    for error in errors:
+        location = "/".join(str(part) for part in error.absolute_path)
+        messages.append(f"{location}: {error.message}" if location else error.message)
+    return messages
@@ -0,0 +1,180 @@
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from fractions import Fraction
+
+from flask import Flask, Response, g, jsonify, request
+
+from instrumentation import percentile
+from lru import LockedLRUCache
+from model.bar_model import BarModel
+from question_schema import schema_errors
+from solver.dependency_graph import DependencyGraph
+from visualization.bar_renderer import OUTPUT_FORMATS, RENDERER_VERSION, BarRenderer
+from visualization.render_cache import RenderCache
+
+COMPILED_CACHE_SIZE = 10000
+IMAGE_CACHE_BYTES = 64 * 1024 * 1024
+# Latency samples kept per endpoint for percentile reporting
+LATENCY_WINDOW = 10000
+
+
+class RequestMetrics:
+    """Request counts, error counts and latency percentiles per endpoint."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.window = window
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, failed):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = {'count': 0, 'errors': 0, 'latencies': deque(maxlen=self.window)}
+            stats['count'] += 1
+            stats['errors'] += failed
+            stats['latencies'].append(seconds * 1000)
+
+    def report(self):
+        with self._lock:
+            snapshot = {name: (stats['count'], stats['errors'], sorted(stats['latencies']))
+                        for name, stats in self._endpoints.items()}
+        return {name: {'count': count, 'errors': errors,
+                       'latency_ms': {f"p{q}": percentile(latencies, q) for q in (50, 95, 99)}}
+                for name, (count, errors, latencies) in snapshot.items()}
+
+
+def _question_from(payload, needs_text=False):
+    """Check a payload against the question schema; raises ValueError listing every violation.
+
+    The 'question' text is optional unless needs_text (rendering draws it).
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("A question needs a 'variables' object and an 'unknowns' list")
+    if not needs_text and 'question' not in payload:
+        messages = schema_errors(dict(payload, question=""))
+    else:
+        messages = schema_errors(payload)
+    if messages:
+        raise ValueError(f"Invalid question: {'; '.join(messages)}")
+    return payload
+
+
+def _json_values(results):
+    """Solved values with exact Fractions converted to floats for JSON."""
+    return {name: float(value) if isinstance(value, Fraction) else value for name, value in results.items()}
+
+
+def create_app(compiled_cache_size=COMPILED_CACHE_SIZE, image_cache_bytes=IMAGE_CACHE_BYTES, exact=False):
+    """Create the solve/render service.
+
+    Compiled questions (dependency graph plus evaluation order) and rendered
+    images are cached in process and shared by all requests. With exact=True
+    questions are solved in exact arithmetic and their results are cached
+    with the compiled question, so repeat solves and renders evaluate nothing.
+    """
+    app = Flask(__name__)
+    compiled = LockedLRUCache(max_entries=compiled_cache_size)
+    images = LockedLRUCache(max_bytes=image_cache_bytes)
+    metrics = RequestMetrics()
+
+    def solve(question):
+        key = json.dumps([question['variables'], question['unknowns']], separators=(',', ':'))
+        entry = compiled.get(key)
+        if entry is None:
+            graph = DependencyGraph(question['variables'])
+            order = graph.topological_order(list(question['unknowns']) + graph.names)
+            entry = (graph, order, graph.evaluate(order, exact=True) if exact else None)
+            compiled.put(key, entry)
+        graph, order, results = entry
+        return results if results is not None else graph.evaluate(order)
+
+    def error_response(message, status=400):
+        g.failed = True
+        return jsonify({'error': message}), status
+
+    @app.before_request
+    def start_timer():
+        g.started = time.perf_counter()
+        g.failed = False
+
+    @app.after_request
+    def record_metrics(response):
+        endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+        metrics.record(endpoint, time.perf_counter() - g.started, g.failed or response.status_code >= 400)
+        return response
+
+    @app.route('/solve', methods=['POST'])
+    def solve_one():
+        try:
+            question = _question_from(request.get_json(silent=True))
+            results = _json_values(solve(question))
+        except ValueError as e:
+            return error_response(str(e))
+        return jsonify({'results': results,
+                        'unknowns': {name: results[name] for name in question['unknowns']}})
+
+    @app.route('/solve/bulk', methods=['POST'])
+    def solve_bulk():
+        payload = request.get_json(silent=True)
+        if not isinstance(payload, dict) or not isinstance(payload.get('questions'), list):
+            return error_response("Expected a JSON object with a 'questions' list")
+        outcomes = []
+        for question in payload['questions']:
+            try:
+                results = _json_values(solve(_question_from(question)))
+                outcomes.append({'results': results,
+                                 'unknowns': {name: results[name] for name in question['unknowns']}})
+            except ValueError as e:
+                outcomes.append({'error': str(e)})
+        return jsonify({'results': outcomes})
+
+    @app.route('/render', methods=['POST'])
+    def render_image():
+        file_format = request.args.get('format', 'png')
+        if file_format not in OUTPUT_FORMATS:
+            return error_response(f"Unsupported format '{file_format}', expected one of {OUTPUT_FORMATS}")
+        try:
+            question = _question_from(request.get_json(silent=True), needs_text=True)
+            results = solve(question)
+        except ValueError as e:
+            return error_response(str(e))
+
+        renderer = BarRenderer(file_format=file_format)
+        key = RenderCache.key(question, results, file_format, renderer.dpi, RENDERER_VERSION)
+        image = images.get(key)
+        if image is None:
+            try:
+                # A renderer per request: BarRenderer keeps per-figure state
+                image = renderer.render_bytes(BarModel(results), question)
+            except ValueError as e:
+                return error_response(str(e))
+            images.put(key, image, len(image))
+        mimetype = {'png': 'image/png', 'svg': 'image/svg+xml', 'pdf': 'application/pdf'}[file_format]
+        return Response(image, mimetype=mimetype)
+
+    @app.route('/metrics', methods=['GET'])
+    def report_metrics():
+        return jsonify({'requests': metrics.report(),
+                        'compiled_cache': compiled.stats(),
+                        'image_cache': images.stats()})
+
+    return app
+
+
+def main(argv=None):
+    """Run the service with Flask's built-in server."""
+    parser = argparse.ArgumentParser(description="Serve question solving and bar model rendering over HTTP.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--exact', action='store_true',
+                        help="solve in exact integer and fraction arithmetic, caching each solved question")
+    args = parser.parse_args(argv)
+    create_app(exact=args.exact).run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import numpy as np
+
+from solver.dependency_graph import DependencyGraph
+
+
+class BatchResult:
+    """Per-variable result arrays for many variants of one question template."""
+
+    def __init__(self, values, valid):
+        self.values = values
+        self.valid = valid
+
+    def __len__(self):
+        return len(self.valid)
+
+    def __getitem__(self, name):
+        """Return the values of one variable with invalid rows masked out."""
+        return np.ma.masked_array(self.values[name], mask=~self.valid)
+
+    def row(self, index):
+        """Return the solved variables of one variant as a plain dict."""
+        return {name: float(column[index]) for name, column in self.values.items()}
+
+
+def solve_batch(question_data, inputs, required_only=False, allow_negative=False):
+    """Solve one question template for many sets of input values at once.
+
+    inputs maps input variable names (e.g. 'mango') to equal-length columns
+    of values that replace their definitions. Every expression is evaluated
+    once over whole NumPy arrays, in dependency order. Rows that divide by
+    zero, or produce a negative value unless allow_negative is set, are
+    marked invalid in the result; a literal division by zero such as "5/0"
+    marks every row invalid.
+    """
+    definitions = question_data["variables"]
+    columns = {}
+    for name, column in inputs.items():
+        if name not in definitions:
+            raise ValueError(f"Input '{name}' is not a variable of this question")
+        columns[name] = np.asarray(column, dtype=np.float64)
+        if columns[name].ndim != 1:
+            raise ValueError(f"Input '{name}' must be a one-dimensional column")
+
+    sizes = {len(column) for column in columns.values()}
+    if len(sizes) > 1:
+        raise ValueError(f"Input columns have different lengths: {sorted(sizes)}")
+    size = sizes.pop() if sizes else 1
+
+    # Inputs become leaves of the graph, so their original definitions are ignored
+    leaf_definitions = {name: ("0" if name in columns else expression)
+                        for name, expression in definitions.items()}
+    graph = DependencyGraph(leaf_definitions)
+    targets = list(question_data["unknowns"])
+    if not required_only:
+        targets += graph.names
+    order = graph.topological_order(targets)
+
+    values = {}
+    valid = np.ones(size, dtype=bool)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        for name in order:
+            if name in columns:
+                result = columns[name]
+            else:
+                expression = graph.expressions[name]
+                try:
+                    result = expression.evaluate(values)
+                except ValueError as e:
+                    if expression.names:
+                        raise ValueError(f"Failed to evaluate {name}: {e}")
+                    # Literals are evaluated in Python floats, so e.g. "5/0" raises
+                    # instead of giving inf; it fails the same way in every row
+                    result = np.nan
+            result = np.broadcast_to(np.asarray(result, dtype=np.float64), (size,))
+            values[name] = result
+            valid &= np.isfinite(result)
+            if not allow_negative:
+                valid &= result >= 0
+
+    ordered = {name: values[name] for name in graph.names if name in values}
+    return BatchResult(ordered, valid)
@@ -0,0 +1,206 @@
+from collections import deque
+
+import instrumentation
+from expression_parser import ExpressionParser
+from solver.linear_system import solve_block, strongly_connected_components
+
+
+class DependencyError(ValueError):
+    """Raised when a question's variables cannot be put in solving order."""
+
+
+class UndefinedVariableError(DependencyError):
+    """Raised when an expression (or an unknown) refers to a name with no definition."""
+
+    def __init__(self, name, path):
+        self.name = name
+        self.path = path
+        super().__init__(f"Undefined variable '{name}' (required by {' -> '.join(path)})")
+
+
+class CyclicDependencyError(DependencyError):
+    """Raised when variables depend on each other in a cycle."""
+
+    def __init__(self, cycle):
+        self.cycle = cycle
+        super().__init__(f"Cyclic dependency: {' -> '.join(cycle)}")
+
+
+class Solution(dict):
+    """Solved values by variable name.
+
+    shapes maps each solved variable to the classified shape of its
+    definition (see expression_parser.classify), so renderers can draw it
+    without parsing the expression again.
+    """
+
+    def __init__(self, values=(), shapes=None):
+        super().__init__(values)
+        self.shapes = shapes if shapes is not None else {}
+
+
+class DependencyGraph:
+    """Dependency graph between the variables of one question.
+
+    Edges come from the free variables of each compiled expression, so the
+    graph is built without evaluating anything.
+    """
+
+    def __init__(self, definitions, parser=None):
+        parser = parser or ExpressionParser()
+        self.names = list(definitions)
+        self.expressions = {name: parser.compile(expression) for name, expression in definitions.items()}
+        self.dependencies = {name: expression.names for name, expression in self.expressions.items()}
+        self.dependents = {name: [] for name in self.names}
+        for name in self.names:
+            for dependency in self.dependencies[name]:
+                if dependency in self.dependents:
+                    self.dependents[dependency].append(name)
+
+    def ancestors(self, targets):
+        """Return the targets together with every variable they depend on."""
+        required = set()
+        parents = {}
+        for target in targets:
+            if target in required:
+                continue
+            if target not in self.expressions:
+                raise UndefinedVariableError(target, [target])
+            required.add(target)
+            pending = deque([target])
+            while pending:
+                name = pending.popleft()
+                for dependency in self.dependencies[name]:
+                    if dependency in required:
+                        continue
+                    parents[dependency] = name
+                    if dependency not in self.expressions:
+                        raise UndefinedVariableError(dependency, self._path(dependency, parents))
+                    required.add(dependency)
+                    pending.append(dependency)
+        return required
+
+    def topological_order(self, targets=None):
+        """Order variables so each comes after its dependencies (Kahn's algorithm).
+
+        With targets, only the targets and their ancestors are ordered.
+        Ties are broken by definition order so the result is deterministic.
+        """
+        required = self.ancestors(self.names if targets is None else targets)
+
+        in_degree = {name: len(self.dependencies[name]) for name in required}
+        ready = deque(name for name in self.names if name in required and in_degree[name] == 0)
+        order = []
+        while ready:
+            name = ready.popleft()
+            order.append(name)
+            for dependent in self.dependents[name]:
+                if dependent in in_degree:
+                    in_degree[dependent] -= 1
+                    if in_degree[dependent] == 0:
+                        ready.append(dependent)
+
+        if len(order) < len(required):
+            blocked = {name for name, degree in in_degree.items() if degree > 0}
+            raise CyclicDependencyError(self._find_cycle(blocked))
+        return order
+
+    def _find_cycle(self, blocked):
+        """Walk unresolved dependencies among blocked variables until one repeats."""
+        name = next(n for n in self.names if n in blocked)
+        seen = {}
+        walk = []
+        while name not in seen:
+            seen[name] = len(walk)
+            walk.append(name)
+            name = min(d for d in self.dependencies[name] if d in blocked)
+        return walk[seen[name]:] + [name]
+
+    def evaluate(self, order, memo=None, exact=False):
+        """Evaluate the variables in order (as given by topological_order).
+
+        With a SubgraphMemo, subgraphs already evaluated for an earlier
+        question are looked up instead. With exact=True values are ints or
+        Fractions (see CompiledExpression.evaluate_exact). Returns the values
+        in definition order.
+        """
+        if memo is not None:
+            values = memo.evaluate(self.expressions, order, exact)
+        else:
+            values = {}
+            expressions = self.expressions
+            for name in order:
+                try:
+                    if exact:
+                        values[name] = expressions[name].evaluate_exact(values)
+                    else:
+                        values[name] = expressions[name].evaluate(values)
+                except ValueError as e:
+                    instrumentation.count('evaluate_calls', len(values) + 1)
+                    instrumentation.count('failed_evaluations')
+                    raise ValueError(f"Failed to evaluate {name}: {e}")
+            instrumentation.count('evaluate_calls', len(order))
+        return Solution({name: values[name] for name in self.names if name in values},
+                        {name: self.expressions[name].shape for name in self.names if name in values})
+
+    def evaluate_simultaneous(self, targets=None, exact=False):
+        """Evaluate the targets and their ancestors, solving cycles as linear systems.
+
+        Variables outside cycles are evaluated forward, exactly with
+        exact=True; each set of mutually dependent variables (e.g.
+        "tom": "jerry+20", "jerry": "total-tom") is solved in one sparse
+        factorization, in floats. Raises LinearSystemError when a cycle is
+        nonlinear, singular or inconsistent.
+        """
+        required = self.ancestors(self.names if targets is None else targets)
+        names = [name for name in self.names if name in required]
+        positions = {name: i for i, name in enumerate(names)}
+        values = {}
+        for block in strongly_connected_components(names, self.dependencies):
+            name = block[0]
+            if len(block) > 1 or name in self.dependencies[name]:
+                solve_block(sorted(block, key=positions.get), self.expressions, values)
+                continue
+            try:
+                if exact:
+                    values[name] = self.expressions[name].evaluate_exact(values)
+                else:
+                    values[name] = self.expressions[name].evaluate(values)
+            except ValueError as e:
+                instrumentation.count('failed_evaluations')
+                raise ValueError(f"Failed to evaluate {name}: {e}")
+        instrumentation.count('evaluate_calls', len(values))
+        return Solution({name: values[name] for name in self.names if name in values},
+                        {name: self.expressions[name].shape for name in self.names if name in values})
+
+    @staticmethod
+    def _path(name, parents):
+        """Rebuild the dependency chain that led from a target to name."""
+        path = [name]
+        while path[-1] in parents:
+            path.append(parents[path[-1]])
+        return list(reversed(path))
+
+
+def solve_variables(definitions, unknowns, required_only=False, parser=None, memo=None, linear=False,
+                    exact=False):
+    """Evaluate a question's variables in dependency order, each exactly once.
+
+    When required_only is True, only the unknowns and the variables they
+    depend on are evaluated. A SubgraphMemo shares values across questions.
+    With linear=True, variables that depend on each other are solved as
+    simultaneous linear relations instead of raising CyclicDependencyError.
+    With exact=True, values are ints or Fractions instead of floats, except
+    where a definition uses a number that is not an integer.
+    The result keeps the definition order.
+    """
+    graph = DependencyGraph(definitions, parser)
+    # Unknowns go first so error paths are reported from what was asked for
+    targets = list(unknowns) if required_only else list(unknowns) + graph.names
+    try:
+        order = graph.topological_order(targets)
+    except CyclicDependencyError:
+        if not linear:
+            raise
+        return graph.evaluate_simultaneous(targets, exact)
+    return graph.evaluate(order, memo, exact)
@@ -0,0 +1,102 @@
+from solver.dependency_graph import DependencyGraph, UndefinedVariableError
+
+
+class SolvedQuestion:
+    """A solved question that supports what-if edits.
+
+    set() pins a variable to a value and re-evaluates only its transitive
+    dependents whose inputs actually changed, so the cost of an edit
+    follows the affected subgraph rather than the size of the question.
+    """
+
+    def __init__(self, question_data, parser=None):
+        self._question_data = question_data
+        self.definitions = dict(question_data["variables"])
+        self.graph = DependencyGraph(self.definitions, parser)
+        order = self.graph.topological_order(list(question_data["unknowns"]) + self.graph.names)
+        self._position = {name: i for i, name in enumerate(order)}
+        self._pinned = set()
+        self.values = self.graph.evaluate(order)
+
+    @property
+    def question_data(self):
+        """The question dict with pinned variables defined by their values."""
+        return dict(self._question_data, variables=self.definitions)
+
+    def set(self, name, value):
+        """Pin a variable to value and update its dependents.
+
+        Returns a dict of every variable whose value changed, mapped to its
+        new value (empty when nothing changed).
+        """
+        if name not in self.graph.expressions:
+            raise UndefinedVariableError(name, [name])
+        changed = self._propagate(name, value)
+        self._pinned.add(name)
+        self.definitions[name] = str(value)
+        self.values.shapes[name] = ('number', value)
+        return changed
+
+    def reset(self, name):
+        """Restore a pinned variable to its original definition and update its dependents."""
+        if name not in self._pinned:
+            return {}
+        value = self.graph.expressions[name].evaluate(self.values)
+        changed = self._propagate(name, value)
+        self._pinned.discard(name)
+        self.definitions[name] = self._question_data["variables"][name]
+        self.values.shapes[name] = self.graph.expressions[name].shape
+        return changed
+
+    def _propagate(self, name, value):
+        """Re-evaluate the dependents of name in topological order.
+
+        A dependent is recomputed only if one of its direct dependencies
+        changed. Nothing is stored until every evaluation has succeeded.
+        """
+        if self.values[name] == value:
+            return {}
+        changed = {name: value}
+        lookup = _Overlay(changed, self.values)
+        for dependent in self._dependents_in_order(name):
+            if dependent in self._pinned:
+                continue
+            if not any(dependency in changed for dependency in self.graph.dependencies[dependent]):
+                continue
+            try:
+                new_value = self.graph.expressions[dependent].evaluate(lookup)
+            except ValueError as e:
+                raise ValueError(f"Failed to evaluate {dependent}: {e}")
+            if new_value != self.values[dependent]:
+                changed[dependent] = new_value
+        self.values.update(changed)
+        return changed
+
+    def _dependents_in_order(self, name):
+        """Transitive dependents of name, sorted so dependencies come first."""
+        found = set()
+        pending = [name]
+        while pending:
+            for dependent in self.graph.dependents[pending.pop()]:
+                if dependent not in found:
+                    found.add(dependent)
+                    pending.append(dependent)
+        return sorted(found, key=self._position.__getitem__)
+
+
+class _Overlay:
+    """Read-only view of pending changes layered over the current values."""
+
+    __slots__ = ('changes', 'values')
+
+    def __init__(self, changes, values):
+        self.changes = changes
+        self.values = values
+
+    def __getitem__(self, name):
+        if name in self.changes:
+            return self.changes[name]
+        return self.values[name]
+
+    def __contains__(self, name):
+        return name in self.changes or name in self.values
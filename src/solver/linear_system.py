@@ -0,0 +1,237 @@
+from collections import defaultdict
+
+import instrumentation
+from expression_parser import postorder
+
+# Coefficients smaller than this, relative to the largest one, count as zero
+COEFFICIENT_TOLERANCE = 1e-10
+# Among the rows of a column, pivots at least this fraction of the largest are acceptable
+PIVOT_THRESHOLD = 0.1
+
+
+class LinearSystemError(ValueError):
+    """Raised when simultaneous relations cannot be solved as a linear system."""
+
+
+class NonlinearRelationError(LinearSystemError):
+    """Raised when a relation in a cycle is not linear in the cycle's variables."""
+
+    def __init__(self, name, source):
+        self.name = name
+        super().__init__(f"Relation {name} = {source} is not linear in the variables it is coupled with")
+
+
+class SingularSystemError(LinearSystemError):
+    """Raised when simultaneous relations have no unique solution.
+
+    kind is 'underdetermined' (variables lists what cannot be determined)
+    or 'inconsistent' (variables lists the relations that contradict the
+    others).
+    """
+
+    def __init__(self, kind, variables):
+        self.kind = kind
+        self.variables = variables
+        if kind == 'underdetermined':
+            detail = f"{', '.join(variables)} cannot be determined; the relations are not independent"
+        else:
+            detail = f"the relations for {', '.join(variables)} contradict the others"
+        super().__init__(f"{kind.capitalize()} system: {detail}")
+
+
+def linear_form(tree, known):
+    """Write an expression tree as (coefficients by name, constant).
+
+    Names in known are replaced by their values. Raises ValueError when the
+    expression is not linear in the remaining names.
+    """
+    forms = []
+    for node in postorder(tree):
+        kind = node[0]
+        if kind == 'number':
+            forms.append(({}, node[1]))
+            continue
+        if kind == 'name':
+            name = node[1]
+            forms.append(({}, known[name]) if name in known else ({name: 1.0}, 0.0))
+            continue
+        if kind == 'neg':
+            coefficients, constant = forms.pop()
+            forms.append(({name: -c for name, c in coefficients.items()}, -constant))
+            continue
+
+        right, right_constant = forms.pop()
+        left, left_constant = forms.pop()
+        if kind in ('+', '-'):
+            sign = 1.0 if kind == '+' else -1.0
+            # The left form is a fresh dict of this walk, so it is updated in place
+            for name, c in right.items():
+                left[name] = left.get(name, 0.0) + sign * c
+            forms.append((left, left_constant + sign * right_constant))
+        elif kind == '*':
+            if left and right:
+                raise ValueError("product of unknowns")
+            if left:
+                forms.append(({name: c * right_constant for name, c in left.items()}, left_constant * right_constant))
+            else:
+                forms.append(({name: c * left_constant for name, c in right.items()}, left_constant * right_constant))
+        else:
+            if right:
+                raise ValueError("division by an unknown")
+            if right_constant == 0:
+                raise ValueError("division by zero")
+            forms.append(({name: c / right_constant for name, c in left.items()}, left_constant / right_constant))
+    return forms[0]
+
+
+def strongly_connected_components(names, dependencies):
+    """Group names into strongly connected components (Tarjan's algorithm).
+
+    Components come out dependencies first, so evaluating them in order
+    always finds the values a component needs. Iterative, so chains of
+    thousands of variables do not hit the recursion limit.
+    """
+    index = {}
+    low = {}
+    stack = []
+    on_stack = set()
+    components = []
+    counter = 0
+    for root in names:
+        if root in index:
+            continue
+        work = [(root, iter(dependencies[root]))]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            name, edges = work[-1]
+            for dependency in edges:
+                if dependency not in index:
+                    index[dependency] = low[dependency] = counter
+                    counter += 1
+                    stack.append(dependency)
+                    on_stack.add(dependency)
+                    work.append((dependency, iter(dependencies[dependency])))
+                    break
+                if dependency in on_stack:
+                    low[name] = min(low[name], index[dependency])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[name])
+                if low[name] == index[name]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == name:
+                            break
+                    components.append(component)
+    return components
+
+
+def solve_sparse(rows, rhs, names):
+    """Solve the square sparse system rows . x = rhs by one LU factorization.
+
+    rows[i] maps column positions to coefficients. Columns are eliminated in
+    order; each pivot is the shortest row among those whose coefficient is
+    within PIVOT_THRESHOLD of the column's largest (threshold partial
+    pivoting), which keeps fill-in low for the chain- and star-shaped
+    systems of word problems. Returns the solution by column; raises
+    SingularSystemError naming the variables (names by column) at fault.
+    """
+    size = len(rows)
+    rows = [dict(row) for row in rows]
+    rhs = list(rhs)
+    largest = max((abs(c) for row in rows for c in row.values()), default=0.0)
+    tolerance = COEFFICIENT_TOLERANCE * largest
+    column_rows = defaultdict(set)
+    for i, row in enumerate(rows):
+        for column in row:
+            column_rows[column].add(i)
+
+    pivots = []  # (row, column) in elimination order
+    free = []
+    for column in range(size):
+        candidates = column_rows.pop(column, set())
+        best = max((abs(rows[i][column]) for i in candidates), default=0.0)
+        if best <= tolerance:
+            free.append(column)
+            continue
+        pivot = min((i for i in candidates if abs(rows[i][column]) >= PIVOT_THRESHOLD * best),
+                    key=lambda i: (len(rows[i]), i))
+        pivot_row = rows[pivot]
+        for column_index in pivot_row:
+            if column_index != column:
+                column_rows[column_index].discard(pivot)
+        for i in candidates:
+            if i == pivot:
+                continue
+            row = rows[i]
+            factor = row.pop(column) / pivot_row[column]
+            for column_index, c in pivot_row.items():
+                if column_index == column:
+                    continue
+                value = row.get(column_index, 0.0) - factor * c
+                if abs(value) <= tolerance:
+                    if column_index in row:
+                        del row[column_index]
+                        column_rows[column_index].discard(i)
+                else:
+                    row[column_index] = value
+                    column_rows[column_index].add(i)
+            rhs[i] -= factor * rhs[pivot]
+        pivots.append((pivot, column))
+
+    if free:
+        pivot_rows = {pivot for pivot, _ in pivots}
+        leftover = [i for i in range(size) if i not in pivot_rows]
+        scale = max([1.0] + [abs(value) for value in rhs])
+        conflicting = [i for i in leftover if abs(rhs[i]) > COEFFICIENT_TOLERANCE * scale]
+        if conflicting:
+            raise SingularSystemError('inconsistent', [names[i] for i in conflicting])
+
+    solution = [None] * size
+    undetermined = set(free)
+    for pivot, column in reversed(pivots):
+        row = rows[pivot]
+        if any(other in undetermined for other in row if other != column):
+            undetermined.add(column)
+            continue
+        total = rhs[pivot]
+        for other, c in row.items():
+            if other != column:
+                total -= c * solution[other]
+        solution[column] = total / row[column]
+    if undetermined:
+        raise SingularSystemError('underdetermined', [names[column] for column in sorted(undetermined)])
+    return solution
+
+
+def solve_block(block, expressions, values):
+    """Solve the mutually dependent variables of block as one linear system.
+
+    Each definition name = expression becomes the row name - expression = 0,
+    with the values of variables outside the block already in values. The
+    solved values are added to values.
+    """
+    positions = {name: i for i, name in enumerate(block)}
+    rows = []
+    rhs = []
+    for name in block:
+        try:
+            coefficients, constant = linear_form(expressions[name].tree, values)
+        except ValueError:
+            raise NonlinearRelationError(name, expressions[name].source)
+        row = {positions[name]: 1.0}
+        for other, c in coefficients.items():
+            row[positions[other]] = row.get(positions[other], 0.0) - c
+        rows.append(row)
+        rhs.append(constant)
+    instrumentation.count('linear_solves')
+    for name, value in zip(block, solve_sparse(rows, rhs, block)):
+        values[name] = value + 0.0  # no -0.0 in answers
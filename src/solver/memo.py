@@ -0,0 +1,62 @@
+from itertools import count
+
+import instrumentation
+from lru import LRUCache
+
+# Subgraph values kept across questions
+DEFAULT_MEMO_SIZE = 100000
+
+
+class SubgraphMemo(LRUCache):
+    """Bounded LRU cache of variable values shared across questions.
+
+    A variable is keyed by its canonical subgraph: the template of its
+    expression (variables replaced by slots, see CompiledExpression.template)
+    plus the ids of the subgraphs bound to those slots. Variables with equal
+    keys have equal values whatever they are called and whichever question
+    they come from, so a bank built from templates evaluates each shared
+    sub-system once. Ids are never reused, so an evicted subgraph can only
+    cause misses, never a wrong hit.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MEMO_SIZE):
+        super().__init__(max_entries)  # (template, slot ids) -> (subgraph id, value)
+        self._ids = count()
+
+    def evaluate(self, expressions, order, exact=False):
+        """Evaluate the compiled expressions in order, reusing memoized subgraphs.
+
+        With exact=True expressions are evaluated exactly, under keys of
+        their own. Returns the values by name in evaluation order; raises
+        ValueError like DependencyGraph.evaluate.
+        """
+        lookup, store = self.get, self.put
+        hits, misses = self.hits, self.misses
+        ids = {}
+        values = {}
+        for name in order:
+            expression = expressions[name]
+            template, slots = expression.template
+            key = (template, tuple([ids[slot] for slot in slots]) if slots else ())
+            if exact:
+                key += ('exact',)
+            entry = lookup(key)
+            if entry is None:
+                try:
+                    value = expression.evaluate_exact(values) if exact else expression.evaluate(values)
+                except ValueError as e:
+                    self._record(hits, misses)
+                    instrumentation.count('failed_evaluations')
+                    raise ValueError(f"Failed to evaluate {name}: {e}")
+                entry = (next(self._ids), value)
+                store(key, entry)
+            ids[name], values[name] = entry
+        self._record(hits, misses)
+        return values
+
+    def _record(self, hits, misses):
+        """Count the lookups made since the counters read hits and misses."""
+        misses = self.misses - misses
+        instrumentation.count('evaluate_calls', misses)
+        instrumentation.count('memo_hits', self.hits - hits)
+        instrumentation.count('memo_misses', misses)
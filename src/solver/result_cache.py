@@ -0,0 +1,49 @@
+import instrumentation
+from lru import LRUCache
+
+# Solved questions kept per run
+DEFAULT_RESULT_CACHE_SIZE = 10000
+
+
+class ResultCache(LRUCache):
+    """Bounded LRU cache of solved questions, keyed by their content.
+
+    A question is keyed by its variable definitions and unknowns, so a
+    question seen again (a duplicate in the bank, a save that reverts an
+    edit, a render after an answer check) gets the stored Solution back
+    without evaluating anything. Use one cache per solving mode: the key
+    does not include options such as exact or linear.
+    """
+
+    def __init__(self, max_entries=DEFAULT_RESULT_CACHE_SIZE):
+        super().__init__(max_entries)
+
+    @staticmethod
+    def key(question):
+        """The cache key of a question, or None when its content is not hashable."""
+        try:
+            key = (tuple(question["variables"].items()), tuple(question["unknowns"]))
+            hash(key)
+        except (AttributeError, TypeError):
+            return None
+        return key
+
+    def solve(self, question, solve):
+        """Return the cached results of question, calling solve(question) on a miss.
+
+        Errors are raised as they are and not cached.
+        """
+        key = self.key(question)
+        if key is None:
+            self.misses += 1
+            results = None
+        else:
+            results = self.get(key)
+        if results is not None:
+            instrumentation.count('result_cache_hits')
+            return results
+        instrumentation.count('result_cache_misses')
+        results = solve(question)
+        if key is not None:
+            self.put(key, results)
+        return results
@@ -1,14 +1,95 @@
 import matplotlib.pyplot as plt
-import re
+import io
+import os
 import numpy as np
 from matplotlib.offsetbox import AnchoredText
 from matplotlib.patheffects import withStroke
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import logging
+import textwrap
+import instrumentation
+from visualization.render_cache import DEFAULT_MAX_BYTES, RenderCache
+from visualization.segments import bar_segments, equation_text, plot_items
 
 logger = logging.getLogger(__name__)
 
-class BarRenderer:
+OUTPUT_FORMATS = ('png', 'svg', 'pdf')
+
+# Salt for cached figures: bump whenever a change alters the rendered output
+RENDERER_VERSION = 1
+
+BAR_HEIGHT = 0.6
+LABEL_FONT_SIZE = 10
+# Average glyph advance of the default sans-serif font, as a fraction of the font size
+CHAR_WIDTH_EM = 0.6
+# Share of the figure width left to the main axes after tight_layout (kept on the low side)
+AXES_WIDTH_FRACTION = 0.85
+
+# Contact sheets: A3 landscape pages of SHEET_COLUMNS x SHEET_ROWS questions
+SHEET_PAGE_SIZE = (16.54, 11.69)
+SHEET_COLUMNS = 3
+SHEET_ROWS = 2
+SHEET_TITLE_FONT_SIZE = 9
+
+def estimate_text_width(text, fontsize):
+    """Estimates rendered text width in inches without a renderer pass."""
+    return len(text) * fontsize * CHAR_WIDTH_EM / 72
+
+class _ArtistBatch:
+    """Collects the bar segments and lines of one figure so they are drawn as a few collections."""
+
     def __init__(self):
+        self.bars = {} # (hatch, edgecolor) -> (vertices, facecolors); one collection per style
+        self.dimension_lines = []
+        self.leader_lines = []
+        self.labels = [] # (x where the label starts, estimated width in inches)
+
+    def add_bar(self, y_pos, width, facecolor, left=0, edgecolor='black', hatch=None):
+        """Adds a horizontal bar segment centred on y_pos, like ax.barh would."""
+        vertices, facecolors = self.bars.setdefault((hatch, edgecolor), ([], []))
+        bottom = y_pos - BAR_HEIGHT / 2
+        top = y_pos + BAR_HEIGHT / 2
+        right = left + width
+        vertices.append([(left, bottom), (left, top), (right, top), (right, bottom)])
+        facecolors.append(facecolor)
+
+    def draw(self, ax, dimension_color, label_color):
+        """Adds the collected artists to the axes."""
+        for (hatch, edgecolor), (vertices, facecolors) in self.bars.items():
+            ax.add_collection(PolyCollection(vertices, facecolors=facecolors, edgecolors=edgecolor,
+                                             hatch=hatch, zorder=1), autolim=False)
+        if self.dimension_lines:
+            ax.add_collection(LineCollection(self.dimension_lines, colors=dimension_color,
+                                             linewidths=1, linestyles='-'), autolim=False)
+        if self.leader_lines:
+            ax.add_collection(LineCollection(self.leader_lines, colors=label_color,
+                                             linewidths=0.8, linestyles=':'), autolim=False)
+
+class BarRenderer:
+    def __init__(self, output_dir=None, file_format='png', dpi=100, cache_dir=None, cache_max_bytes=DEFAULT_MAX_BYTES,
+                 reuse_figure=False):
+        """Create a renderer.
+
+        By default figures are shown interactively with plt.show(). When
+        output_dir is given the renderer runs headless: figures are drawn on
+        an Agg canvas outside pyplot and written to files in file_format.
+        A headless renderer with cache_dir reuses figures from a RenderCache
+        and only draws questions it has not seen. With reuse_figure, headless
+        rendering keeps one figure and its axes, clearing their artists and
+        resizing the figure between questions instead of building new ones.
+        """
+        if file_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format '{file_format}', expected one of {OUTPUT_FORMATS}")
+        self.output_dir = output_dir
+        self.file_format = file_format
+        self.dpi = dpi
+        self.reuse_figure = reuse_figure
+        self._reused = None # (figure, text axes, bar axes, initial subplot params) kept by reuse_figure
+        self.cache = None
+        if output_dir is not None and cache_dir is not None:
+            self.cache = RenderCache(cache_dir, cache_max_bytes)
         self.item_colors = plt.get_cmap('tab10').colors
         self.variable_color_map = {}
         self.color_index = 0
@@ -16,6 +97,12 @@ class BarRenderer:
         self.label_color = '#000000'
         self.equation_color = '#444444'
         self.hatch_color = '#888888' # Color for difference/subtracted part hatching
+        self._batch = _ArtistBatch()
+
+    @property
+    def interactive(self):
+        """True when figures are shown in pyplot windows rather than saved."""
+        return self.output_dir is None
 
     def _reset_colors(self):
         """Resets color mapping for a new question."""
@@ -38,11 +125,12 @@ class BarRenderer:
         y_dim = y_base + offset
         y_tick_end = y_base + 0.3 # End of vertical tick just above bar
 
-        # Vertical ticks
-        ax.plot([x_start, x_start], [y_tick_end, y_dim], color=self.dimension_color, linestyle='-', linewidth=1)
-        ax.plot([x_end, x_end], [y_tick_end, y_dim], color=self.dimension_color, linestyle='-', linewidth=1)
-        # Horizontal line
-        ax.plot([x_start, x_end], [y_dim, y_dim], color=self.dimension_color, linestyle='-', linewidth=1)
+        # Vertical ticks and horizontal line, drawn later as one LineCollection
+        self._batch.dimension_lines.extend((
+            [(x_start, y_tick_end), (x_start, y_dim)],
+            [(x_end, y_tick_end), (x_end, y_dim)],
+            [(x_start, y_dim), (x_end, y_dim)],
+        ))
         # Label text
         mid_x = x_start + (x_end - x_start) / 2
         ax.text(mid_x, y_dim + 0.05, label_text, ha='center', va='bottom', fontsize=9, color=self.dimension_color)
@@ -53,282 +141,147 @@ class BarRenderer:
         text_x = value + max_x * 0.03 # Place text slightly away from bar end
         text_y = y_pos
 
-        # Clamp text_x if it goes too far right? Or let axis limit handle it.
-        # Draw the text label
-        t = ax.text(text_x, text_y, label_text, va='center', ha='left', fontsize=10, color=self.label_color)
-
-        # Draw leader line from text towards the end of the bar
-        label_bbox = t.get_window_extent(renderer=ax.figure.canvas.get_renderer())
-        label_width = label_bbox.width / ax.figure.dpi * (ax.get_xlim()[1] / ax.figure.get_figwidth()) # Approximate label width in data coords
-        label_height = label_bbox.height / ax.figure.dpi * (ax.get_ylim()[1] / ax.figure.get_figheight())
+        # Draw the text label; its extent is estimated so the axis limit can be widened later
+        ax.text(text_x, text_y, label_text, va='center', ha='left', fontsize=LABEL_FONT_SIZE, color=self.label_color)
+        self._batch.labels.append((text_x, estimate_text_width(label_text, LABEL_FONT_SIZE)))
 
-        # Point from just left of the text towards the bar end
-        leader_start_x = text_x - max_x*0.005 # Start slightly to the left of text
-        leader_start_y = text_y
-        leader_end_x = min(value + max_x*0.01, leader_start_x) # Point towards end, don't overlap text
-        leader_end_y = y_pos
-
-        # Simple line for now
-        # ax.plot([leader_start_x, leader_end_x], [leader_start_y, leader_end_y], color=self.label_color, linewidth=0.8)
-        # Optionally, point directly to the bar end if space allows
-        ax.plot([text_x - max_x*0.005, value], [text_y, y_pos], color=self.label_color, linewidth=0.8, linestyle=':')
+        # Leader line from just left of the text to the bar end
+        self._batch.leader_lines.append([(text_x - max_x*0.005, text_y), (value, y_pos)])
 
 
     def _add_equation(self, ax, y_pos, definition, result_value, var_name):
         """Adds the formatted equation below the bar."""
-        # Replace operators with spaces for readability
-        equation_str = definition.replace("*", " * ").replace("+", " + ").replace("-", " - ").replace("/", " / ")
-        result_str = f"{var_name} = {equation_str} = {result_value:.1f}"
+        result_str = equation_text(var_name, definition, result_value)
         ax.text(0, y_pos - 0.6, f"Equation: {result_str}", va='top', ha='left', fontsize=9, color=self.equation_color)
 
+    def _render_bar(self, ax, y_pos, name, value, definition, shape, question_data, all_vars_values, max_x):
+        """Renders the bar of one variable in technical drawing style.
 
-    def _parse_simple_expression(self, expression_string, all_vars_values):
-        """Parses simple expressions like 'varA + 10', 'varB - 5', 'varC / 2'."""
-        expression_string = str(expression_string).strip()
-
-        # Addition: var + num or num + var
-        match = re.match(r'([a-zA-Z_][a-zA-Z0-9_]*)\s*\+\s*(\d+(?:\.\d+)?)$', expression_string)
-        if match:
-            var, num = match.groups()
-            if var in all_vars_values:
-                return {'type': 'add', 'base_var': var, 'diff_val': float(num), 'base_val': all_vars_values[var]}
-        match = re.match(r'(\d+(?:\.\d+)?)\s*\+\s*([a-zA-Z_][a-zA-Z0-9_]*)$', expression_string)
-        if match:
-             num, var = match.groups()
-             if var in all_vars_values:
-                return {'type': 'add', 'base_var': var, 'diff_val': float(num), 'base_val': all_vars_values[var]}
-
-        # Subtraction: var - num
-        match = re.match(r'([a-zA-Z_][a-zA-Z0-9_]*)\s*-\s*(\d+(?:\.\d+)?)$', expression_string)
-        if match:
-            var, num = match.groups()
-            if var in all_vars_values:
-                return {'type': 'subtract', 'base_var': var, 'diff_val': float(num), 'base_val': all_vars_values[var]}
-
-        # Division: var / num
-        match = re.match(r'([a-zA-Z_][a-zA-Z0-9_]*)\s*/\s*(\d+(?:\.\d+)?)$', expression_string)
-        if match:
-            var, num = match.groups()
-            if var in all_vars_values:
-                 return {'type': 'divide', 'base_var': var, 'divisor': float(num), 'base_val': all_vars_values[var]}
-
-        # Multiplication: var * num or num * var
-        match = re.match(r'([a-zA-Z_][a-zA-Z0-9_]*)\s*\*\s*(\d+(?:\.\d+)?)$', expression_string)
-        if match:
-            var, num = match.groups()
-            if var in all_vars_values:
-                 return {'type': 'multiply', 'base_var': var, 'multiplier': float(num), 'base_val': all_vars_values[var]}
-        match = re.match(r'(\d+(?:\.\d+)?)\s*\*\s*([a-zA-Z_][a-zA-Z0-9_]*)$', expression_string)
-        if match:
-             num, var = match.groups()
-             if var in all_vars_values:
-                 return {'type': 'multiply', 'base_var': var, 'multiplier': float(num), 'base_val': all_vars_values[var]}
-
-        # Simple variable reference
-        if expression_string in all_vars_values:
-             return {'type': 'reference', 'base_var': expression_string, 'base_val': all_vars_values[expression_string]}
-
-        # Simple number
-        if re.match(r'^-?\d+(\.\d+)?$', expression_string):
-            return {'type': 'number', 'value': float(expression_string)}
-
-        return {'type': 'unknown'} # Could not parse known simple type
-
-
-    def _render_simple_bar(self, ax, y_pos, name, value, definition, question_data, all_vars_values, max_x):
-        """Renders a standard single bar with enhancements for simple operations."""
-        parsed_def = self._parse_simple_expression(definition, all_vars_values)
-        label_text = f"{name}: {value:.1f}"
-        is_unknown = name in question_data.get('unknowns', [])
+        Add shapes show the base and a hatched difference, subtract shapes the
+        result and the hatched removed part, sums one segment per term.
+        """
+        segments, total = bar_segments(name, value, definition, shape, all_vars_values)
         bar_alpha = 0.8
 
-        # Case 1: Addition (A = B + C) -> Show B and C segments adding up to A
-        if parsed_def['type'] == 'add':
-            base_val = parsed_def['base_val']
-            diff_val = parsed_def['diff_val']
-            base_var = parsed_def['base_var']
-            base_color = self._get_color_for_variable(base_var, alpha=bar_alpha)
-            diff_color = self._get_color_for_variable(f"diff_{base_var}", alpha=bar_alpha/1.5) # Slightly different color for diff
-
-            # Draw base segment (B)
-            ax.barh(y_pos, base_val, height=0.6, color=base_color, edgecolor='black')
-            self._add_dimension_line(ax, 0, base_val, y_pos, f"{base_var} ({base_val:.0f})")
-
-            # Draw difference segment (C)
-            ax.barh(y_pos, diff_val, left=base_val, height=0.6, color=diff_color, edgecolor='black', hatch='///', facecolor=diff_color) # Use facecolor with hatch
-            self._add_dimension_line(ax, base_val, base_val + diff_val, y_pos, f"+ {diff_val:.0f}")
-
-            # Add total dimension line for A
-            self._add_dimension_line(ax, 0, value, y_pos, f"Total {name} ({value:.0f})", offset=0.8)
-
-        # Case 2: Subtraction (A = B - C) -> Show B total, with segment A and segment C (difference)
-        elif parsed_def['type'] == 'subtract':
-            base_val = parsed_def['base_val'] # This is B (the whole)
-            diff_val = parsed_def['diff_val'] # This is C (the part subtracted)
-            result_val = value             # This is A (the remaining part)
-            base_var = parsed_def['base_var']
-            result_color = self._get_color_for_variable(name, alpha=bar_alpha) # Color for the result A
-            diff_color = self._get_color_for_variable(f"diff_{base_var}", alpha=bar_alpha/1.5)
-
-            # Draw the resulting part (A)
-            ax.barh(y_pos, result_val, height=0.6, color=result_color, edgecolor='black')
-            self._add_dimension_line(ax, 0, result_val, y_pos, f"{name} ({result_val:.0f})")
-
-            # Draw the subtracted part (C) - hatched
-            ax.barh(y_pos, diff_val, left=result_val, height=0.6, color='none', edgecolor=self.hatch_color, hatch='xxx')
-            # Optional: Add a light background color for the subtracted part?
-            # ax.barh(y_pos, diff_val, left=result_val, height=0.6, color=diff_color, alpha=0.2, edgecolor=self.hatch_color)
-            self._add_dimension_line(ax, result_val, result_val + diff_val, y_pos, f"Removed ({diff_val:.0f})")
-
-            # Add dimension line for the original whole (B)
-            self._add_dimension_line(ax, 0, base_val, y_pos, f"Original {base_var} ({base_val:.0f})", offset=0.8)
-
-        # Case 3: Division/Multiplication/Reference/Number -> Show single bar for the value A
-        else:
-            bar_color = self._get_color_for_variable(name, alpha=bar_alpha)
-            ax.barh(y_pos, value, height=0.6, color=bar_color, edgecolor='black')
-            # Add a single dimension line for the total value
-            self._add_dimension_line(ax, 0, value, y_pos, f"{name} ({value:.0f})")
-
-        # Add leader label for all simple bars
-        self._add_leader_label(ax, value, y_pos, label_text, value, max_x)
-
-        # Add equation if it's an unknown
-        if is_unknown and definition:
-             self._add_equation(ax, y_pos, definition, value, name)
-
-
-    def _render_composite_bar(self, ax, y_pos, name, value, definition, question_data, all_vars_values, max_x):
-        """Renders a segmented bar for composite variables with technical drawing style."""
-        segments = self._parse_composite_expression(definition, all_vars_values)
-        is_unknown = name in question_data.get('unknowns', [])
-        bar_alpha = 0.8
-
-        current_left = 0
-        segment_boundaries = [0]
-
         for segment in segments:
-            segment_color = self._get_color_for_variable(segment['variable'], alpha=bar_alpha)
-            ax.barh(y_pos, segment['term_value'], left=current_left, height=0.6,
-                    color=segment_color, edgecolor='black')
-
-            # Add dimension line for this segment
-            label = f"{int(segment['coefficient'])} x {segment['variable']}" if segment['coefficient'] != 1 else segment['variable']
-            self._add_dimension_line(ax, current_left, current_left + segment['term_value'], y_pos, f"{label} ({segment['term_value']:.0f})")
-
-            current_left += segment['term_value']
-            segment_boundaries.append(current_left)
-
-        # Add total dimension line spanning all segments
-        self._add_dimension_line(ax, 0, value, y_pos, f"Total {name} ({value:.0f})", offset=0.8)
-
-        # Add leader label for the total
-        label_text = f"{name}: {value:.1f}"
-        self._add_leader_label(ax, value, y_pos, label_text, value, max_x)
-
-        # Add equation if it's an unknown (usually true for composite)
-        if is_unknown:
-             self._add_equation(ax, y_pos, definition, value, name)
-
-    def _parse_composite_expression(self, expression_string, all_vars_values):
-        """Parses expressions like '2*varA + 3*varB + varC'."""
-        # Use findall to get all terms separated by '+'
-        raw_terms = [t.strip() for t in expression_string.split('+')]
-
-        term_details = []
-        for term in raw_terms:
-            # Try matching 'coeff * var' format
-            match_coeff_var = re.match(r'(\d+(?:\.\d+)?)\s*\*\s*([a-zA-Z_][a-zA-Z0-9_]*)$', term)
-            # Try matching 'var' format
-            match_var_only = re.match(r'([a-zA-Z_][a-zA-Z0-9_]*)$', term)
-
-            if match_coeff_var:
-                coefficient = float(match_coeff_var.group(1))
-                variable_name = match_coeff_var.group(2)
-            elif match_var_only:
-                coefficient = 1.0
-                variable_name = match_var_only.group(1)
+            role = segment['role']
+            left, width = segment['left'], segment['width']
+            if role == 'difference':
+                diff_color = self._get_color_for_variable(f"diff_{segment['variable']}", alpha=bar_alpha/1.5) # Slightly different color for diff
+                self._batch.add_bar(y_pos, width, diff_color, left=left, hatch='///') # Use facecolor with hatch
+            elif role == 'removed':
+                # Drawn unfilled, but still claims its palette slot so colors match the add case
+                self._get_color_for_variable(f"diff_{segment['variable']}", alpha=bar_alpha/1.5)
+                self._batch.add_bar(y_pos, width, 'none', left=left, edgecolor=self.hatch_color, hatch='xxx')
             else:
-                logger.warning(f"Could not parse term '{term}' in expression: {expression_string}")
-                continue # Skip malformed terms
-
-            if variable_name not in all_vars_values:
-                raise ValueError(f"Variable '{variable_name}' used in composite expression '{expression_string}' not found in calculated values: {all_vars_values.keys()}")
-
-            base_value = all_vars_values[variable_name]
-            term_value = coefficient * base_value
-
-            term_details.append({
-                'variable': variable_name,
-                'coefficient': coefficient,
-                'base_value': base_value,
-                'term_value': term_value,
-                'label': f"{coefficient}*{variable_name}" if coefficient != 1 else variable_name
-            })
-        return term_details
-
-    def _is_composite_sum_of_products(self, expression_string):
-        """Checks if the expression is a sum of potentially multiplied terms."""
-        if '+' not in expression_string:
-            return False
-        # Check if terms look like variables or coeff*variable
-        terms = [t.strip() for t in expression_string.split('+')]
-        if len(terms) < 2: return False # Need at least two terms for a sum
-
-        # Relaxed check: allows simple variables or coeff*variable
-        valid_term = re.compile(r'^(?:(?:\d+(?:\.\d+)?\s*\*\s*)?[a-zA-Z_][a-zA-Z0-9_]*|[a-zA-Z_][a-zA-Z0-9_]*)$')
-
-        if all(valid_term.match(term) for term in terms):
-            # Final check: Ensure it's not just Var + Number (handled by simple)
-            is_simple_add = re.match(r'^[a-zA-Z_][a-zA-Z0-9_]*\s*\+\s*\d+(?:\.\d+)?$', expression_string) or \
-                            re.match(r'^\d+(?:\.\d+)?\s*\+\s*[a-zA-Z_][a-zA-Z0-9_]*$', expression_string)
-            return not is_simple_add
-        return False
-
-    def render(self, bar_model, question_data):
-        """Render the bar model using appropriate visualization styles in reverse order."""
-        self._reset_colors() # Reset colors for the new question
+                segment_color = self._get_color_for_variable(segment['variable'], alpha=bar_alpha)
+                self._batch.add_bar(y_pos, width, segment_color, left=left)
+            self._add_dimension_line(ax, left, left + width, y_pos, segment['label'])
 
-        all_calculated_values = bar_model.weights
-        variable_definitions = question_data['variables']
-
-        # Identify all variables to plot (both simple and composite)
-        items_to_plot = []
-        max_val = 0
-        vars_in_composites = set() # Keep track of base vars used in composites
-
-        # First pass: Identify composites and their components (keep this for reference)
-        for name, definition in variable_definitions.items():
-            if name not in all_calculated_values: continue
-            if self._is_composite_sum_of_products(definition):
-                try: # Add error handling in case parsing fails
-                    parsed_segments = self._parse_composite_expression(definition, all_calculated_values)
-                    for seg in parsed_segments:
-                        vars_in_composites.add(seg['variable'])
-                except ValueError as e:
-                    logger.error(f"Error parsing composite expression for {name}: {e}")
-
-        # Second pass: SIMPLIFIED LOGIC - Plot all calculated variables
-        items_to_plot = []
-        max_val = 0
-        
-        for name, value in all_calculated_values.items():
-            # Ensure the variable has a definition entry
-            if name not in variable_definitions:
-                logger.warning(f"Variable '{name}' found in calculated values but not in definitions. Skipping.")
-                continue
-
-            definition = variable_definitions[name]
-            max_val = max(max_val, value)
-            plot_item = {'name': name, 'value': value, 'definition': definition}
-
-            # Determine plot type based on definition
-            if self._is_composite_sum_of_products(definition):
-                plot_item['type'] = 'composite'
-            else:
-                plot_item['type'] = 'simple' # Includes inputs, intermediate calculations, simple unknowns
+        # Add dimension line spanning the whole bar
+        if total is not None:
+            self._add_dimension_line(ax, 0, total['end'], y_pos, total['label'], offset=0.8)
 
-            items_to_plot.append(plot_item) # Add ALL variables to the plot list
+        # Add leader label for the value
+        self._add_leader_label(ax, value, y_pos, f"{name}: {value:.1f}", value, max_x)
+
+        # Add equation if it's an unknown
+        if name in question_data.get('unknowns', []) and definition:
+            self._add_equation(ax, y_pos, definition, value, name)
+
+    def _fit_labels_xlim(self, x_max, axes_width):
+        """Returns the smallest right x-limit (at least x_max) that keeps every leader label inside the axes.
+
+        A label starting at x with width w inches ends at x + w * limit / axes_width
+        in data units, which fits when limit >= x / (1 - w / axes_width).
+        """
+        for text_x, width in self._batch.labels:
+            free_fraction = max(1 - width / axes_width, 0.2)
+            x_max = max(x_max, text_x / free_fraction)
+        return x_max
+
+    def output_path(self, index):
+        """File name used for the figure of the question at (0-based) index."""
+        return os.path.join(self.output_dir, f"question_{index + 1:05d}.{self.file_format}")
+
+    def _create_figure(self, figsize, headless):
+        """Create a figure, bypassing pyplot's figure registry when headless."""
+        if not headless:
+            return plt.figure(figsize=figsize)
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        return fig
+
+    def _question_axes(self, figsize, headless):
+        """Create a figure with question-text and bar axes, or clear and resize the reused one."""
+        if headless and self._reused is not None:
+            fig, text_ax, main_ax, subplot_params = self._reused
+            fig.set_size_inches(figsize)
+            # tight_layout starts from the current layout; start where a new figure would
+            fig.subplots_adjust(**subplot_params)
+            for ax in (text_ax, main_ax):
+                for artist in [*ax.texts, *ax.collections]:
+                    artist.remove()
+            return fig, text_ax, main_ax
+        fig = self._create_figure(figsize, headless)
+        text_ax, main_ax = fig.subplots(2, 1, gridspec_kw={'height_ratios': [1, 10]})
+        if headless and self.reuse_figure:
+            params = fig.subplotpars
+            self._reused = (fig, text_ax, main_ax, {name: getattr(params, name) for name in
+                                                    ('left', 'bottom', 'right', 'top', 'wspace', 'hspace')})
+        return fig, text_ax, main_ax
+
+    def _release(self, fig):
+        """Drop all artists of a saved figure now rather than waiting for the garbage collector."""
+        if self._reused is None or fig is not self._reused[0]:
+            fig.clear()
+
+    def render(self, bar_model, question_data, index=None):
+        """Render the bar model using appropriate visualization styles in reverse order.
+
+        In headless mode the figure is saved to output_path(index), released,
+        and the path is returned; otherwise the figure is shown.
+        """
+        cache_key = None
+        if self.cache is not None:
+            path = self.output_path(index)
+            cache_key = self.cache_key(bar_model, question_data)
+            if self.cache.get(cache_key, self.file_format, path):
+                return path
+
+        fig = self.draw_figure(bar_model, question_data, headless=self.output_dir is not None)
+
+        if self.output_dir is None:
+            with instrumentation.stage('show'):
+                plt.show()
+            return None
+
+        path = self.output_path(index)
+        with instrumentation.stage('savefig'):
+            fig.savefig(path, format=self.file_format, dpi=self.dpi)
+        self._release(fig)
+        if cache_key is not None:
+            self.cache.put(cache_key, self.file_format, path)
+        return path
+
+    def cache_key(self, bar_model, question_data):
+        """The render cache key of a question's figure in this renderer's format and resolution."""
+        return RenderCache.key(question_data, bar_model.weights, self.file_format, self.dpi, RENDERER_VERSION)
+
+    def render_bytes(self, bar_model, question_data, file_format=None):
+        """Render the bar model headless and return the encoded image."""
+        file_format = file_format or self.file_format
+        if file_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unsupported output format '{file_format}', expected one of {OUTPUT_FORMATS}")
+        fig = self.draw_figure(bar_model, question_data, headless=True)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=file_format, dpi=self.dpi)
+        self._release(fig)
+        return buffer.getvalue()
+
+    def draw_figure(self, bar_model, question_data, headless=True):
+        """Draw the bar model of a question and return the figure."""
+        items_to_plot = plot_items(bar_model, question_data)
 
         # Determine plot height dynamically
         num_items = len(items_to_plot)
@@ -336,43 +289,100 @@ class BarRenderer:
         plot_height = 3 + num_items * 2.5 # Generous spacing for annotations/equations
         plot_width = 12
 
-        fig, (text_ax, main_ax) = plt.subplots(2, 1, figsize=(plot_width, plot_height),
-                                               gridspec_kw={'height_ratios': [1, 10]})
+        fig, text_ax, main_ax = self._question_axes((plot_width, plot_height), headless)
 
         text_ax.text(0.0, 0.95, question_data['question'], fontsize=12, ha='left', va='top', wrap=True)
         text_ax.axis('off')
 
         main_ax.set_title("Bar Model Visualization")
-        main_ax.set_xlim(0, max_val * 1.25) # Add more space for labels on the right
-        main_ax.set_ylim(0, num_items * 2.5) # Set Y limit based on number of items & spacing
+        self._draw_bars(main_ax, items_to_plot, bar_model.weights, question_data, plot_width * AXES_WIDTH_FRACTION)
+
+        fig.tight_layout(rect=[0, 0, 1, 0.97])
+        fig.subplots_adjust(hspace=0.1) # Reduce space between text and plot if needed
+
+        instrumentation.count('artists_created', len(main_ax.texts) + len(main_ax.collections) + len(text_ax.texts))
+        return fig
+
+    def _draw_bars(self, ax, items_to_plot, all_calculated_values, question_data, axes_width):
+        """Draw the bars of a question bottom-up onto ax; axes_width (inches) bounds the labels."""
+        self._reset_colors() # Reset colors for the new question
+        max_val = max([item['value'] for item in items_to_plot] + [0])
+        num_items = len(items_to_plot)
+
+        ax.set_xlim(0, max_val * 1.25) # Add more space for labels on the right
+        ax.set_ylim(0, num_items * 2.5) # Set Y limit based on number of items & spacing
 
         # Plotting in reverse order (bottom-up)
         current_y_base = 1.0 # Start plotting near the bottom
 
-        # Sort items perhaps by value or keep definition order? Let's keep definition order for now.
-        # To reverse, we iterate through items_to_plot normally but assign increasing y values.
+        # Keep definition order; items are assigned increasing y values
+        self._batch = _ArtistBatch()
 
         for item in items_to_plot:
-            name = item['name']
-            value = item['value']
-            definition = item['definition']
-            plot_type = item['type']
-
-            if plot_type == 'simple':
-                self._render_simple_bar(main_ax, current_y_base, name, value, definition, question_data, all_calculated_values, max_val)
-            elif plot_type == 'composite':
-                 self._render_composite_bar(main_ax, current_y_base, name, value, definition, question_data, all_calculated_values, max_val)
+            self._render_bar(ax, current_y_base, item['name'], item['value'], item['definition'], item['shape'],
+                             question_data, all_calculated_values, max_val)
 
             current_y_base += 2.5 # Move up for the next bar (increase y)
 
-        # Finalize plot appearance
-        main_ax.set_yticks([]) # No Y-axis ticks needed
-        main_ax.spines['top'].set_visible(False)
-        main_ax.spines['right'].set_visible(False)
-        main_ax.spines['left'].set_visible(False)
-        # main_ax.invert_yaxis() # NO longer needed as we plot bottom-up
-
-        plt.tight_layout(rect=[0, 0, 1, 0.97])
-        plt.subplots_adjust(hspace=0.1) # Reduce space between text and plot if needed
+        # Bars and lines become a handful of collections instead of one artist each
+        self._batch.draw(ax, self.dimension_color, self.label_color)
+        ax.set_xlim(0, self._fit_labels_xlim(max_val * 1.25, axes_width))
 
-        plt.show()
\ No newline at end of file
+        # Finalize plot appearance
+        ax.set_yticks([]) # No Y-axis ticks needed
+        ax.spines['top'].set_visible(False)
+        ax.spines['right'].set_visible(False)
+        ax.spines['left'].set_visible(False)
+
+    def render_contact_sheet(self, entries, path, columns=SHEET_COLUMNS, rows=SHEET_ROWS):
+        """Tile the bar models of many questions onto the pages of one multi-page PDF.
+
+        entries yields (index, question_data, bar_model, error); a question
+        that could not be solved has bar_model None and shows its error. One
+        page figure with its grid of axes is built up front and only cleared
+        between pages. Skips tight_layout, which dominates single-question
+        rendering. Returns the number of pages written.
+        """
+        from matplotlib.backends.backend_pdf import PdfPages
+
+        fig = Figure(figsize=SHEET_PAGE_SIZE)
+        FigureCanvasAgg(fig)
+        cells = fig.subplots(rows, columns, squeeze=False).ravel()
+        fig.subplots_adjust(left=0.03, right=0.97, bottom=0.04, top=0.94, wspace=0.12, hspace=0.45)
+        cell_width = cells[0].get_position().width * SHEET_PAGE_SIZE[0]
+        # Characters of question text per title line
+        title_chars = int(cell_width * 72 / (SHEET_TITLE_FONT_SIZE * CHAR_WIDTH_EM))
+
+        pages = 0
+        filled = 0
+        with PdfPages(path) as pdf:
+            for index, question_data, bar_model, error in entries:
+                ax = cells[filled]
+                for artist in [*ax.texts, *ax.collections]:
+                    artist.remove()
+                ax.set_visible(True)
+                title = textwrap.shorten(f"{index + 1}. {question_data['question']}", width=title_chars * 3)
+                ax.set_title(textwrap.fill(title, title_chars), loc='left', fontsize=SHEET_TITLE_FONT_SIZE)
+                ax.xaxis.set_visible(bar_model is not None)
+                if bar_model is None:
+                    ax.set_xlim(0, 1)
+                    ax.set_ylim(0, 1)
+                    ax.text(0, 0.5, textwrap.fill(f"Error: {error}", title_chars), va='center', fontsize=9,
+                            color=self.label_color)
+                else:
+                    self._draw_bars(ax, plot_items(bar_model, question_data), bar_model.weights, question_data,
+                                    cell_width)
+                filled += 1
+                if filled == len(cells):
+                    with instrumentation.stage('savefig'):
+                        pdf.savefig(fig)
+                    pages += 1
+                    filled = 0
+            if filled:
+                for ax in cells[filled:]:
+                    ax.set_visible(False)
+                with instrumentation.stage('savefig'):
+                    pdf.savefig(fig)
+                pages += 1
+        fig.clear()
+        return pages
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class RenderCache:
+    """Content-addressed on-disk cache of rendered figures with LRU eviction.
+
+    Entries are keyed by a hash of everything a figure depends on, so a
+    changed question simply misses. Recency is kept in file modification
+    times, so the LRU order survives between runs.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = None # path -> size, least recently used first
+        self._total_bytes = 0
+
+    @staticmethod
+    def key(question_data, values, file_format, dpi, version):
+        """Stable hash of the inputs of one figure plus a renderer-version salt."""
+        # Lists of pairs rather than dicts: bar order follows variable order
+        payload = json.dumps([
+            version,
+            file_format,
+            dpi,
+            question_data['question'],
+            list(question_data['variables'].items()),
+            list(question_data.get('unknowns', [])),
+            [[name, float(value)] for name, value in values.items()],
+        ], separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key, file_format):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.{file_format}")
+
+    def _load_index(self):
+        """Scans the cache directory once, ordering entries by last use."""
+        found = []
+        if os.path.isdir(self.cache_dir):
+            for shard in os.scandir(self.cache_dir):
+                if not shard.is_dir():
+                    continue
+                for entry in os.scandir(shard.path):
+                    if entry.is_file() and not entry.name.startswith('.'):
+                        stat = entry.stat()
+                        found.append((stat.st_mtime, entry.path, stat.st_size))
+        found.sort()
+        self._entries = OrderedDict((path, size) for _, path, size in found)
+        self._total_bytes = sum(self._entries.values())
+
+    def get(self, key, file_format, destination):
+        """Copies a cached figure to destination; returns False on a miss."""
+        if self._entries is None:
+            self._load_index()
+        path = self._path(key, file_format)
+        if path in self._entries:
+            try:
+                shutil.copyfile(path, destination)
+                os.utime(path)
+            except FileNotFoundError:
+                # Evicted by another process sharing the cache directory
+                self._total_bytes -= self._entries.pop(path)
+            else:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return True
+        self.misses += 1
+        return False
+
+    def put(self, key, file_format, source):
+        """Stores a rendered figure, then evicts least recently used entries over the size cap."""
+        if self._entries is None:
+            self._load_index()
+        path = self._path(key, file_format)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write under a temporary name so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.')
+        os.close(fd)
+        shutil.copyfile(source, tmp_path)
+        os.replace(tmp_path, path)
+
+        self._total_bytes -= self._entries.pop(path, 0)
+        self._entries[path] = os.path.getsize(path)
+        self._total_bytes += self._entries[path]
+        self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            path, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            logger.debug(f"Evicted {path} from render cache")
+
+    def stats(self):
+        """Returns hit/miss counters and current size."""
+        if self._entries is None:
+            self._load_index()
+        return {'hits': self.hits, 'misses': self.misses,
+                'entries': len(self._entries), 'bytes': self._total_bytes}
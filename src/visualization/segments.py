@@ -0,0 +1,83 @@
+import logging
+
+from expression_parser import compile_expression
+
+logger = logging.getLogger(__name__)
+
+
+def plot_items(bar_model, question_data):
+    """List the bars to draw for a question, in definition order of the results.
+
+    Each item is a dict with the variable 'name', its 'value', 'definition'
+    and classified 'shape'. Shapes come with the solver's results; a
+    definition is only classified here when its shape is absent.
+    """
+    variable_definitions = question_data['variables']
+    shapes = bar_model.shapes
+    items = []
+    for name, value in bar_model.weights.items():
+        # Ensure the variable has a definition entry
+        if name not in variable_definitions:
+            logger.warning(f"Variable '{name}' found in calculated values but not in definitions. Skipping.")
+            continue
+        definition = variable_definitions[name]
+        shape = shapes.get(name) or compile_expression(definition).shape
+        items.append({'name': name, 'value': value, 'definition': definition, 'shape': shape})
+    return items
+
+
+def bar_segments(name, value, definition, shape, all_vars_values):
+    """Lay out the bar of one variable from the shape of its definition.
+
+    Returns (segments, total). Each segment is a dict with 'role', 'variable',
+    'left', 'width' and a dimension 'label'; roles are:
+      add       -> 'base' (the referenced variable) then 'difference'
+      subtract  -> 'result' (the remaining part) then 'removed'
+      sum       -> one 'term' per coeff*variable (with its 'coefficient')
+      otherwise -> a single 'value'
+    total is None or a dict with the 'end' and 'label' of the dimension line
+    spanning the whole bar. Backends only decide how to draw these.
+    """
+    kind = shape[0]
+    if kind in ('add', 'subtract') and shape[1] in all_vars_values:
+        _, base_var, diff_val = shape
+        base_val = all_vars_values[base_var]
+        if kind == 'add':
+            # A = B + C -> B and C side by side, adding up to A
+            return [
+                {'role': 'base', 'variable': base_var, 'left': 0, 'width': base_val,
+                 'label': f"{base_var} ({base_val:.0f})"},
+                {'role': 'difference', 'variable': base_var, 'left': base_val, 'width': diff_val,
+                 'label': f"+ {diff_val:.0f}"},
+            ], {'end': value, 'label': f"Total {name} ({value:.0f})"}
+        # A = B - C -> A followed by the removed part C, spanning the original B
+        return [
+            {'role': 'result', 'variable': name, 'left': 0, 'width': value,
+             'label': f"{name} ({value:.0f})"},
+            {'role': 'removed', 'variable': base_var, 'left': value, 'width': diff_val,
+             'label': f"Removed ({diff_val:.0f})"},
+        ], {'end': base_val, 'label': f"Original {base_var} ({base_val:.0f})"}
+
+    if kind == 'sum':
+        segments = []
+        left = 0
+        for coefficient, variable_name in shape[1]:
+            if variable_name not in all_vars_values:
+                raise ValueError(f"Variable '{variable_name}' used in composite expression '{definition}' not found in calculated values: {all_vars_values.keys()}")
+            term_value = coefficient * all_vars_values[variable_name]
+            label = f"{int(coefficient)} x {variable_name}" if coefficient != 1 else variable_name
+            segments.append({'role': 'term', 'variable': variable_name, 'coefficient': coefficient,
+                             'left': left, 'width': term_value, 'label': f"{label} ({term_value:.0f})"})
+            left += term_value
+        return segments, {'end': value, 'label': f"Total {name} ({value:.0f})"}
+
+    # Division, multiplication, references and numbers: one bar for the value
+    return [{'role': 'value', 'variable': name, 'left': 0, 'width': value,
+             'label': f"{name} ({value:.0f})"}], None
+
+
+def equation_text(name, definition, value):
+    """The equation shown under the bar of an unknown."""
+    # Replace operators with spaces for readability
+    equation_str = definition.replace("*", " * ").replace("+", " + ").replace("-", " - ").replace("/", " / ")
+    return f"{name} = {equation_str} = {value:.1f}"
@@ -0,0 +1,95 @@
+import sys
+
+from visualization.segments import bar_segments, equation_text, plot_items
+
+# Bar width in terminal cells for the longest bar of a question
+DEFAULT_WIDTH = 60
+
+# Fill characters by segment role; differences and removed parts look hatched
+FILLS = {'base': '█', 'result': '█', 'value': '█', 'term': '█', 'difference': '▒', 'removed': '░'}
+# Without colours, neighbouring composite terms alternate fills to stay apart
+TERM_FILLS = ('█', '▓')
+
+# ANSI foreground colours, roughly following matplotlib's tab10 order
+ANSI_COLORS = (34, 33, 32, 31, 35, 36)
+ANSI_REMOVED = 90
+ANSI_RESET = '\033[0m'
+
+
+class TextBarRenderer:
+    """Draws bar models as fixed-width Unicode bars, optionally in ANSI colour.
+
+    Bars are laid out with the same segments as BarRenderer (see
+    visualization.segments), so no matplotlib is needed. Each question is
+    formatted in memory and written to the stream with a single write.
+    """
+
+    # Main loops ask these of any renderer: no windows to close, no render cache
+    interactive = False
+    cache = None
+
+    def __init__(self, stream=None, width=DEFAULT_WIDTH, color=False):
+        self.stream = stream if stream is not None else sys.stdout
+        self.width = width
+        self.color = color
+
+    def render(self, bar_model, question_data, index=None):
+        """Write the bar model of a question to the stream and return its text."""
+        text = self.render_text(bar_model, question_data)
+        self.stream.write(text)
+        return text
+
+    def render_text(self, bar_model, question_data):
+        """Format the bar model of a question: per variable a bar line, its dimension labels
+        and, for unknowns, the equation."""
+        all_vars_values = bar_model.weights
+        layouts = []
+        extent = 0
+        for item in plot_items(bar_model, question_data):
+            segments, total = bar_segments(item['name'], item['value'], item['definition'], item['shape'],
+                                           all_vars_values)
+            layouts.append((item, segments, total))
+            # A subtract bar reaches past its value, up to the original whole
+            extent = max([extent, item['value']] + [segment['left'] + segment['width'] for segment in segments])
+
+        scale = self.width / extent if extent > 0 else 0
+        name_width = max([len(item['name']) for item, _, _ in layouts] + [0])
+        indent = ' ' * (name_width + 1)
+        unknowns = question_data.get('unknowns', [])
+        colors = {}
+
+        lines = []
+        for item, segments, total in layouts:
+            name, value, definition = item['name'], item['value'], item['definition']
+            lines.append(f"{name:<{name_width}} {self._draw_bar(segments, scale, colors)} {value:.1f}")
+            labels = [segment['label'] for segment in segments]
+            if total is not None:
+                labels.append(total['label'])
+            lines.append(indent + " | ".join(labels))
+            if name in unknowns and definition:
+                lines.append(f"{indent}Equation: {equation_text(name, definition, value)}")
+        return "\n".join(lines) + "\n"
+
+    def _draw_bar(self, segments, scale, colors):
+        """Draw the segments of one bar, padded to the full width."""
+        cells = 0
+        parts = []
+        for position, segment in enumerate(segments):
+            # Round segment ends rather than widths so rounding errors do not add up
+            end = min(self.width, max(cells, round((segment['left'] + segment['width']) * scale)))
+            role = segment['role']
+            fill = TERM_FILLS[position % 2] if role == 'term' and not self.color else FILLS[role]
+            chunk = fill * (end - cells)
+            if self.color and chunk:
+                code = ANSI_REMOVED if role == 'removed' else self._color_for_variable(segment['variable'], colors)
+                chunk = f"\033[{code}m{chunk}{ANSI_RESET}"
+            parts.append(chunk)
+            cells = end
+        parts.append(' ' * (self.width - cells))
+        return "".join(parts)
+
+    def _color_for_variable(self, var_name, colors):
+        """Assigns each variable of a question its own colour, in order of appearance."""
+        if var_name not in colors:
+            colors[var_name] = ANSI_COLORS[len(colors) % len(ANSI_COLORS)]
+        return colors[var_name]
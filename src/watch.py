@@ -0,0 +1,138 @@
+import hashlib
+import json
+import logging
+import os
+import time
+
+from question_loader import JSON_LINES_EXTENSIONS, iter_questions
+
+logger = logging.getLogger(__name__)
+
+# Seconds between checks of the bank file
+DEFAULT_INTERVAL = 0.2
+# Seconds the file must stay unchanged before a save is processed
+DEFAULT_DEBOUNCE = 0.3
+
+_encode = json.JSONEncoder(separators=(',', ':')).encode
+
+
+def question_hash(question):
+    """Content hash of a question; variable order counts, as it sets the bar order."""
+    return hashlib.blake2b(_encode(question).encode('utf-8'), digest_size=16).digest()
+
+
+def scan_bank(path, known=None):
+    """Return the (hash, question) pairs of a bank file, in order.
+
+    For JSON Lines each line is hashed as raw text and only lines whose hash
+    is not in known (a hash -> question dict from the previous scan) are
+    parsed again. Other banks are parsed in full and hashed per question.
+    """
+    known = known or {}
+    if os.path.splitext(path)[1] not in JSON_LINES_EXTENSIONS:
+        return [(question_hash(question), question) for question in iter_questions(path)]
+
+    entries = []
+    with open(path, 'rb') as file:
+        for number, line in enumerate(file, 1):
+            line = line.strip()
+            if not line:
+                continue
+            digest = hashlib.blake2b(line, digest_size=16).digest()
+            question = known.get(digest)
+            if question is None:
+                try:
+                    question = json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Malformed question bank line {number}: {e}")
+            entries.append((digest, question))
+    return entries
+
+
+def diff_hashes(old, new):
+    """Compare the question hashes of two scans, by position.
+
+    Returns (changed, moved, removed): new positions whose question has to be
+    processed again, (old, new) position pairs whose question only moved,
+    so its outputs can be moved along, and old positions past the end of the
+    new bank.
+    """
+    vacated = {}
+    for position, digest in enumerate(old):
+        if position >= len(new) or new[position] != digest:
+            vacated.setdefault(digest, []).append(position)
+    changed = []
+    moved = []
+    for position, digest in enumerate(new):
+        if position < len(old) and old[position] == digest:
+            continue
+        sources = vacated.get(digest)
+        if sources:
+            moved.append((sources.pop(), position))
+        else:
+            changed.append(position)
+    sources = {source for source, _ in moved}
+    removed = [position for position in range(len(new), len(old)) if position not in sources]
+    return changed, moved, removed
+
+
+class BankWatcher:
+    """Polls a question bank file and reports which questions changed.
+
+    update(questions, changed, moved, removed) is called once with every
+    question as changed, then after each save, debounced so a burst of
+    saves is handled once. A save that cannot be parsed (e.g. caught half
+    written) is logged and skipped; the next save is compared with the last
+    good scan.
+    """
+
+    def __init__(self, path, update, interval=DEFAULT_INTERVAL, debounce=DEFAULT_DEBOUNCE):
+        self.path = path
+        self.update = update
+        self.interval = interval
+        self.debounce = debounce
+        self.hashes = []
+        self.questions = {}  # hash -> question, from the last good scan
+        self._signature = None
+
+    def _stat(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def scan(self):
+        """Rescan the bank and pass what changed to update; returns False if it could not be read."""
+        try:
+            entries = scan_bank(self.path, self.questions)
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not read {self.path}: {e}")
+            return False
+        hashes = [digest for digest, _ in entries]
+        questions = [question for _, question in entries]
+        changed, moved, removed = diff_hashes(self.hashes, hashes)
+        self.hashes = hashes
+        self.questions = dict(entries)
+        if changed or moved or removed:
+            self.update(questions, changed, moved, removed)
+        return True
+
+    def run(self, max_scans=None):
+        """Process the bank, then every save, until interrupted (or after max_scans scans)."""
+        self._signature = self._stat()
+        self.scan()
+        scans = 1
+        pending_since = None
+        while max_scans is None or scans < max_scans:
+            time.sleep(self.interval)
+            signature = self._stat()
+            if signature != self._signature:
+                self._signature = signature
+                pending_since = time.monotonic()
+                continue
+            if pending_since is not None and time.monotonic() - pending_since >= self.debounce:
+                pending_since = None
+                if signature is not None:
+                    self.scan()
+                    scans += 1
@@ -0,0 +1,133 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import matplotlib.pyplot as plt
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+from matplotlib.patches import Rectangle
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from model.bar_model import BarModel
+from solver.dependency_graph import solve_variables
+from visualization.bar_renderer import BarRenderer
+
+BASKET_QUESTION = {
+    "question": "A fruit basket contains 2 watermelons, 3 oranges, and 5 bananas.",
+    "variables": {
+        "watermelon": "1500",
+        "orange": "150",
+        "banana": "orange/2",
+        "basket": "2*watermelon+3*orange+5*banana"
+    },
+    "unknowns": ["basket"]
+}
+
+
+class TestHeadlessRendering(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.results = solve_variables(BASKET_QUESTION["variables"], BASKET_QUESTION["unknowns"])
+
+    def test_writes_file_named_by_index(self):
+        for file_format in ('png', 'svg', 'pdf'):
+            renderer = BarRenderer(output_dir=self.tmp.name, file_format=file_format, dpi=50)
+            path = renderer.render(BarModel(self.results), BASKET_QUESTION, index=4)
+            self.assertEqual(os.path.basename(path), f"question_00005.{file_format}")
+            self.assertGreater(os.path.getsize(path), 0)
+
+    def test_headless_figures_bypass_pyplot(self):
+        renderer = BarRenderer(output_dir=self.tmp.name, dpi=50)
+        for index in range(3):
+            renderer.render(BarModel(self.results), BASKET_QUESTION, index=index)
+        self.assertEqual(plt.get_fignums(), [])
+
+    def test_uses_shapes_from_the_solver(self):
+        renderer = BarRenderer(output_dir=self.tmp.name, dpi=50)
+        with mock.patch('visualization.segments.compile_expression') as compile_expression:
+            renderer.render(BarModel(self.results), BASKET_QUESTION, index=0)
+        compile_expression.assert_not_called()
+
+    def test_rejects_unknown_format(self):
+        with self.assertRaises(ValueError):
+            BarRenderer(output_dir=self.tmp.name, file_format='gif')
+
+    def test_reused_figure_matches_new_figures(self):
+        small = {"question": "q", "variables": {"a": "3", "b": "a+2"}, "unknowns": ["b"]}
+        small_results = solve_variables(small["variables"], small["unknowns"])
+        fresh = BarRenderer(output_dir=self.tmp.name, dpi=50)
+        reused = BarRenderer(output_dir=self.tmp.name, dpi=50, reuse_figure=True)
+        for question, results in ((BASKET_QUESTION, self.results), (small, small_results),
+                                  (BASKET_QUESTION, self.results)):
+            self.assertEqual(reused.render_bytes(BarModel(results), question),
+                             fresh.render_bytes(BarModel(results), question))
+        self.assertEqual(len(reused._reused[0].axes), 2)
+
+    def test_contact_sheet_pages(self):
+        path = os.path.join(self.tmp.name, "sheet.pdf")
+        entries = [(i, BASKET_QUESTION, BarModel(self.results), None) for i in range(7)]
+        entries.append((7, {"question": "broken"}, None, "Failed to evaluate a: division by zero"))
+        pages = BarRenderer().render_contact_sheet(entries, path, columns=3, rows=2)
+        self.assertEqual(pages, 2)
+        with open(path, 'rb') as file:
+            self.assertEqual(file.read(5), b'%PDF-')
+        self.assertEqual(plt.get_fignums(), [])
+
+
+class TestArtistBatching(unittest.TestCase):
+
+    def _render_and_capture(self, question):
+        results = solve_variables(question["variables"], question["unknowns"])
+        captured = []
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(Figure, 'savefig', autospec=True,
+                                  side_effect=lambda fig, *args, **kwargs: captured.append(list(fig.axes[1].get_children()))):
+            BarRenderer(output_dir=tmp).render(BarModel(results), question, index=0)
+        return captured[0]
+
+    def test_bars_and_lines_are_collections(self):
+        children = self._render_and_capture(BASKET_QUESTION)
+        self.assertFalse([c for c in children if isinstance(c, Line2D)])
+        # Only the axes background rectangle remains as an individual patch
+        self.assertEqual(len([c for c in children if isinstance(c, Rectangle)]), 1)
+        line_collections = [c for c in children if isinstance(c, LineCollection)]
+        self.assertEqual(len(line_collections), 2)
+        # 3 simple bars, 3 basket segments and the basket total: 3 lines each, plus 4 leaders
+        self.assertEqual(sum(len(c.get_segments()) for c in line_collections), (3 + 3 + 1) * 3 + 4)
+        bars = [c for c in children if isinstance(c, PolyCollection)]
+        self.assertEqual(sum(len(c.get_paths()) for c in bars), 6)
+
+
+class TestLabelLayout(unittest.TestCase):
+
+    def test_leader_labels_are_not_clipped(self):
+        question = {
+            "question": "x",
+            "variables": {"a": "5", "the_extremely_long_total_variable_name": "a*100"},
+            "unknowns": ["the_extremely_long_total_variable_name"]
+        }
+        results = solve_variables(question["variables"], question["unknowns"])
+        overflow = []
+
+        def measure(fig, *args, **kwargs):
+            renderer = fig.canvas.get_renderer()
+            main_ax = fig.axes[1]
+            right = main_ax.get_window_extent(renderer).x1
+            for text in main_ax.texts:
+                overflow.append(text.get_window_extent(renderer).x1 - right)
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(Figure, 'savefig', autospec=True, side_effect=measure):
+            BarRenderer(output_dir=tmp).render(BarModel(results), question, index=0)
+        self.assertEqual(len(overflow), 5)
+        self.assertLessEqual(max(overflow), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from solver.batch_solver import solve_batch
+from solver.dependency_graph import solve_variables
+
+FRUIT_QUESTION = {
+    "question": "A mango is 215 grams...",
+    "variables": {
+        "mango": "215",
+        "papaya": "mango+185",
+        "grapefruit": "papaya-154"
+    },
+    "unknowns": ["papaya", "grapefruit"]
+}
+
+
+class TestBatchSolver(unittest.TestCase):
+
+    def test_matches_scalar_solver(self):
+        mangoes = np.arange(100, 200)
+        result = solve_batch(FRUIT_QUESTION, {"mango": mangoes})
+        for i, mango in enumerate(mangoes):
+            variables = dict(FRUIT_QUESTION["variables"], mango=str(mango))
+            expected = solve_variables(variables, FRUIT_QUESTION["unknowns"])
+            self.assertEqual(result.row(i), expected)
+        self.assertTrue(result.valid.all())
+
+    def test_masks_negative_and_division_by_zero_rows(self):
+        question = {
+            "variables": {"orange": "150", "count": "3", "share": "orange/count", "left": "share-40"},
+            "unknowns": ["left"]
+        }
+        result = solve_batch(question, {"orange": [150, 90, 150], "count": [3, 3, 0]})
+        self.assertEqual(result.valid.tolist(), [True, False, False])
+        self.assertEqual(result["left"].compressed().tolist(), [10.0])
+
+    def test_literal_division_by_zero_masks_every_row(self):
+        question = {"variables": {"orange": "150", "ratio": "5/0", "share": "orange*ratio"}, "unknowns": ["share"]}
+        result = solve_batch(question, {"orange": [150, 90]})
+        self.assertEqual(result.valid.tolist(), [False, False])
+        self.assertEqual(result["share"].count(), 0)
+
+    def test_constant_variables_are_broadcast(self):
+        result = solve_batch(FRUIT_QUESTION, {"papaya": [400, 500]})
+        self.assertEqual(result.values["mango"].tolist(), [215.0, 215.0])
+        self.assertEqual(result.values["grapefruit"].tolist(), [246.0, 346.0])
+
+    def test_rejects_unknown_input(self):
+        with self.assertRaises(ValueError):
+            solve_batch(FRUIT_QUESTION, {"kiwi": [1, 2]})
+
+
+if __name__ == '__main__':
+    unittest.main()
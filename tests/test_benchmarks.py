@@ -0,0 +1,31 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'benchmarks'))
+
+from run_benchmarks import compare
+from solver.dependency_graph import solve_variables
+from workloads import deep_chain, question_bank, wide_sum
+
+
+class TestWorkloads(unittest.TestCase):
+
+    def test_generated_questions_solve(self):
+        chain = deep_chain(500)
+        self.assertEqual(solve_variables(chain["variables"], chain["unknowns"])["v0"], 501.0)
+        wide = wide_sum(200)
+        self.assertIn("total", solve_variables(wide["variables"], wide["unknowns"]))
+        for question in question_bank(50, seed=3):
+            results = solve_variables(question["variables"], question["unknowns"])
+            self.assertTrue(all(results[name] >= 0 for name in question["unknowns"]))
+
+    def test_compare_flags_slowdowns_beyond_tolerance(self):
+        baseline = {'a': {'seconds': 1.0}, 'b': {'seconds': 1.0}}
+        results = {'a': {'seconds': 1.2}, 'b': {'seconds': 1.5}, 'new': {'seconds': 9.0}}
+        self.assertEqual(compare(results, baseline, 0.25), [('b', 1.0, 1.5, 1.5)])
+
+
+if __name__ == '__main__':
+    unittest.main()
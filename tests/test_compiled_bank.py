@@ -0,0 +1,90 @@
+import json
+import os
+import pickle
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from compiled_bank import BankQuestion, BankValidationError, CompiledBank, compile_bank
+from question_loader import iter_questions
+from solver.dependency_graph import solve_variables
+
+BANK_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'questions.json')
+
+
+class TestCompiledBank(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def compile(self, questions):
+        source = os.path.join(self.tmp.name, 'bank.jsonl')
+        with open(source, 'w') as file:
+            for question in questions:
+                file.write(json.dumps(question) + "\n")
+        output = os.path.join(self.tmp.name, 'bank.qbank')
+        compile_bank(source, output)
+        bank = CompiledBank(output)
+        self.addCleanup(bank.close)
+        return bank
+
+    def test_round_trip_matches_source_bank(self):
+        output = os.path.join(self.tmp.name, 'questions.qbank')
+        self.assertEqual(compile_bank(BANK_PATH, output), 10)
+        with CompiledBank(output) as bank:
+            for index, question in enumerate(iter_questions(BANK_PATH)):
+                compiled = bank[index]
+                self.assertEqual(dict(compiled), question)
+                expected = solve_variables(question["variables"], question["unknowns"])
+                results = compiled.solve()
+                self.assertEqual(list(results.items()), list(expected.items()))
+                self.assertEqual(results.shapes, expected.shapes)
+
+    def test_integer_literals_keep_every_digit(self):
+        huge = str(3 ** 200)
+        question = {"question": "q", "variables": {"a": "9007199254740993", "b": "a-9007199254740992",
+                                                    "c": f"-{huge}/a", "d": "a*2.5"}, "unknowns": ["b"]}
+        compiled = self.compile([question])[0]
+        self.assertEqual(compiled.solve(exact=True),
+                         solve_variables(question["variables"], question["unknowns"], exact=True))
+        self.assertEqual(compiled.solve(exact=True)["b"], 1)
+
+    def test_random_access(self):
+        questions = [{"question": f"q{i}", "variables": {"a": str(i), "b": "-(a*2)/4"}, "unknowns": ["b"]}
+                     for i in range(100)]
+        bank = self.compile(questions)
+        self.assertEqual(len(bank), 100)
+        self.assertEqual(bank[-1]["question"], "q99")
+        self.assertEqual(bank[42].solve()["b"], -21.0)
+        self.assertEqual([q["question"] for q in bank.iter_from(98)], ["q98", "q99"])
+        with self.assertRaises(IndexError):
+            bank[100]
+
+    def test_unsolvable_question_keeps_its_error(self):
+        bank = self.compile([{"question": "q", "variables": {"a": "b+1", "b": "a+1"}, "unknowns": ["a"]}])
+        with self.assertRaises(ValueError) as ctx:
+            bank[0].solve()
+        self.assertIn("Cyclic dependency", str(ctx.exception))
+
+    def test_schema_errors_are_reported_before_writing(self):
+        with self.assertRaises(BankValidationError) as ctx:
+            self.compile([{"question": "q", "variables": {"a": "1"}, "unknowns": ["a"]},
+                          {"question": "q", "variables": {"a": 1}, "unknowns": []}])
+        self.assertEqual([number for number, _ in ctx.exception.errors], [2, 2])
+        self.assertFalse(os.path.exists(os.path.join(self.tmp.name, 'bank.qbank')))
+
+    def test_pickles_as_plain_dict(self):
+        bank = self.compile([{"question": "q", "variables": {"a": "1"}, "unknowns": ["a"]}])
+        self.assertIsInstance(bank[0], BankQuestion)
+        self.assertIs(type(pickle.loads(pickle.dumps(bank[0]))), dict)
+
+    def test_rejects_other_files(self):
+        with self.assertRaises(ValueError):
+            CompiledBank(BANK_PATH)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from solver.dependency_graph import (CyclicDependencyError, DependencyGraph,
+                                     UndefinedVariableError, solve_variables)
+
+
+class TestDependencyGraph(unittest.TestCase):
+
+    def test_reverse_ordered_chain(self):
+        definitions = {f"v{i}": f"v{i + 1}+1" for i in range(50)}
+        definitions["v50"] = "0"
+        results = solve_variables(definitions, ["v0"])
+        self.assertEqual(results["v0"], 50.0)
+        self.assertEqual(list(results), list(definitions))
+
+    def test_evaluates_in_dependency_order(self):
+        graph = DependencyGraph({
+            "jerry": "29",
+            "difference": "20",
+            "tom_final": "jerry+difference",
+            "tom_bought": "3",
+            "tom_initial": "tom_final-tom_bought",
+        })
+        order = graph.topological_order()
+        self.assertLess(order.index("tom_final"), order.index("tom_initial"))
+        self.assertLess(order.index("tom_bought"), order.index("tom_initial"))
+
+    def test_required_only_skips_unrelated_variables(self):
+        definitions = {"mango": "215", "papaya": "mango+185", "kiwi": "50"}
+        results = solve_variables(definitions, ["papaya"], required_only=True)
+        self.assertEqual(results, {"mango": 215.0, "papaya": 400.0})
+
+    def test_results_carry_definition_shapes(self):
+        results = solve_variables({"orange": "150", "banana": "orange/2", "basket": "2*orange+banana"},
+                                  ["basket"])
+        self.assertEqual(results.shapes, {"orange": ('number', 150.0), "banana": ('divide', 'orange', 2.0),
+                                          "basket": ('sum', ((2.0, 'orange'), (1.0, 'banana')))})
+
+    def test_cycle_is_reported_with_path(self):
+        with self.assertRaises(CyclicDependencyError) as ctx:
+            solve_variables({"a": "b+1", "b": "c+1", "c": "a+1", "d": "1"}, ["a"])
+        self.assertEqual(ctx.exception.cycle, ["a", "b", "c", "a"])
+
+    def test_undefined_name_is_reported_with_path(self):
+        with self.assertRaises(UndefinedVariableError) as ctx:
+            solve_variables({"grapefruit": "papaya-154", "papaya": "mangoo+185"}, ["grapefruit"])
+        self.assertEqual(ctx.exception.path, ["grapefruit", "papaya", "mangoo"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import sys
+import unittest
+from fractions import Fraction
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from expression_parser import ExpressionParser, compile_expression
+
+
+class TestExpressionParser(unittest.TestCase):
+
+    def setUp(self):
+        self.parser = ExpressionParser()
+
+    def test_evaluate_number_and_reference(self):
+        self.assertEqual(self.parser.evaluate("215", {}), 215.0)
+        self.assertEqual(self.parser.evaluate("mango", {'mango': 215.0}), 215.0)
+
+    def test_evaluate_composite_expression(self):
+        variables = {'watermelon': 1500.0, 'orange': 150.0, 'banana': 75.0}
+        result = self.parser.evaluate("2*watermelon+3*orange+5*banana", variables)
+        self.assertEqual(result, 3825.0)
+
+    def test_names_are_not_partially_substituted(self):
+        variables = {'tom': 1.0, 'tom_initial': 46.0}
+        self.assertEqual(self.parser.evaluate("tom_initial-tom", variables), 45.0)
+
+    def test_can_evaluate_uses_free_variables(self):
+        self.assertTrue(self.parser.can_evaluate("jerry+20", {'jerry': 29.0}))
+        self.assertFalse(self.parser.can_evaluate("tom_final-tom_initial", {'tom_final': 49.0}))
+        self.assertEqual(compile_expression("(a+b)/2-a").names, frozenset({'a', 'b'}))
+
+    def test_missing_variable_raises(self):
+        with self.assertRaises(ValueError):
+            self.parser.evaluate("papaya-154", {})
+
+    def test_division_by_zero_raises(self):
+        with self.assertRaises(ValueError):
+            self.parser.evaluate("orange/0", {'orange': 150.0})
+
+    def test_unsupported_syntax_is_rejected(self):
+        for expression in ("2**3", "__import__('os')", "a.b", "a if b else c"):
+            with self.assertRaises(ValueError):
+                self.parser.compile(expression)
+
+    def test_compiled_form_is_cached(self):
+        self.assertIs(compile_expression("mango+185"), compile_expression("mango+185"))
+
+    def test_long_sums(self):
+        variables = {f"a{i}": float(i) for i in range(2000)}
+        expression = compile_expression("+".join(variables))
+        self.assertEqual(expression.evaluate(variables), 1999000.0)
+        self.assertEqual(expression.evaluate_exact({name: int(value) for name, value in variables.items()}), 1999000)
+        self.assertEqual(expression.shape[0], 'sum')
+        self.assertEqual(len(expression.names), 2000)
+        # Beyond what Python's own parser can nest
+        with self.assertRaisesRegex(ValueError, "too deeply nested"):
+            compile_expression("+".join(["a"] * 50000))
+
+
+class TestExactEvaluation(unittest.TestCase):
+
+    def evaluate(self, expression, variables=None):
+        return compile_expression(expression).evaluate_exact(variables or {})
+
+    def test_stays_on_integers(self):
+        value = self.evaluate("2*watermelon+3*orange+5*banana", {'watermelon': 1500, 'orange': 150, 'banana': 75})
+        self.assertEqual((value, type(value)), (3825, int))
+        self.assertEqual(type(self.evaluate("orange/2", {'orange': 150})), int)
+
+    def test_fractions_only_when_needed(self):
+        self.assertEqual(self.evaluate("orange/2", {'orange': 151}), Fraction(151, 2))
+        # Whole again: normalized back to int
+        value = self.evaluate("1/3*3")
+        self.assertEqual((value, type(value)), (1, int))
+        # In floats this is 5.55e-17
+        self.assertEqual(self.evaluate("1/10+2/10-3/10"), 0)
+
+    def test_non_integers_fall_back_to_floats(self):
+        self.assertEqual(self.evaluate("a*0.5", {'a': 3}), 1.5)
+        self.assertIsInstance(self.evaluate("a/2", {'a': Fraction(1, 3)}), Fraction)
+        self.assertIsInstance(self.evaluate("a/2", {'a': 1.5}), float)
+
+    def test_errors_match_float_evaluation(self):
+        with self.assertRaisesRegex(ValueError, "division by zero"):
+            self.evaluate("orange/0", {'orange': 150})
+        with self.assertRaisesRegex(ValueError, "missing variables"):
+            self.evaluate("papaya-154")
+
+
+class TestShapes(unittest.TestCase):
+
+    def assertShape(self, expression, shape):
+        self.assertEqual(compile_expression(expression).shape, shape)
+
+    def test_simple_shapes(self):
+        self.assertShape("215", ('number', 215.0))
+        self.assertShape("-5", ('number', -5.0))
+        self.assertShape("papaya", ('reference', 'papaya'))
+        self.assertShape("mango+185", ('add', 'mango', 185.0))
+        self.assertShape("20 + jerry", ('add', 'jerry', 20.0))
+        self.assertShape("papaya-154", ('subtract', 'papaya', 154.0))
+        self.assertShape("orange/2", ('divide', 'orange', 2.0))
+        self.assertShape("3*tom", ('multiply', 'tom', 3.0))
+        self.assertShape("tom*3", ('multiply', 'tom', 3.0))
+
+    def test_sum_of_products(self):
+        self.assertShape("2*watermelon+3*orange+banana",
+                         ('sum', ((2.0, 'watermelon'), (3.0, 'orange'), (1.0, 'banana'))))
+        # Nested forms: parentheses, coefficients on either side, constant products
+        self.assertShape("(a + b*2) + 2*(3*c)", ('sum', ((1.0, 'a'), (2.0, 'b'), (6.0, 'c'))))
+
+    def test_other_shapes(self):
+        for expression in ("tom_initial-tom_gives", "2*a+5", "a+-5", "(a+b)/2", "-a", "a-2*b", "a*b"):
+            self.assertShape(expression, ('other',))
+
+
+if __name__ == '__main__':
+    unittest.main()
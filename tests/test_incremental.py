@@ -0,0 +1,63 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from solver.dependency_graph import solve_variables
+from solver.incremental import SolvedQuestion
+
+FRUIT_QUESTION = {
+    "question": "A mango is 215 grams...",
+    "variables": {
+        "mango": "215",
+        "papaya": "mango+185",
+        "grapefruit": "papaya-154",
+        "kiwi": "80",
+        "salad": "kiwi*2"
+    },
+    "unknowns": ["papaya", "grapefruit"]
+}
+
+
+class TestSolvedQuestion(unittest.TestCase):
+
+    def setUp(self):
+        self.solved = SolvedQuestion(FRUIT_QUESTION)
+
+    def test_initial_values_match_solver(self):
+        self.assertEqual(self.solved.values,
+                         solve_variables(FRUIT_QUESTION["variables"], FRUIT_QUESTION["unknowns"]))
+
+    def test_set_updates_only_dependents(self):
+        changed = self.solved.set("mango", 300)
+        self.assertEqual(changed, {"mango": 300, "papaya": 485.0, "grapefruit": 331.0})
+        self.assertEqual(self.solved.values["salad"], 160.0)
+        self.assertEqual(self.solved.set("mango", 300), {})
+
+    def test_unchanged_intermediate_stops_propagation(self):
+        question = {"variables": {"a": "1", "b": "a*0", "c": "b+1"}, "unknowns": ["c"]}
+        solved = SolvedQuestion(question)
+        self.assertEqual(solved.set("a", 5), {"a": 5})
+
+    def test_pinned_derived_variable_and_reset(self):
+        self.assertEqual(self.solved.set("papaya", 500), {"papaya": 500, "grapefruit": 346.0})
+        # mango no longer feeds the pinned papaya
+        self.assertEqual(self.solved.set("mango", 1), {"mango": 1})
+        self.assertEqual(self.solved.question_data["variables"]["papaya"], "500")
+        self.assertEqual(self.solved.values.shapes["papaya"], ('number', 500))
+        self.assertEqual(self.solved.reset("papaya"), {"papaya": 186.0, "grapefruit": 32.0})
+        self.assertEqual(self.solved.question_data["variables"]["papaya"], "mango+185")
+        self.assertEqual(self.solved.values.shapes["papaya"], ('add', 'mango', 185.0))
+
+    def test_failed_edit_leaves_state_unchanged(self):
+        question = {"variables": {"count": "3", "share": "150/count"}, "unknowns": ["share"]}
+        solved = SolvedQuestion(question)
+        with self.assertRaises(ValueError):
+            solved.set("count", 0)
+        self.assertEqual(solved.values, {"count": 3.0, "share": 50.0})
+        self.assertEqual(solved.question_data["variables"]["count"], "3")
+
+
+if __name__ == '__main__':
+    unittest.main()
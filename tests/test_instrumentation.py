@@ -0,0 +1,51 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import instrumentation
+from instrumentation import Instrumentation
+from solver.dependency_graph import solve_variables
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_helpers_are_no_ops_when_inactive(self):
+        instrumentation.count('evaluate_calls')
+        with instrumentation.stage('solve'):
+            pass
+
+    def test_stages_and_counters_per_question(self):
+        with Instrumentation() as inst:
+            for index, _ in enumerate(inst.timed_iter('load', [1, 2])):
+                with inst.question(index):
+                    with instrumentation.stage('solve'):
+                        solve_variables({"a": "1", "b": "a+1"}, ["b"])
+                    instrumentation.count('artists_created', 3)
+            try:
+                solve_variables({"a": "1/0"}, ["a"])
+            except ValueError:
+                pass
+
+        report = inst.report()
+        self.assertEqual(report['stages']['solve']['count'], 2)
+        self.assertEqual(report['stages']['load']['count'], 3)
+        self.assertEqual(report['counters'], {'evaluate_calls': 5, 'artists_created': 6, 'failed_evaluations': 1})
+        self.assertEqual(report['questions'][1]['counters'], {'evaluate_calls': 2, 'artists_created': 3})
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            self.assertIsNotNone(report['stages']['solve'][key])
+
+    def test_profile_chosen_question(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            with Instrumentation(profile_index=1, profile_dir=tmp) as inst:
+                for index in range(3):
+                    with inst.question(index):
+                        solve_variables({"a": "1", "b": "a+1"}, ["b"])
+            self.assertEqual(inst.profile['question'], 2)
+            self.assertTrue(os.path.exists(inst.profile['cprofile_stats']))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from expression_parser import compile_expression
+from solver.dependency_graph import CyclicDependencyError, solve_variables
+from solver.linear_system import (NonlinearRelationError, SingularSystemError, linear_form, solve_sparse,
+                                  strongly_connected_components)
+
+
+class TestLinearSystem(unittest.TestCase):
+
+    def test_linear_form(self):
+        tree = compile_expression("(a - 2*b)/4 + rate*b - 3").tree
+        self.assertEqual(linear_form(tree, {"rate": 2.0}), ({"a": 0.25, "b": 1.5}, -3.0))
+        with self.assertRaises(ValueError):
+            linear_form(compile_expression("a*b").tree, {})
+
+    def test_components_come_dependencies_first(self):
+        dependencies = {"total": set(), "tom": {"jerry"}, "jerry": {"total", "tom"}, "answer": {"tom"}}
+        components = strongly_connected_components(list(dependencies), dependencies)
+        self.assertEqual([sorted(c) for c in components], [["total"], ["jerry", "tom"], ["answer"]])
+
+    def test_solve_sparse(self):
+        # x + y = 3, x - y = 1
+        self.assertEqual(solve_sparse([{0: 1.0, 1: 1.0}, {0: 1.0, 1: -1.0}], [3.0, 1.0], ["x", "y"]), [2.0, 1.0])
+
+    def test_simultaneous_relations(self):
+        definitions = {"total": "78", "tom": "jerry+20", "jerry": "total-tom", "half": "tom/2"}
+        with self.assertRaises(CyclicDependencyError):
+            solve_variables(definitions, ["tom"])
+        results = solve_variables(definitions, ["tom", "jerry"], linear=True)
+        self.assertEqual(dict(results), {"total": 78.0, "tom": 49.0, "jerry": 29.0, "half": 24.5})
+        self.assertEqual(results.shapes["tom"], ('add', 'jerry', 20.0))
+
+    def test_long_coupled_chain(self):
+        size = 2000
+        definitions = {"total": str(size * 7 + size * (size - 1) // 2), "x0": f"total-s{size - 1}", "s0": "0"}
+        for i in range(1, size):
+            definitions[f"x{i}"] = f"x{i - 1}+1"
+            definitions[f"s{i}"] = f"s{i - 1}+x{i}"
+        results = solve_variables(definitions, ["x0"], linear=True)
+        self.assertAlmostEqual(results["x0"], 7.0)
+        self.assertAlmostEqual(results[f"x{size - 1}"], size + 6.0)
+
+    def test_diagnostics(self):
+        with self.assertRaises(SingularSystemError) as ctx:
+            solve_variables({"a": "b+1", "b": "a-1"}, ["a"], linear=True)
+        self.assertEqual(ctx.exception.kind, 'underdetermined')
+        self.assertEqual(ctx.exception.variables, ["a", "b"])
+
+        with self.assertRaises(SingularSystemError) as ctx:
+            solve_variables({"a": "b+1", "b": "a+1"}, ["a"], linear=True)
+        self.assertEqual(ctx.exception.kind, 'inconsistent')
+
+        with self.assertRaises(NonlinearRelationError):
+            solve_variables({"a": "b*b", "b": "a-2"}, ["a"], linear=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from lru import LockedLRUCache, LRUCache
+
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_entry_limit_evicts_least_recently_used(self):
+        cache = LRUCache(max_entries=2)
+        cache.put('a', 1)
+        cache.put('b', 2)
+        self.assertEqual(cache.get('a'), 1)
+        cache.put('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+        self.assertEqual(cache.stats(), {'hits': 2, 'misses': 1, 'entries': 2, 'hit_rate': 2 / 3})
+
+    def test_byte_limit_keeps_the_newest_entry(self):
+        cache = LockedLRUCache(max_bytes=10)
+        cache.put('a', b'x' * 6, 6)
+        cache.put('b', b'y' * 6, 6)
+        self.assertEqual(len(cache), 1)
+        cache.put('c', b'z' * 20, 20)
+        self.assertEqual(cache.get('c'), b'z' * 20)
+        self.assertIsNone(cache.get('b'))
+
+
+if __name__ == '__main__':
+    unittest.main()
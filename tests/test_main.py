@@ -0,0 +1,118 @@
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import main
+
+
+class TestSolveOnly(unittest.TestCase):
+
+    def write_bank(self, questions):
+        handle, path = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(handle, 'w') as file:
+            for question in questions:
+                file.write(json.dumps(question) + "\n")
+        self.addCleanup(os.remove, path)
+        return path
+
+    def run_main(self, argv):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            main.main(argv + ['--log-level', 'ERROR'])
+        return output.getvalue()
+
+    def test_json_answers(self):
+        path = self.write_bank([
+            {"question": "q1", "variables": {"a": "2", "b": "a*3"}, "unknowns": ["b"]},
+            {"question": "q2", "variables": {"a": "1/0"}, "unknowns": ["a"]},
+        ])
+        lines = self.run_main(['--questions', path, '--json']).splitlines()
+        self.assertEqual(json.loads(lines[0]), {"question": 1, "answers": {"b": 6.0}})
+        self.assertEqual(json.loads(lines[1])["question"], 2)
+        self.assertIn("error", json.loads(lines[1]))
+
+    def test_text_answers(self):
+        path = self.write_bank([{"question": "q1", "variables": {"a": "2"}, "unknowns": ["a"]}])
+        output = self.run_main(['--questions', path, '--solve-only'])
+        self.assertIn("Question 1: q1", output)
+        self.assertIn("a = 2.0", output)
+
+    def test_start_and_count_in_compiled_bank(self):
+        from compiled_bank import compile_bank
+        path = self.write_bank([{"question": f"q{i}", "variables": {"a": str(i)}, "unknowns": ["a"]}
+                                for i in range(10)])
+        compiled = path[:-len('.jsonl')] + '.qbank'
+        compile_bank(path, compiled)
+        self.addCleanup(os.remove, compiled)
+        lines = self.run_main(['--questions', compiled, '--json', '--start', '8', '--count', '2']).splitlines()
+        self.assertEqual([json.loads(line) for line in lines],
+                         [{"question": 8, "answers": {"a": 7.0}}, {"question": 9, "answers": {"a": 8.0}}])
+
+    def test_defaults_of_lazily_imported_modules(self):
+        import parallel
+        import pipeline
+        import watch
+        from visualization import render_cache
+        args = main.parse_args([])
+        self.assertEqual(args.queue_size, pipeline.DEFAULT_QUEUE_SIZE)
+        self.assertEqual(args.debounce, watch.DEFAULT_DEBOUNCE)
+        self.assertEqual(args.chunk_size, parallel.DEFAULT_CHUNK_SIZE)
+        self.assertEqual(args.cache_size_mb * 1024 * 1024, render_cache.DEFAULT_MAX_BYTES)
+
+    def test_visualization_stack_is_not_imported(self):
+        code = ("import sys, main; main.main(['--json', '--log-level', 'ERROR']); "
+                "print(sorted(m for m in ('matplotlib', 'numpy', 'model.bar_model', 'asyncio', 'pipeline', 'watch', "
+                "'multiprocessing', 'hashlib') "
+                "if m in sys.modules))")
+        src = os.path.join(os.path.dirname(__file__), '..', 'src')
+        result = subprocess.run([sys.executable, '-c', code], cwd=src, capture_output=True, text=True,
+                                check=True)
+        self.assertEqual(result.stdout.splitlines()[-1], "[]")
+
+
+
+class TestArguments(unittest.TestCase):
+
+    def assertRejected(self, argv):
+        with redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            main.parse_args(argv)
+
+    def test_question_range(self):
+        for argv in (['--start', '0'], ['--start', '-3'], ['--count', '-1']):
+            self.assertRejected(argv)
+        args = main.parse_args(['--start', '2', '--count', '0'])
+        self.assertEqual((args.start, args.count), (2, 0))
+
+    def test_workers_and_chunk_size(self):
+        for argv in (['--workers', '0'], ['--chunk-size', '0'], ['--chunk-size', '-5']):
+            self.assertRejected(argv)
+
+    def test_pipeline_and_cache_dir_need_figure_files(self):
+        for argv in (['--pipeline', '--output-dir', 'out', '--json'],
+                     ['--pipeline', '--output-dir', 'out', '--solve-only'], ['--cache-dir', 'cache'],
+                     ['--cache-dir', 'cache', '--json']):
+            self.assertRejected(argv)
+        self.assertEqual(main.parse_args(['--cache-dir', 'cache', '--output-dir', 'out']).cache_dir, 'cache')
+
+    def test_watch_and_text_renderer_combinations(self):
+        for argv in (['--watch', '--output-dir', 'out', '--contact-sheet', 'sheet.pdf'],
+                     ['--renderer', 'text', '--output-dir', 'out'],
+                     ['--watch', '--renderer', 'text', '--output-dir', 'out']):
+            self.assertRejected(argv)
+        self.assertTrue(main.parse_args(['--watch', '--renderer', 'text']).watch)
+
+    def test_profile_question_needs_the_sequential_loop(self):
+        for mode in (['--workers', '2'], ['--json'], ['--solve-only'], ['--pipeline', '--output-dir', 'out']):
+            self.assertRejected(['--profile-question', '1'] + mode)
+        self.assertEqual(main.parse_args(['--profile-question', '3', '--output-dir', 'out']).profile_question, 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
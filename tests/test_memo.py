@@ -0,0 +1,65 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from instrumentation import Instrumentation
+from parallel import solve_questions_parallel
+from solver.dependency_graph import solve_variables
+from solver.memo import SubgraphMemo
+
+STAMPS = {"tom_initial": "46", "jerry": "29", "tom_final": "jerry+20", "tom_bought": "tom_final-tom_initial"}
+
+
+class TestSubgraphMemo(unittest.TestCase):
+
+    def test_shared_subgraphs_are_reused_across_questions(self):
+        memo = SubgraphMemo()
+        first = solve_variables(STAMPS, ["tom_bought"], memo=memo)
+        self.assertEqual(memo.stats()['hits'], 0)
+        # Same sub-system under other names: only the changed variable is evaluated
+        renamed = {"tom": "46", "jerry_start": "29", "tom_end": "jerry_start+20", "bought": "tom_end-tom",
+                   "twice": "bought*2"}
+        second = solve_variables(renamed, ["twice"], memo=memo)
+        self.assertEqual(second["bought"], first["tom_bought"])
+        self.assertEqual(second["twice"], 6.0)
+        self.assertEqual((memo.hits, memo.misses), (4, 5))
+        self.assertEqual(memo.stats()['hit_rate'], 4 / 9)
+
+    def test_different_inputs_do_not_collide(self):
+        memo = SubgraphMemo()
+        solve_variables({"a": "1", "b": "a+1"}, ["b"], memo=memo)
+        self.assertEqual(solve_variables({"a": "2", "b": "a+1"}, ["b"], memo=memo)["b"], 3.0)
+        self.assertEqual(solve_variables({"x": "2", "y": "1", "b": "x-y"}, ["b"], memo=memo)["b"], 1.0)
+        self.assertEqual(solve_variables({"x": "1", "y": "2", "b": "x-y"}, ["b"], memo=memo)["b"], -1.0)
+
+    def test_bounded(self):
+        memo = SubgraphMemo(max_entries=3)
+        for i in range(10):
+            solve_variables({"a": str(i), "b": "a*2"}, ["b"], memo=memo)
+        self.assertEqual(memo.stats()['entries'], 3)
+        self.assertEqual(solve_variables({"a": "1", "b": "a*2"}, ["b"], memo=memo)["b"], 2.0)
+
+    def test_errors_and_counters(self):
+        memo = SubgraphMemo()
+        with Instrumentation() as inst:
+            solve_variables(STAMPS, ["tom_bought"], memo=memo)
+            solve_variables(STAMPS, ["tom_bought"], memo=memo)
+            with self.assertRaises(ValueError):
+                solve_variables({"a": "0", "b": "1/a"}, ["b"], memo=memo)
+        self.assertEqual(inst.counters['memo_hits'], 4)
+        self.assertEqual(inst.counters['evaluate_calls'], 6)
+        self.assertEqual(inst.counters['failed_evaluations'], 1)
+
+    def test_parallel_workers_report_memo_stats(self):
+        questions = [{"question": "q", "variables": STAMPS, "unknowns": ["tom_bought"]}] * 10
+        memo_stats = {}
+        outcomes = list(solve_questions_parallel(questions, 2, chunk_size=2, memo_size=100, memo_stats=memo_stats))
+        self.assertTrue(all(results["tom_bought"] == 3.0 for _, results, _ in outcomes))
+        self.assertEqual(memo_stats['hits'] + memo_stats['misses'], 40)
+        self.assertGreater(memo_stats['hits'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -23,5 +23,28 @@ class TestBarModel(unittest.TestCase):
         
         self.assertEqual(model.get_representation(), expected_representation)
 
+    def test_relative_sizes_and_scaling(self):
+        model = BarModel({'orange': 150.0, 'banana': 75.0, 'watermelon': 300.0})
+        self.assertEqual((model.min_weight, model.max_weight), (75.0, 300.0))
+        self.assertEqual(model.relative_sizes().tolist(), [0.5, 0.25, 1.0])
+        self.assertEqual(model.get_relative_sizes()['banana'], 0.25)
+        self.assertEqual(model.scaled(12).tolist(), [6.0, 3.0, 12.0])
+
+    def test_add_variable_grows_storage(self):
+        model = BarModel()
+        for i in range(1000):
+            model.add_variable(f"v{i}", i)
+        model.add_variable('v3', 30)
+        self.assertEqual(len(model), 1000)
+        self.assertEqual(model.weights['v3'], 30.0)
+        self.assertEqual(model.values[-1], 999.0)
+        self.assertNotIn('v1000', model.weights)
+
+    def test_generate_bar_representation(self):
+        model = BarModel({'mango': 25.0})
+        model.add_variable('papaya', 40.0)
+        self.assertEqual(model.generate_bar_representation(),
+                         "mango: || (25.0 grams)\npapaya: |||| (40.0 grams)")
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,31 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from parallel import solve_questions_parallel
+
+
+class TestParallelSolving(unittest.TestCase):
+
+    def test_results_keep_input_order_and_capture_errors(self):
+        questions = [{"question": f"q{i}", "variables": {"a": str(i), "b": "a*2"}, "unknowns": ["b"]}
+                     for i in range(25)]
+        questions[7] = {"question": "bad", "variables": {"b": "a*2"}, "unknowns": ["b"]}
+
+        outcomes = list(solve_questions_parallel(iter(questions), workers=2, chunk_size=3))
+
+        self.assertEqual([question["question"] for question, _, _ in outcomes],
+                         [question["question"] for question in questions])
+        for i, (_, results, error) in enumerate(outcomes):
+            if i == 7:
+                self.assertIsNone(results)
+                self.assertIn("Undefined variable 'a'", error)
+            else:
+                self.assertIsNone(error)
+                self.assertEqual(results["b"], i * 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pipeline import STAGES, Pipeline
+from solver.dependency_graph import solve_variables
+
+
+def solve(question):
+    return solve_variables(question["variables"], question["unknowns"])
+
+
+class TestPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+        self.emitted = []
+
+    def emit(self, index, question, results, error, path):
+        self.emitted.append((index, results[question["unknowns"][0]] if results else None, error, path))
+
+    def test_questions_written_in_order(self):
+        questions = [
+            {"question": "q1", "variables": {"a": "2", "b": "a*3"}, "unknowns": ["b"]},
+            {"question": "q2", "variables": {"a": "1/0"}, "unknowns": ["a"]},
+            {"question": "q3", "variables": {"a": "5", "b": "a+1"}, "unknowns": ["b"]},
+        ]
+        pipeline = Pipeline(solve, {'output_dir': self.output_dir}, render_workers=2, emit=self.emit)
+        report = pipeline.run(questions, first_index=4)
+
+        self.assertEqual([entry[0] for entry in self.emitted], [4, 5, 6])
+        self.assertEqual(self.emitted[0][1], 6.0)
+        self.assertIsNotNone(self.emitted[1][2])
+        self.assertIsNone(self.emitted[1][3])
+        self.assertEqual(sorted(os.listdir(self.output_dir)), ["question_00005.png", "question_00007.png"])
+        for stage in STAGES:
+            self.assertEqual(report['stages'][stage]['items'], 3)
+        self.assertIn(report['bottleneck'], STAGES)
+
+    def test_render_cache(self):
+        cache_dir = tempfile.mkdtemp()
+        questions = [{"question": f"q{i}", "variables": {"a": str(i), "b": "a+1"}, "unknowns": ["b"]}
+                     for i in range(3)]
+        first = Pipeline(solve, {'output_dir': self.output_dir, 'cache_dir': cache_dir}).run(questions)
+        self.assertEqual(first['render_cache'], {'hits': 0, 'misses': 3})
+        images = {}
+        for name in sorted(os.listdir(self.output_dir)):
+            with open(os.path.join(self.output_dir, name), 'rb') as file:
+                images[name] = file.read()
+            os.remove(os.path.join(self.output_dir, name))
+
+        second = Pipeline(solve, {'output_dir': self.output_dir, 'cache_dir': cache_dir}).run(questions)
+        self.assertEqual(second['render_cache'], {'hits': 3, 'misses': 0})
+        for name, image in images.items():
+            with open(os.path.join(self.output_dir, name), 'rb') as file:
+                self.assertEqual(file.read(), image)
+
+    def test_backpressure_bounds_loading(self):
+        pipeline = Pipeline(solve, {'output_dir': self.output_dir}, render_workers=1, queue_size=1)
+        ahead = []
+
+        def questions():
+            for i in range(12):
+                ahead.append(i - pipeline.stats['write'].items)
+                yield {"question": f"q{i}", "variables": {"a": str(i)}, "unknowns": ["a"]}
+
+        pipeline.run(questions())
+        # One item per queue, one being rendered, one in each stage's hands
+        self.assertLessEqual(max(ahead), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from precheck import ERROR, WARNING, check_bank, check_question
+from question_schema import compiled_question_check, question_validator, schema_errors
+
+GOOD = {"question": "q", "variables": {"a": "2", "b": "a*3"}, "unknowns": ["b"]}
+
+
+class TestCompiledSchema(unittest.TestCase):
+
+    def test_agrees_with_jsonschema(self):
+        check = compiled_question_check()
+        self.assertIsNotNone(check)
+        samples = [
+            GOOD, {}, [], {"question": 1, "variables": {}, "unknowns": []},
+            {"question": "q", "variables": {"1a": "2"}, "unknowns": ["a"]},
+            {"question": "q", "variables": {"a": ""}, "unknowns": ["a"]},
+            {"question": "q", "variables": {"a": 2}, "unknowns": ["a"]},
+            {"question": "q", "variables": {"a": "2"}, "unknowns": "a"},
+            {"question": True, "variables": {"a": "2"}, "unknowns": ["a"]},
+            dict(GOOD, extra=1),
+        ]
+        for sample in samples:
+            self.assertEqual(check(sample), question_validator().is_valid(sample), sample)
+
+    def test_errors_still_explained(self):
+        self.assertEqual(schema_errors(GOOD), [])
+        self.assertEqual(schema_errors({"question": "q", "variables": {"a": 2}, "unknowns": ["a"]}),
+                         ["variables/a: 2 is not of type 'string'"])
+
+
+class TestPrecheck(unittest.TestCase):
+
+    def test_reports_every_issue(self):
+        question = {"question": "q", "variables": {"a": "b+1", "b": "a-1", "c": "x/0", "d": "a*a+a", "e": "2+"},
+                    "unknowns": ["a", "z"]}
+        issues = check_question(question)
+        self.assertIn((ERROR, "variables/c: undefined variable 'x'"), issues)
+        self.assertIn((ERROR, "variables/c: division by zero in 'x/0'"), issues)
+        self.assertIn((ERROR, "unknowns: 'z' has no definition"), issues)
+        self.assertIn((ERROR, "cyclic dependency among a, b"), issues)
+        self.assertTrue(any(severity == ERROR and message.startswith("variables/e:") for severity, message in issues))
+        self.assertEqual([message for severity, message in issues if severity == WARNING][0][:13], "variables/d: ")
+        self.assertNotIn((ERROR, "cyclic dependency among a, b"), check_question(question, allow_cycles=True))
+
+    def test_check_bank_in_workers(self):
+        questions = [GOOD] * 5 + [{"question": "q", "variables": {"a": "b"}, "unknowns": ["a"]}] + [GOOD] * 4
+        for workers in (1, 2):
+            report = check_bank(questions, workers=workers, chunk_size=3, first_index=10)
+            self.assertEqual(report['questions'], 10)
+            self.assertEqual(report['issues'], [(16, ERROR, "variables/a: undefined variable 'b'")])
+
+
+if __name__ == '__main__':
+    unittest.main()
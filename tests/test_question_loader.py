@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import question_loader
+from question_loader import iter_questions
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'questions.json')
+
+
+class TestQuestionLoader(unittest.TestCase):
+
+    def setUp(self):
+        with open(DATA_PATH) as file:
+            self.expected = json.load(file)["questions"]
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def _write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as file:
+            file.write(text)
+        return path
+
+    def test_wrapped_format_with_small_reads(self):
+        # Tiny reads force values to be split across buffer refills
+        with mock.patch.object(question_loader, 'READ_SIZE', 7):
+            self.assertEqual(list(iter_questions(DATA_PATH)), self.expected)
+
+    def test_other_keys_and_bare_array(self):
+        text = json.dumps({"version": 12, "meta": {"a": [1, 2]}, "questions": self.expected, "n": 10})
+        self.assertEqual(list(iter_questions(self._write("bank.json", text))), self.expected)
+        bare = self._write("bare.json", json.dumps(self.expected))
+        self.assertEqual(list(iter_questions(bare)), self.expected)
+
+    def test_json_lines(self):
+        text = "\n".join(json.dumps(question) for question in self.expected) + "\n\n"
+        self.assertEqual(list(iter_questions(self._write("bank.jsonl", text))), self.expected)
+
+    def test_yields_before_reading_whole_file(self):
+        path = self._write("broken.json", '{"questions": [{"question": "ok"}, {"question": ')
+        with mock.patch.object(question_loader, 'READ_SIZE', 4):
+            questions = iter_questions(path)
+            self.assertEqual(next(questions), {"question": "ok"})
+            with self.assertRaises(ValueError):
+                next(questions)
+
+    def test_missing_file_raises_immediately(self):
+        with self.assertRaises(FileNotFoundError):
+            iter_questions(os.path.join(self.tmp.name, "missing.json"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from model.bar_model import BarModel
+from visualization.bar_renderer import BarRenderer
+from visualization.render_cache import RenderCache
+
+QUESTION = {
+    "question": "A mango is 215 grams. A papaya is 185 grams heavier than the mango.",
+    "variables": {"mango": "215", "papaya": "mango+185"},
+    "unknowns": ["papaya"]
+}
+RESULTS = {"mango": 215.0, "papaya": 400.0}
+
+
+class TestRenderCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache_dir = os.path.join(self.tmp.name, 'cache')
+
+    def _file(self, name, size):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'wb') as file:
+            file.write(b'x' * size)
+        return path
+
+    def test_key_depends_on_every_input(self):
+        key = RenderCache.key(QUESTION, RESULTS, 'png', 100, 1)
+        self.assertEqual(key, RenderCache.key(dict(QUESTION), dict(RESULTS), 'png', 100, 1))
+        changed = dict(QUESTION, variables={"mango": "215", "papaya": "mango+186"})
+        self.assertNotEqual(key, RenderCache.key(changed, RESULTS, 'png', 100, 1))
+        self.assertNotEqual(key, RenderCache.key(QUESTION, {"mango": 215.0, "papaya": 401.0}, 'png', 100, 1))
+        self.assertNotEqual(key, RenderCache.key(QUESTION, RESULTS, 'svg', 100, 1))
+        self.assertNotEqual(key, RenderCache.key(QUESTION, RESULTS, 'png', 100, 2))
+
+    def test_lru_eviction_and_counters(self):
+        cache = RenderCache(self.cache_dir, max_bytes=250)
+        destination = os.path.join(self.tmp.name, 'out.png')
+        for key in ('aa1', 'bb2', 'cc3'):
+            self.assertFalse(cache.get(key, 'png', destination))
+            cache.put(key, 'png', self._file(key, 100))
+            if key == 'bb2':
+                # Touch the first entry so the second becomes least recently used
+                self.assertTrue(cache.get('aa1', 'png', destination))
+
+        self.assertTrue(cache.get('aa1', 'png', destination))
+        self.assertFalse(cache.get('bb2', 'png', destination))
+        self.assertTrue(cache.get('cc3', 'png', destination))
+        self.assertEqual(cache.stats(), {'hits': 3, 'misses': 4, 'entries': 2, 'bytes': 200})
+
+        # The index is rebuilt from disk by a new process
+        self.assertEqual(RenderCache(self.cache_dir, max_bytes=250).stats()['entries'], 2)
+
+    def test_renderer_skips_drawing_on_hit(self):
+        out_dir = os.path.join(self.tmp.name, 'out')
+        os.makedirs(out_dir)
+        first = BarRenderer(output_dir=out_dir, dpi=50, cache_dir=self.cache_dir)
+        path = first.render(BarModel(RESULTS), QUESTION, index=0)
+        os.remove(path)
+
+        second = BarRenderer(output_dir=out_dir, dpi=50, cache_dir=self.cache_dir)
+        with mock.patch.object(BarRenderer, '_create_figure', side_effect=AssertionError("drew a cached figure")):
+            self.assertEqual(second.render(BarModel(RESULTS), QUESTION, index=0), path)
+        self.assertTrue(os.path.exists(path))
+        self.assertEqual((second.cache.hits, second.cache.misses), (1, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from fractions import Fraction
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import main
+from solver.dependency_graph import solve_variables
+from solver.memo import SubgraphMemo
+from solver.result_cache import ResultCache
+
+BASKET = {"question": "q", "variables": {"orange": "151", "banana": "orange/2", "basket": "3*orange+5*banana"},
+          "unknowns": ["basket"]}
+
+
+class TestExactSolving(unittest.TestCase):
+
+    def test_exact_values(self):
+        results = solve_variables(BASKET["variables"], BASKET["unknowns"], exact=True)
+        self.assertEqual(results, {"orange": 151, "banana": Fraction(151, 2), "basket": Fraction(1661, 2)})
+        self.assertEqual(results.shapes["banana"], ('divide', 'orange', 2.0))
+
+    def test_integer_literals_beyond_float_precision(self):
+        results = solve_variables({"a": "9007199254740993", "b": "a-9007199254740992"}, ["b"], exact=True)
+        self.assertEqual(results["b"], 1)
+        self.assertEqual(solve_variables({"a": "9007199254740993"}, ["a"])["a"], 9007199254740992.0)
+
+    def test_memo_keeps_exact_and_float_values_apart(self):
+        memo = SubgraphMemo()
+        exact = solve_variables(BASKET["variables"], BASKET["unknowns"], memo=memo, exact=True)
+        floats = solve_variables(BASKET["variables"], BASKET["unknowns"], memo=memo)
+        self.assertIsInstance(exact["banana"], Fraction)
+        self.assertIsInstance(floats["banana"], float)
+        self.assertEqual(memo.hits, 0)
+
+    def test_cycles_are_solved_in_floats(self):
+        definitions = {"tom": "jerry+20", "jerry": "total-tom", "total": "101/2"}
+        results = solve_variables(definitions, ["tom"], linear=True, exact=True)
+        self.assertEqual(results["total"], Fraction(101, 2))
+        self.assertAlmostEqual(results["tom"], 35.25)
+
+
+class TestResultCache(unittest.TestCase):
+
+    def test_repeat_questions_are_not_solved_again(self):
+        cache = ResultCache()
+        solve = mock.Mock(side_effect=lambda question: solve_variables(question["variables"], question["unknowns"]))
+        first = cache.solve(BASKET, solve)
+        self.assertIs(cache.solve(dict(BASKET, question="other text"), solve), first)
+        self.assertEqual(solve.call_count, 1)
+        cache.solve(dict(BASKET, unknowns=["banana"]), solve)
+        self.assertEqual(cache.stats(), {'hits': 1, 'misses': 2, 'entries': 2, 'hit_rate': 1 / 3})
+
+    def test_errors_and_unhashable_questions_are_not_cached(self):
+        cache = ResultCache(max_entries=1)
+        broken = {"variables": {"a": "1/0"}, "unknowns": ["a"]}
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                cache.solve(broken, lambda question: solve_variables(question["variables"], question["unknowns"]))
+        self.assertIsNone(ResultCache.key({"variables": {"a": ["1"]}, "unknowns": ["a"]}))
+        self.assertEqual(cache.stats()['entries'], 0)
+
+
+class TestExactOption(unittest.TestCase):
+
+    def test_json_and_text_answers(self):
+        handle, path = tempfile.mkstemp(suffix='.jsonl')
+        with os.fdopen(handle, 'w') as file:
+            for question in (BASKET, BASKET):
+                file.write(json.dumps(question) + "\n")
+        self.addCleanup(os.remove, path)
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            main.main(['--questions', path, '--json', '--exact', '--log-level', 'ERROR'])
+        self.assertEqual(json.loads(output.getvalue().splitlines()[0])["answers"], {"basket": 830.5})
+        self.assertEqual(main.json_value(400), 400)
+        self.assertIsInstance(main.json_value(Fraction(1661, 2)), float)
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            main.main(['--questions', path, '--renderer', 'text', '--exact', '--log-level', 'ERROR'])
+        self.assertIn("basket = 1661/2", output.getvalue())
+        self.assertIn("Result cache: 1 hits, 1 misses", output.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
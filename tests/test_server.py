@@ -0,0 +1,86 @@
+import os
+import sys
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from server import create_app, percentile
+from solver.dependency_graph import DependencyGraph
+
+FRUIT_QUESTION = {
+    "question": "A mango is 215 grams. A papaya is 185 grams heavier than the mango.",
+    "variables": {"mango": "215", "papaya": "mango+185"},
+    "unknowns": ["papaya"]
+}
+
+
+class TestServer(unittest.TestCase):
+
+    def setUp(self):
+        self.client = create_app().test_client()
+
+    def test_solve(self):
+        response = self.client.post('/solve', json=FRUIT_QUESTION)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['unknowns'], {"papaya": 400.0})
+
+    def test_solve_reports_errors(self):
+        response = self.client.post('/solve', json={"variables": {"a": "b+1"}, "unknowns": ["a"]})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Undefined variable 'b'", response.get_json()['error'])
+
+    def test_bulk_keeps_order_and_per_question_errors(self):
+        questions = [FRUIT_QUESTION, {"variables": {"a": "a+1"}, "unknowns": ["a"]}, FRUIT_QUESTION]
+        response = self.client.post('/solve/bulk', json={"questions": questions})
+        results = response.get_json()['results']
+        self.assertEqual(len(results), 3)
+        self.assertEqual(results[0]['unknowns'], {"papaya": 400.0})
+        self.assertIn('Cyclic dependency', results[1]['error'])
+        self.assertEqual(results[2], results[0])
+
+    def test_invalid_questions_are_rejected(self):
+        bad = {"variables": {"a": "1"}, "unknowns": [1]}
+        response = self.client.post('/solve', json=bad)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("unknowns/0: 1 is not of type 'string'", response.get_json()['error'])
+        response = self.client.post('/solve/bulk', json={"questions": [FRUIT_QUESTION, bad, "x"]})
+        self.assertEqual(response.status_code, 200)
+        results = response.get_json()['results']
+        self.assertEqual(results[0]['unknowns'], {"papaya": 400.0})
+        self.assertIn('error', results[1])
+        self.assertIn('error', results[2])
+        response = self.client.post('/render', json={"variables": {"a": "1"}, "unknowns": ["a"]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_render_caches_images(self):
+        first = self.client.post('/render', json=FRUIT_QUESTION)
+        self.assertEqual(first.mimetype, 'image/png')
+        self.assertTrue(first.data.startswith(b'\x89PNG'))
+        second = self.client.post('/render', json=FRUIT_QUESTION)
+        self.assertEqual(second.data, first.data)
+        metrics = self.client.get('/metrics').get_json()
+        self.assertEqual(metrics['image_cache']['hits'], 1)
+        self.assertEqual(metrics['compiled_cache']['hits'], 1)
+        self.assertEqual(metrics['image_cache']['hit_rate'], 0.5)
+        self.assertEqual(metrics['requests']['/render']['count'], 2)
+        self.assertIsNotNone(metrics['requests']['/render']['latency_ms']['p99'])
+
+    def test_exact_results_are_cached(self):
+        client = create_app(exact=True).test_client()
+        question = {"question": "q", "variables": {"orange": "151", "banana": "orange/2"}, "unknowns": ["banana"]}
+        with mock.patch('solver.dependency_graph.DependencyGraph.evaluate', autospec=True,
+                        side_effect=DependencyGraph.evaluate) as evaluate:
+            self.assertEqual(client.post('/solve', json=question).get_json()['unknowns'], {"banana": 75.5})
+            self.assertTrue(client.post('/render', json=question).data.startswith(b'\x89PNG'))
+        self.assertEqual(evaluate.call_count, 1)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertIsNone(percentile([], 50))
+
+
+if __name__ == '__main__':
+    unittest.main()
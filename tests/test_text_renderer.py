@@ -0,0 +1,54 @@
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from model.bar_model import BarModel
+from solver.dependency_graph import solve_variables
+from visualization.text_renderer import ANSI_RESET, TextBarRenderer
+
+FRUIT_QUESTION = {
+    "question": "A papaya is 185 grams heavier than a mango; a grapefruit is 154 grams lighter than the papaya.",
+    "variables": {"mango": "215", "papaya": "mango+185", "grapefruit": "papaya-154"},
+    "unknowns": ["papaya", "grapefruit"],
+}
+
+BASKET_QUESTION = {
+    "question": "A fruit basket contains 2 watermelons and 3 oranges.",
+    "variables": {"watermelon": "1500", "orange": "150", "basket": "2*watermelon+3*orange"},
+    "unknowns": ["basket"],
+}
+
+
+def render(question, **options):
+    results = solve_variables(question["variables"], question["unknowns"])
+    stream = io.StringIO()
+    TextBarRenderer(stream=stream, width=40, **options).render(BarModel(results), question)
+    return stream.getvalue().splitlines()
+
+
+class TestTextBarRenderer(unittest.TestCase):
+
+    def test_add_and_subtract_segments(self):
+        lines = render(FRUIT_QUESTION)
+        # papaya: 215 of 400 as base, 185 as hatched difference, on a 40-cell scale
+        self.assertEqual(lines[2], "papaya     " + "█" * 22 + "▒" * 18 + " 400.0")
+        self.assertEqual(lines[3].strip(), "mango (215) | + 185 | Total papaya (400)")
+        self.assertEqual(lines[4].strip(), "Equation: papaya = mango + 185 = 400.0")
+        self.assertEqual(lines[5], "grapefruit " + "█" * 25 + "░" * 15 + " 246.0")
+        self.assertEqual(lines[6].strip(), "grapefruit (246) | Removed (154) | Original papaya (400)")
+
+    def test_composite_terms_alternate_fills(self):
+        lines = render(BASKET_QUESTION)
+        self.assertEqual(lines[4], "basket     " + "█" * 35 + "▓" * 5 + " 3450.0")
+        self.assertEqual(lines[5].strip(), "2 x watermelon (3000) | 3 x orange (450) | Total basket (3450)")
+
+    def test_ansi_colours(self):
+        lines = render(BASKET_QUESTION, color=True)
+        self.assertIn(f"\033[34m{'█' * 35}{ANSI_RESET}\033[33m{'█' * 5}{ANSI_RESET}", lines[4])
+
+
+if __name__ == '__main__':
+    unittest.main()
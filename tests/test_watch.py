@@ -0,0 +1,59 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from watch import BankWatcher, diff_hashes, scan_bank
+
+
+def question(n):
+    return {"question": f"q{n}", "variables": {"a": str(n)}, "unknowns": ["a"]}
+
+
+class TestWatch(unittest.TestCase):
+
+    def write_bank(self, questions):
+        with open(self.path, 'w') as file:
+            for q in questions:
+                file.write(json.dumps(q) + "\n")
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def test_diff_hashes(self):
+        self.assertEqual(diff_hashes([], ['a', 'b']), ([0, 1], [], []))
+        self.assertEqual(diff_hashes(['a', 'b', 'c'], ['a', 'x', 'c']), ([1], [], []))
+        # Deleting the first question moves the rest up
+        self.assertEqual(diff_hashes(['a', 'b', 'c'], ['b', 'c']), ([], [(1, 0), (2, 1)], []))
+        self.assertEqual(diff_hashes(['a', 'b', 'c'], ['a']), ([], [], [1, 2]))
+
+    def test_scan_parses_only_changed_lines(self):
+        self.write_bank([question(1), question(2)])
+        first = scan_bank(self.path)
+        self.write_bank([question(1), question(3)])
+        second = scan_bank(self.path, dict(first))
+        self.assertIs(second[0][1], first[0][1])
+        self.assertEqual(second[1][1], question(3))
+
+    def test_watcher_reports_changes(self):
+        updates = []
+        watcher = BankWatcher(self.path, lambda questions, *diff: updates.append(diff))
+        self.write_bank([question(1), question(2), question(3)])
+        watcher.scan()
+        self.write_bank([question(2), question(3), question(4)])
+        watcher.scan()
+        watcher.scan()
+        self.assertEqual(updates, [([0, 1, 2], [], []), ([2], [(1, 0), (2, 1)], [])])
+
+        with open(self.path, 'a') as file:
+            file.write('{"question": \n')
+        self.assertFalse(watcher.scan())
+
+
+if __name__ == '__main__':
+    unittest.main()